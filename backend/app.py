@@ -10,26 +10,81 @@ from backend.routes.auth import auth_bp
 from backend.routes.bookings import bookings_bp
 from backend.routes.subscriptions import subscriptions_bp
 from backend.routes.payments import payments_bp
-from backend.config import DEBUG
+from backend.routes.export import export_bp
+from backend.routes.admin import admin_bp
+from backend.routes.search import search_bp
+from backend.routes.services import services_bp
+from backend.routes.providers import providers_bp
+from backend.routes.media import media_bp
+from backend.routes.checkout import checkout_bp
+from backend.models import ensure_indexes
+from backend.jobs.claims import start_claim_sweeper
+from backend.jobs.media import start_media_worker
+from backend.jobs.notifications import start_notification_flusher
+from backend.utils.resilience import protect, BREAKERS
+from backend.utils.idempotency import enable_idempotency
+from backend.utils.capture import enable_capture
+from backend.config import DEBUG, TRAFFIC_CAPTURE, REQUEST_MAX_BYTES
 
 app = Flask(__name__)
 
+# Refuse oversized bodies up front, or once a chunked body passes the limit
+app.config['MAX_CONTENT_LENGTH'] = REQUEST_MAX_BYTES
+
 # Enable CORS for all routes
 CORS(app)
 
+# Record sampled requests for replay (first, so its timing covers the rest)
+if TRAFFIC_CAPTURE:
+    enable_capture(app)
+
+# Shed load past MAX_IN_FLIGHT and go read-only while the database is failing
+protect(app)
+
+# Replay stored responses for retried POSTs carrying an Idempotency-Key
+enable_idempotency(app)
+
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(bookings_bp, url_prefix='/api')
 app.register_blueprint(subscriptions_bp, url_prefix='/api')
 app.register_blueprint(payments_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
+app.register_blueprint(services_bp, url_prefix='/api')
+app.register_blueprint(providers_bp, url_prefix='/api')
+app.register_blueprint(media_bp, url_prefix='/api')
+app.register_blueprint(checkout_bp, url_prefix='/api')
+
+# Create indexes used by list and delta-sync queries
+try:
+    ensure_indexes()
+except Exception as e:
+    print(f"Index creation skipped: {type(e).__name__}: {str(e)}")
+
+# Return bookings with expired claim leases to the pending pool
+start_claim_sweeper()
+
+# Build thumbnails and compressed voice notes for uploaded media
+start_media_worker()
+
+# Send queued provider notifications as periodic digests
+start_notification_flusher()
 
 @app.route('/')
 def index():
     return {'message': 'Local Service Platform API', 'status': 'running'}
 
+@app.errorhandler(413)
+def too_large(e):
+    return {'success': False, 'message': f'Request body exceeds the {REQUEST_MAX_BYTES} byte limit'}, 413
+
 @app.route('/health')
 def health():
-    return {'status': 'healthy'}
+    dependencies = {b.name: b.status() for b in BREAKERS}
+    degraded = any(d['state'] != 'closed' for d in dependencies.values())
+    return {'status': 'degraded' if degraded else 'healthy', 'dependencies': dependencies}
 
 if __name__ == '__main__':
     app.run(debug=DEBUG, port=5000, host='0.0.0.0')
@@ -0,0 +1,72 @@
+"""Contention benchmark for InstantBooking.claim.
+
+Creates pending bookings and has hundreds of providers race to claim each
+one at the same instant, checking that exactly one claim wins per booking.
+
+Usage: python -m backend.benchmarks.claim_contention [claimers] [rounds]
+Set STORAGE_BACKEND=memory to time the Python side without a database.
+"""
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import InstantBooking
+
+
+def race(booking_id, claimers, pool):
+    """Release claimers simultaneously against one booking; return (winners, latencies)"""
+    barrier = threading.Barrier(claimers)
+
+    def attempt(i):
+        barrier.wait()
+        start = time.perf_counter()
+        booking = InstantBooking.claim(booking_id, f'bench-provider-{i}', f'Provider {i}', 60)
+        return booking is not None, time.perf_counter() - start
+
+    results = list(pool.map(attempt, range(claimers)))
+    winners = sum(1 for won, _ in results if won)
+    return winners, [elapsed for _, elapsed in results]
+
+
+def main(claimers=200, rounds=20):
+    latencies = []
+    failures = 0
+    booking_ids = []
+
+    with ThreadPoolExecutor(max_workers=claimers) as pool:
+        for _ in range(rounds):
+            booking = InstantBooking.create({
+                'customerId': 'bench-customer',
+                'customerName': 'Bench Customer',
+                'serviceType': 'plumbing',
+                'description': 'claim contention benchmark',
+                'address': 'n/a',
+                'phone': 'n/a'
+            })
+            booking_id = str(booking['_id'])
+            booking_ids.append(booking['_id'])
+
+            winners, elapsed = race(booking_id, claimers, pool)
+            latencies.extend(elapsed)
+            if winners != 1:
+                failures += 1
+                print(f"Booking {booking_id}: {winners} winners")
+
+    InstantBooking.collection.delete_many({'_id': {'$in': booking_ids}})
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{rounds} bookings x {claimers} concurrent claimers")
+    print(f"Single winner in {rounds - failures}/{rounds} rounds")
+    print(f"Claim latency p50={p50:.2f}ms p99={p99:.2f}ms")
+    return failures == 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
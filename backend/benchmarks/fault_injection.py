@@ -0,0 +1,116 @@
+"""Fault-injection drill for timeouts, circuit breakers and degraded mode.
+
+Runs the API in process on the memory storage backend and injects faults
+into the database and SMTP dependencies, checking that:
+
+- reads that hit a failing database are served from the response cache
+- writes are rejected with 503 and Retry-After instead of a 400
+- the database breaker opens, fails fast, and closes again after recovery
+- requests past MAX_IN_FLIGHT are shed with 503 while the database is slow
+- the SMTP breaker opens and email sends fail fast without connecting
+
+Usage: python -m backend.benchmarks.fault_injection
+"""
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from pymongo.errors import NetworkTimeout
+from backend.app import app
+from backend.utils import resilience
+from backend.utils.resilience import Fault, faults, mongo_breaker, smtp_breaker
+from backend.utils.mail import send_otp_email
+
+COOLDOWN = 1
+BOOKING = {'customerId': 'drill-customer', 'customerName': 'Drill', 'serviceType': 'Plumber',
+           'description': 'Fault drill', 'address': '1 Test St', 'phone': '000'}
+
+results = []
+
+
+def check(name, ok, detail=''):
+    results.append(ok)
+    print(f"{'PASS' if ok else 'FAIL'}  {name}{f' ({detail})' if detail else ''}")
+
+
+def database_outage(client):
+    client.post('/api/instant-booking', json=BOOKING)
+    warm = client.get('/api/customer/drill-customer/bookings')
+    check('healthy read returns 200', warm.status_code == 200)
+
+    faults['mongo'] = Fault(error=NetworkTimeout)
+    read = client.get('/api/customer/drill-customer/bookings')
+    check('read during outage is served from cache',
+          read.status_code == 200 and read.headers.get('X-Degraded') == '1' and read.data == warm.data)
+    write = client.post('/api/instant-booking', json=BOOKING)
+    check('write during outage is rejected with 503',
+          write.status_code == 503 and 'Retry-After' in write.headers, f'got {write.status_code}')
+
+    failed_reads = 1
+    while mongo_breaker.state == 'closed' and failed_reads < 50:
+        client.get('/api/customer/drill-customer/bookings')
+        failed_reads += 1
+    check('database breaker opens', mongo_breaker.state == 'open', f'after {failed_reads} failed reads')
+
+    start = time.perf_counter()
+    uncached = client.get('/api/customer/someone-else/bookings')
+    elapsed = (time.perf_counter() - start) * 1000
+    check('uncached read fails fast with 503', uncached.status_code == 503, f'{elapsed:.1f}ms')
+    health = client.get('/health').get_json()
+    check('health reports degraded', health['status'] == 'degraded')
+
+    del faults['mongo']
+    time.sleep(COOLDOWN + 0.1)
+    probe = client.get('/api/customer/drill-customer/bookings')
+    check('breaker closes after a successful probe',
+          probe.status_code == 200 and 'X-Degraded' not in probe.headers and mongo_breaker.state == 'closed',
+          mongo_breaker.state)
+    write = client.post('/api/instant-booking', json=BOOKING)
+    check('writes accepted after recovery', write.status_code == 201, f'got {write.status_code}')
+
+
+def slow_database(limit=4, requests=20):
+    resilience.admission = threading.BoundedSemaphore(limit)
+    faults['mongo'] = Fault(delay=0.05)
+
+    def fetch(_):
+        return app.test_client().get('/api/customer/drill-customer/bookings').status_code
+
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        statuses = list(pool.map(fetch, range(requests)))
+    del faults['mongo']
+    shed = statuses.count(503)
+    check('excess requests are shed while the database is slow',
+          shed > 0 and statuses.count(200) >= limit, f'{shed}/{requests} shed, {statuses.count(200)} served')
+
+
+def smtp_outage():
+    faults['smtp'] = Fault(error=ConnectionRefusedError)
+    for _ in range(smtp_breaker.min_calls):
+        send_otp_email('drill@example.com', '000000')
+    check('SMTP breaker opens', smtp_breaker.state == 'open', smtp_breaker.state)
+    start = time.perf_counter()
+    ok, message = send_otp_email('drill@example.com', '000000')
+    elapsed = (time.perf_counter() - start) * 1000
+    check('email send fails fast while open', not ok and elapsed < 50, f'{elapsed:.1f}ms: {message}')
+    del faults['smtp']
+
+
+def main():
+    mongo_breaker.cooldown = COOLDOWN
+    smtp_breaker.cooldown = COOLDOWN
+    client = app.test_client()
+    database_outage(client)
+    slow_database()
+    smtp_outage()
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Replay captured traffic against running instances and compare latency.
+
+Reads the JSONL files written by the traffic capture middleware
+(TRAFFIC_CAPTURE=true) and sends the same requests to each target in turn,
+then prints p50/p95 latency per route for every target and the change
+against the first one, e.g. the current build vs. a candidate:
+
+    python -m backend.benchmarks.replay traffic/requests-*.jsonl \\
+        --target http://localhost:5000 --target http://localhost:5001 --speed 10
+
+--speed 1 keeps the captured gaps between requests, --speed 10 plays them
+ten times faster and --speed 0 sends them back to back. With
+--max-regression PCT the exit status is 1 when any route's p95 got more
+than PCT percent slower. Lines that are not captured requests are skipped,
+as are uploads. Replays write, so point targets at throwaway databases
+(e.g. STORAGE_BACKEND=memory).
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+def load(paths):
+    """Captured requests from paths, merged in time order"""
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or not all(record.get(k) for k in ('ts', 'method', 'path')):
+                    continue
+                if isinstance(record.get('body'), dict) and '$multipart' in record['body']:
+                    continue
+                record['at'] = datetime.fromisoformat(record['ts'])
+                records.append(record)
+    records.sort(key=lambda r: r['at'])
+    return records
+
+
+def inflate(value):
+    """Request body to send: media placeholders become filler of the captured size"""
+    if isinstance(value, dict):
+        if set(value) == {'$bytes'}:
+            return 'A' * value['$bytes']
+        return {k: inflate(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [inflate(v) for v in value]
+    return value
+
+
+def route_key(record):
+    return f"{record['method']} {record.get('route') or record['path']}"
+
+
+def send(target, record, timeout):
+    """Send one captured request; returns (status or None, latency in ms)"""
+    url = target.rstrip('/') + record['path']
+    if record.get('query'):
+        url += '?' + urllib.parse.urlencode(record['query'])
+    data, headers = None, {}
+    if record.get('body') is not None:
+        data = json.dumps(inflate(record['body'])).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    req = urllib.request.Request(url, data=data, headers=headers, method=record['method'])
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except OSError:
+        status = None
+    return status, (time.perf_counter() - start) * 1000
+
+
+def replay(target, records, speed, concurrency, timeout):
+    """Send records to target at speed x the captured pace; returns [(route, status, latency_ms)]"""
+    first = records[0]['at']
+    started = time.monotonic()
+    pending = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed:
+                wait = (record['at'] - first).total_seconds() / speed - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            pending.append((route_key(record), pool.submit(send, target, record, timeout)))
+        return [(route, *future.result()) for route, future in pending]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def change(new, old):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def report(targets, results):
+    """Print per-route latency for each target; returns the worst p95 change in percent"""
+    labels = [chr(ord('A') + i) for i in range(len(targets))]
+    for label, target in zip(labels, targets):
+        print(f"{label}: {target}")
+    columns = ''.join(f"{f'{l} p50':>9}{f'{l} p95':>9}{f'{l} err':>7}" for l in labels)
+    deltas = ''.join(f"{f'{l} dp50':>9}{f'{l} dp95':>9}" for l in labels[1:])
+    print(f"\n{'route':<48}{'n':>6}{columns}{deltas}")
+
+    worst = 0.0
+    routes = sorted({route for route, _, _ in results[targets[0]]}) + ['ALL']
+    for route in routes:
+        stats = []
+        for target in targets:
+            rows = [r for r in results[target] if route in ('ALL', r[0])]
+            latencies = [latency for _, _, latency in rows]
+            errors = sum(1 for _, status, _ in rows if status is None or status >= 500)
+            stats.append((percentile(latencies, 0.5), percentile(latencies, 0.95), errors))
+        line = f"{route[:47]:<48}{len(rows):>6}" + ''.join(f"{p50:>9.1f}{p95:>9.1f}{err:>7}" for p50, p95, err in stats)
+        for p50, p95, _ in stats[1:]:
+            d50, d95 = change(p50, stats[0][0]), change(p95, stats[0][1])
+            worst = max(worst, d95)
+            line += f"{d50:>+8.0f}%{d95:>+8.0f}%"
+        print(line)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured traffic and compare per-route latency')
+    parser.add_argument('captures', nargs='+', help='capture files (JSONL)')
+    parser.add_argument('--target', action='append', required=True, help='base URL; repeat to compare builds')
+    parser.add_argument('--speed', type=float, default=1.0, help='pace multiplier; 0 sends back to back')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--max-regression', type=float, help='fail if a route p95 is this many percent slower')
+    args = parser.parse_args()
+
+    records = load(args.captures)
+    if not records:
+        print('No captured requests found')
+        return 1
+    print(f"Replaying {len(records)} requests against {len(args.target)} target(s)")
+    results = {}
+    for target in args.target:
+        started = time.perf_counter()
+        results[target] = replay(target, records, args.speed, args.concurrency, args.timeout)
+        print(f"{target}: done in {time.perf_counter() - started:.1f}s")
+    print()
+    worst = report(args.target, results)
+    if args.max_regression is not None and worst > args.max_regression:
+        print(f"\nFAIL: p95 regressed by {worst:.0f}% (limit {args.max_regression:.0f}%)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
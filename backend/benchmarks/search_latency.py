@@ -0,0 +1,66 @@
+"""Latency benchmark for the in-memory booking search index.
+
+Builds a SearchIndex over a synthetic corpus (no database needed) and
+times a mix of exact, prefix, multi-term and filtered queries.
+
+Usage: python -m backend.benchmarks.search_latency [documents] [queries]
+"""
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.utils.search import SearchIndex, booking_index
+
+SERVICE_TYPES = ['plumbing', 'electrical', 'cleaning', 'carpentry', 'painting', 'gardening', 'pest control']
+WORDS = ['leak', 'kitchen', 'sink', 'bathroom', 'ceiling', 'fan', 'install', 'repair', 'broken', 'wall',
+         'outlet', 'switch', 'deep', 'clean', 'garden', 'hedge', 'paint', 'bedroom', 'door', 'window',
+         'pipe', 'tap', 'heater', 'wiring', 'termite', 'cockroach', 'cabinet', 'shelf', 'urgent', 'weekend']
+STREETS = ['Main', 'Elm', 'Oak', 'Pine', 'Maple', 'Cedar', 'Lake', 'Hill', 'Park', 'River']
+QUERIES = ['leak', 'kitch', 'plumbing sink', 'ceiling fa', 'elm', 'urgent repair', 'pa', 'deep clean bath']
+
+
+def corpus(size):
+    start = datetime.utcnow() - timedelta(days=365)
+    for i in range(size):
+        yield {
+            '_id': ObjectId(),
+            'service_type': random.choice(SERVICE_TYPES),
+            'description': ' '.join(random.choices(WORDS, k=random.randint(4, 12))),
+            'address': f'{random.randint(1, 999)} {random.choice(STREETS)} Street',
+            'status': random.choice(['pending', 'accepted', 'completed', 'rejected']),
+            'provider_id': None,
+            'customer_id': f'customer-{i % 10000}',
+            'created_at': start + timedelta(minutes=i)
+        }
+
+
+def main(size=200000, queries=2000):
+    index = SearchIndex(booking_index.fields, booking_index.filters, load=lambda since: [])
+    started = time.perf_counter()
+    for doc in corpus(size):
+        index.add(doc)
+    print(f"Indexed {size} bookings in {time.perf_counter() - started:.2f}s ({len(index.terms)} terms)")
+    index.synced_at = datetime.utcnow()
+    index.refreshed = float('inf')
+
+    latencies = []
+    for i in range(queries):
+        filters = {'status': 'pending'} if i % 4 == 0 else {}
+        started = time.perf_counter()
+        index.search(QUERIES[i % len(QUERIES)], filters, 0, 20)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{queries} queries: p50={p50:.2f}ms p99={p99:.2f}ms")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -16,3 +16,122 @@ EMAIL_HOST_PASSWORD = 'wiuczofyjyavzazo'
 # App Configuration
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
 DEBUG = True
+
+# Booking claims: how long a provider holds a claimed booking before it
+# returns to the pending pool, and how often expired leases are swept
+CLAIM_LEASE_SECONDS = int(os.getenv('CLAIM_LEASE_SECONDS', '300'))
+CLAIM_SWEEP_INTERVAL = int(os.getenv('CLAIM_SWEEP_INTERVAL', '30'))
+
+# Analytics: each run recomputes this many trailing days so status changes
+# (e.g. pending -> completed) on recent bookings are picked up
+ANALYTICS_REFRESH_DAYS = int(os.getenv('ANALYTICS_REFRESH_DAYS', '7'))
+# On-demand refreshes from the admin API reach back at most this many days
+# (full rebuilds go through python -m backend.jobs.analytics)
+ANALYTICS_MAX_REFRESH_DAYS = int(os.getenv('ANALYTICS_MAX_REFRESH_DAYS', '92'))
+
+# Search: how often each worker's in-memory index pulls writes made by
+# other workers (its own writes are applied immediately)
+SEARCH_REFRESH_SECONDS = int(os.getenv('SEARCH_REFRESH_SECONDS', '5'))
+
+# Provider ranking: refresh interval for each worker's in-memory top-k index
+RANKING_REFRESH_SECONDS = int(os.getenv('RANKING_REFRESH_SECONDS', '5'))
+
+# Service catalog: refresh interval for each worker's in-memory index, the
+# monthly-price upper bounds of each price band, and whether subscriptions
+# must reference a catalog service
+CATALOG_REFRESH_SECONDS = int(os.getenv('CATALOG_REFRESH_SECONDS', '5'))
+PRICE_BANDS = [('budget', 500), ('standard', 1000), ('premium', None)]
+CATALOG_STRICT = os.getenv('CATALOG_STRICT', 'false').lower() == 'true'
+
+# Archival: completed/cancelled bookings and settled payments older than
+# this many days move to *_archive collections, in batches of this size
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+
+# Reference fields (customer_id, provider_id, ...) are written as ObjectId.
+# Keep matching the legacy hex-string form until backend.jobs.migrate_refs
+# has converted every collection, then set DUAL_READ_REFS=false
+DUAL_READ_REFS = os.getenv('DUAL_READ_REFS', 'true').lower() == 'true'
+
+# Media uploads: accepted content types, per-kind size limits, the chunk
+# size used when streaming to GridFS, and the background worker's settings
+MEDIA_TYPES = {
+    'image': ['image/jpeg', 'image/png', 'image/webp', 'image/gif'],
+    'audio': ['audio/webm', 'audio/ogg', 'audio/mpeg', 'audio/wav', 'audio/mp4']
+}
+MEDIA_MAX_BYTES = {
+    'image': int(os.getenv('MEDIA_MAX_IMAGE_BYTES', str(10 * 1024 * 1024))),
+    'audio': int(os.getenv('MEDIA_MAX_AUDIO_BYTES', str(20 * 1024 * 1024)))
+}
+MEDIA_CHUNK_BYTES = 256 * 1024
+# Largest request body Flask will read (MAX_CONTENT_LENGTH), sized for the
+# biggest upload sent inline as base64 by older clients
+REQUEST_MAX_BYTES = int(os.getenv('REQUEST_MAX_BYTES', str(max(MEDIA_MAX_BYTES.values()) * 4 // 3 + MEDIA_CHUNK_BYTES)))
+MEDIA_THUMBNAIL_SIZE = (320, 320)
+MEDIA_AUDIO_BITRATE = os.getenv('MEDIA_AUDIO_BITRATE', '24k')
+MEDIA_POLL_SECONDS = int(os.getenv('MEDIA_POLL_SECONDS', '30'))
+MEDIA_STALE_SECONDS = int(os.getenv('MEDIA_STALE_SECONDS', '600'))
+
+# Provider notification digests: events are queued per provider and sent
+# as one email every NOTIFY_DIGEST_SECONDS (urgent bookings go out at once)
+NOTIFY_DIGEST_SECONDS = int(os.getenv('NOTIFY_DIGEST_SECONDS', '900'))
+NOTIFY_DIGEST_MAX_ITEMS = 20
+NOTIFY_SEND_LEASE_SECONDS = 300
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '5'))
+
+# Storage backend behind the models: 'mongo', or 'memory' for tests and
+# benchmarks that should run without a database server
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+
+# Dependency deadlines, circuit breakers and load shedding. A breaker opens
+# when BREAKER_FAILURE_RATIO of at least BREAKER_MIN_CALLS calls in the last
+# BREAKER_WINDOW_SECONDS failed, and probes again after the cooldown. While
+# the database breaker is open, reads are served from the last cached
+# responses (at most DEGRADED_CACHE_MAX_BYTES in total, skipping bodies over
+# DEGRADED_CACHE_MAX_ENTRY_BYTES) and writes are rejected with 503
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '3000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+SMTP_TIMEOUT_SECONDS = int(os.getenv('SMTP_TIMEOUT_SECONDS', '10'))
+BREAKER_WINDOW_SECONDS = 10
+BREAKER_MIN_CALLS = 5
+BREAKER_FAILURE_RATIO = 0.5
+BREAKER_COOLDOWN_SECONDS = int(os.getenv('BREAKER_COOLDOWN_SECONDS', '15'))
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', '64'))
+DEGRADED_CACHE_ENTRIES = 1000
+DEGRADED_CACHE_MAX_BYTES = int(os.getenv('DEGRADED_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+DEGRADED_CACHE_MAX_ENTRY_BYTES = int(os.getenv('DEGRADED_CACHE_MAX_ENTRY_BYTES', str(1024 * 1024)))
+
+# Idempotency-Key support on POST routes: responses are kept for replay
+# for IDEMPOTENCY_TTL_SECONDS; a request still running holds its key for
+# at most IDEMPOTENCY_LEASE_SECONDS
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IDEMPOTENCY_LEASE_SECONDS = 60
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+# Global hot reads (/bookings/pending, /subscriptions/active): concurrent
+# identical requests in a worker share one query, and the serialized
+# response is reused for HOT_READ_TTL_SECONDS unless this worker writes a
+# booking/subscription first (other workers' writes show up within the TTL)
+HOT_READ_TTL_SECONDS = float(os.getenv('HOT_READ_TTL_SECONDS', '2'))
+
+# Visit scheduling: subscription visits and accepted bookings each take
+# VISIT_DURATION_MINUTES of a provider's time. VISIT_CAPACITY is how many
+# visits a provider can make at once (one person, one visit by default);
+# accepting a booking or subscribing past it is refused with a 409, and the
+# client can pick another visitAt/startDate. 0 turns the checks off. Each
+# worker indexes visits up to SCHEDULE_HORIZON_DAYS ahead, pulling other
+# workers' writes every SCHEDULE_REFRESH_SECONDS
+VISIT_DURATION_MINUTES = int(os.getenv('VISIT_DURATION_MINUTES', '60'))
+VISIT_CAPACITY = int(os.getenv('VISIT_CAPACITY', '1'))
+SCHEDULE_HORIZON_DAYS = 90
+SCHEDULE_REFRESH_SECONDS = int(os.getenv('SCHEDULE_REFRESH_SECONDS', '5'))
+
+# Traffic capture for replay (off by default): TRAFFIC_SAMPLE_RATE of API
+# requests are written, with PII and media scrubbed, to a JSONL log rotated
+# at TRAFFIC_CAPTURE_MAX_BYTES keeping TRAFFIC_CAPTURE_BACKUPS old files.
+# Replay with python -m backend.benchmarks.replay
+TRAFFIC_CAPTURE = os.getenv('TRAFFIC_CAPTURE', 'false').lower() == 'true'
+TRAFFIC_SAMPLE_RATE = float(os.getenv('TRAFFIC_SAMPLE_RATE', '0.01'))
+TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH', 'traffic/requests.jsonl')
+TRAFFIC_CAPTURE_MAX_BYTES = int(os.getenv('TRAFFIC_CAPTURE_MAX_BYTES', str(50 * 1024 * 1024)))
+TRAFFIC_CAPTURE_BACKUPS = 5
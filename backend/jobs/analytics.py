@@ -0,0 +1,130 @@
+"""Daily platform analytics.
+
+Aggregates instant_bookings, subscriptions and payments into one compact
+summary document per day in daily_analytics, which is all the admin
+analytics endpoint reads. Run nightly from cron:
+
+    python -m backend.jobs.analytics            # incremental
+    python -m backend.jobs.analytics 2024-01-01 # backfill from a date
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+from itertools import chain
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import InstantBooking, Subscription, Payment, DailyAnalytics
+from backend.config import ANALYTICS_REFRESH_DAYS
+
+DAY = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
+
+
+def empty_summary(date):
+    """Summary for a day with no activity"""
+    return {
+        'date': date,
+        'bookings': {'total': 0, 'completed': 0, 'conversion_rate': 0.0,
+                     'by_service_type': {}, 'by_status': {}},
+        'subscriptions': {'total': 0, 'by_plan': {}},
+        'revenue': {'total': 0, 'payments': 0, 'by_type': {}}
+    }
+
+
+def group_by_day(collection, start, end, keys, match=None, amount=None):
+    """Count (and optionally sum amount) per day and key fields for created_at in [start, end)"""
+    query = {'created_at': {'$gte': start, '$lt': end}}
+    query.update(match or {})
+    group = {
+        '_id': dict({'day': DAY}, **{k: f'${k}' for k in keys}),
+        'count': {'$sum': 1}
+    }
+    if amount:
+        group['amount'] = {'$sum': f'${amount}'}
+    return collection.aggregate([{'$match': query}, {'$group': group}])
+
+
+def summarize(start, end):
+    """Build summaries for every day in [start, end), keyed by YYYY-MM-DD"""
+    days = {}
+    day = start
+    while day < end:
+        key = day.strftime('%Y-%m-%d')
+        days[key] = empty_summary(key)
+        day += timedelta(days=1)
+
+    booking_rows = chain(*(group_by_day(c, start, end, ['service_type', 'status'])
+                           for c in (InstantBooking.collection, InstantBooking.archive)))
+    for row in booking_rows:
+        bookings = days[row['_id']['day']]['bookings']
+        service_type = row['_id'].get('service_type') or 'unknown'
+        status = row['_id'].get('status') or 'unknown'
+        bookings['total'] += row['count']
+        bookings['by_service_type'][service_type] = bookings['by_service_type'].get(service_type, 0) + row['count']
+        bookings['by_status'][status] = bookings['by_status'].get(status, 0) + row['count']
+        if status == 'completed':
+            bookings['completed'] += row['count']
+
+    for row in group_by_day(Subscription.collection, start, end, ['plan']):
+        subscriptions = days[row['_id']['day']]['subscriptions']
+        plan = row['_id'].get('plan') or 'unknown'
+        subscriptions['total'] += row['count']
+        subscriptions['by_plan'][plan] = subscriptions['by_plan'].get(plan, 0) + row['count']
+
+    payment_rows = chain(*(group_by_day(c, start, end, ['type'], match={'status': 'success'}, amount='amount')
+                           for c in (Payment.collection, Payment.archive)))
+    for row in payment_rows:
+        revenue = days[row['_id']['day']]['revenue']
+        payment_type = row['_id'].get('type') or 'unknown'
+        revenue['total'] += row['amount']
+        revenue['payments'] += row['count']
+        revenue['by_type'][payment_type] = revenue['by_type'].get(payment_type, 0) + row['amount']
+
+    for summary in days.values():
+        bookings = summary['bookings']
+        if bookings['total']:
+            bookings['conversion_rate'] = round(bookings['completed'] / bookings['total'], 4)
+
+    return days
+
+
+def earliest_activity():
+    """Oldest created_at across the source collections, or None"""
+    dates = []
+    for collection in (InstantBooking.collection, InstantBooking.archive, Subscription.collection,
+                       Payment.collection, Payment.archive):
+        first = collection.find_one({'created_at': {'$ne': None}}, {'created_at': 1}, sort=[('created_at', 1)])
+        if first:
+            dates.append(first['created_at'])
+    return min(dates) if dates else None
+
+
+def refresh(start=None, earliest=None):
+    """Recompute daily summaries from start (or incrementally) through today.
+
+    Without start, resumes from the last summarized day, always going back
+    ANALYTICS_REFRESH_DAYS so late status changes are reflected. earliest,
+    if given, bounds how far back either goes. Returns the number of days
+    written.
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    if start is None:
+        latest = DailyAnalytics.latest_date()
+        window_start = today - timedelta(days=ANALYTICS_REFRESH_DAYS - 1)
+        if latest:
+            start = min(datetime.strptime(latest, '%Y-%m-%d'), window_start)
+        else:
+            start = earliest_activity() or today
+    if earliest:
+        start = max(start, earliest)
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    summaries = summarize(start, today + timedelta(days=1))
+    for summary in summaries.values():
+        DailyAnalytics.upsert(summary)
+    return len(summaries)
+
+
+if __name__ == '__main__':
+    start = datetime.strptime(sys.argv[1], '%Y-%m-%d') if len(sys.argv) > 1 else None
+    print(f"Wrote {refresh(start)} daily summaries")
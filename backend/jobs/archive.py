@@ -0,0 +1,41 @@
+"""Hot/cold tiering for bookings and payments.
+
+Moves completed/cancelled bookings and settled payments older than
+ARCHIVE_AFTER_DAYS into instant_bookings_archive / payments_archive in
+batches, keeping the hot collections and their indexes bounded. Each batch
+is copied before it is deleted, so the job can be stopped and rerun at any
+point. Run nightly from cron:
+
+    python -m backend.jobs.archive [days]
+"""
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import InstantBooking, Payment
+from backend.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+
+def archive(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, pause=0.1):
+    """Archive everything older than days; returns {collection: documents moved}"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = {}
+    for name, model in (('instant_bookings', InstantBooking), ('payments', Payment)):
+        moved[name] = 0
+        while True:
+            count = model.archive_before(cutoff, batch_size)
+            moved[name] += count
+            if count < batch_size:
+                break
+            # Yield to foreground traffic between batches
+            time.sleep(pause)
+    return moved
+
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    for name, count in archive(days).items():
+        print(f"Archived {count} {name}")
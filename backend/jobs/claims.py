@@ -0,0 +1,31 @@
+import threading
+import time
+from backend.models import InstantBooking
+from backend.config import CLAIM_SWEEP_INTERVAL
+
+
+def sweep_expired_claims():
+    """Return bookings with expired claim leases to the pending pool"""
+    released = InstantBooking.release_expired_claims()
+    if released:
+        print(f"Released {released} expired booking claim(s)")
+    return released
+
+
+def start_claim_sweeper(interval=CLAIM_SWEEP_INTERVAL):
+    """Run sweep_expired_claims every interval seconds on a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep_expired_claims()
+            except Exception as e:
+                print(f"Claim sweeper error: {type(e).__name__}: {str(e)}")
+
+    thread = threading.Thread(target=run, name='claim-sweeper', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    sweep_expired_claims()
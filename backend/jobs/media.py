@@ -0,0 +1,118 @@
+"""Background processing for uploaded booking media.
+
+Uploads are stored as-is and queued with status 'uploaded'; this worker
+claims them one at a time and adds derived renditions:
+
+- images get a JPEG 'thumbnail' (needs Pillow)
+- voice notes get a 'compressed' mono Opus copy (needs ffmpeg on PATH)
+
+When a tool is missing the rendition is skipped and the original is
+served instead. Run once from the command line with:
+
+    python -m backend.jobs.media
+"""
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import Media
+from backend.config import (MEDIA_CHUNK_BYTES, MEDIA_THUMBNAIL_SIZE, MEDIA_AUDIO_BITRATE,
+                            MEDIA_POLL_SECONDS, MEDIA_STALE_SECONDS)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FFMPEG_TIMEOUT = 120
+
+# Set by the upload route so new media is processed without waiting a poll
+pending = threading.Event()
+
+
+def make_thumbnail(media):
+    """Store a JPEG thumbnail rendition of an image"""
+    if Image is None:
+        return False
+    stream, _ = Media.open(media)
+    with Image.open(stream) as image:
+        image.thumbnail(MEDIA_THUMBNAIL_SIZE)
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', quality=80, optimize=True)
+    buffer.seek(0)
+    file_id, size = Media.upload(buffer, f"thumb-{media['filename']}", 'image/jpeg', MEDIA_CHUNK_BYTES)
+    Media.add_rendition(media['_id'], 'thumbnail', file_id, 'image/jpeg', size)
+    return True
+
+
+def compress_audio(media):
+    """Store a compressed mono Opus rendition of a voice note"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return False
+    stream, _ = Media.open(media)
+    with tempfile.NamedTemporaryFile() as source, tempfile.NamedTemporaryFile(suffix='.ogg') as target:
+        shutil.copyfileobj(stream, source, MEDIA_CHUNK_BYTES)
+        source.flush()
+        subprocess.run(
+            [ffmpeg, '-y', '-loglevel', 'error', '-i', source.name,
+             '-vn', '-ac', '1', '-c:a', 'libopus', '-b:a', MEDIA_AUDIO_BITRATE, target.name],
+            check=True, capture_output=True, timeout=FFMPEG_TIMEOUT
+        )
+        target.seek(0)
+        file_id, size = Media.upload(target, f"{media['filename']}.ogg", 'audio/ogg', MEDIA_CHUNK_BYTES)
+    Media.add_rendition(media['_id'], 'compressed', file_id, 'audio/ogg', size)
+    return True
+
+
+PROCESSORS = {
+    'image': make_thumbnail,
+    'audio': compress_audio
+}
+
+
+def process(media):
+    """Build the renditions for one claimed upload and mark it ready or failed"""
+    try:
+        PROCESSORS[media['kind']](media)
+        Media.finish(media['_id'], 'ready')
+    except Exception as e:
+        print(f"Media {media['_id']} processing failed: {type(e).__name__}: {str(e)}")
+        Media.finish(media['_id'], 'failed', str(e))
+
+
+def process_pending():
+    """Process queued uploads until none are left; returns how many were handled"""
+    count = 0
+    while True:
+        media = Media.claim_next(MEDIA_STALE_SECONDS)
+        if not media:
+            return count
+        process(media)
+        count += 1
+
+
+def start_media_worker(interval=MEDIA_POLL_SECONDS):
+    """Process uploads on a daemon thread, woken by new uploads or every interval seconds"""
+    def run():
+        while True:
+            pending.wait(interval)
+            pending.clear()
+            try:
+                process_pending()
+            except Exception as e:
+                print(f"Media worker error: {type(e).__name__}: {str(e)}")
+
+    thread = threading.Thread(target=run, name='media-worker', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    print(f"Processed {process_pending()} upload(s)")
@@ -0,0 +1,140 @@
+"""Online migration to the compact storage schema.
+
+customer_id, provider_id, user_id, service_id, subscription_id and
+booking_id used to be stored as 24-character hex strings. ObjectIds take
+12 bytes instead of ~29, in documents and in every index on those fields.
+The model layer writes ObjectIds and, while DUAL_READ_REFS is on, matches
+both forms, so this can run against live traffic:
+
+    python -m backend.jobs.migrate_refs
+
+Each batch only rewrites a field if it still holds the string it was read
+with, so concurrent writes are never overwritten. When it reports no
+remaining documents, set DUAL_READ_REFS=false.
+
+It also moves base64 images and voice notes stored inline in booking
+documents (hot and archive) into media storage, leaving image_id and
+voice_note_id behind, so booking reads no longer drag the bytes along.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pymongo import UpdateOne
+from backend.models import db, InstantBooking, Subscription, Payment, Tombstone, Service, Media, HEX_ID, ref
+from backend.config import MEDIA_CHUNK_BYTES
+
+REF_FIELDS = [
+    (InstantBooking.collection, ['customer_id', 'provider_id']),
+    (InstantBooking.archive, ['customer_id', 'provider_id']),
+    (Subscription.collection, ['customer_id', 'provider_id', 'service_id']),
+    (Payment.collection, ['user_id', 'provider_id', 'customer_id', 'subscription_id', 'booking_id']),
+    (Payment.archive, ['user_id', 'provider_id', 'customer_id', 'subscription_id', 'booking_id']),
+    (Service.collection, ['provider_id']),
+    (Tombstone.collection, ['customer_id', 'provider_id', 'user_id'])
+]
+
+
+def collection_sizes(collection):
+    """Document count, data size and index size in bytes (None where the server cannot say)"""
+    try:
+        stats = db.command('collStats', collection.name)
+    except Exception:
+        return {'count': collection.estimated_document_count(), 'size': None, 'index_size': None}
+    return {
+        'count': stats.get('count'),
+        'size': stats.get('size'),
+        'index_size': stats.get('totalIndexSize')
+    }
+
+
+def migrate_collection(collection, fields, batch_size=1000):
+    """Convert hex-string references in one collection; returns documents updated"""
+    legacy = {'$or': [{f: {'$type': 'string', '$regex': HEX_ID.pattern}} for f in fields]}
+    updated = 0
+    while True:
+        docs = list(collection.find(legacy, {f: 1 for f in fields}).limit(batch_size))
+        if not docs:
+            return updated
+        ops = []
+        for doc in docs:
+            stale = {f: doc[f] for f in fields if isinstance(doc.get(f), str) and HEX_ID.match(doc[f])}
+            ops.append(UpdateOne(
+                dict(stale, _id=doc['_id']),
+                {'$set': {f: ref(value) for f, value in stale.items()}}
+            ))
+        result = collection.bulk_write(ops, ordered=False)
+        updated += result.modified_count
+        if result.modified_count == 0:
+            # Every candidate changed under us; pick them up on the next run
+            return updated
+
+
+# Inline booking field -> media reference field, and the media kind
+MEDIA_FIELDS = [('image', 'image_id', 'image'), ('voice_note', 'voice_note_id', 'audio')]
+
+
+def move_media(collection, doc):
+    """Store one booking's inline media and swap it for references; returns True if rewritten"""
+    inline = [(f, id_field, kind) for f, id_field, kind in MEDIA_FIELDS if f in doc]
+    if not inline:
+        return False
+    stored = {}
+    try:
+        for field, id_field, kind in inline:
+            if doc[field]:
+                stored[id_field] = Media.from_inline(kind, doc[field], MEDIA_CHUNK_BYTES)
+    except ValueError as e:
+        print(f"{collection.name} {doc['_id']}: {field} left inline: {str(e)}")
+    else:
+        update = {'$unset': {f: '' for f, _, _ in inline}}
+        if stored:
+            update['$set'] = {id_field: media['_id'] for id_field, media in stored.items()}
+        if collection.update_one(dict({f: doc[f] for f, _, _ in inline}, _id=doc['_id']), update).modified_count:
+            return True
+    # Undecodable, or the booking changed under us: drop what was stored
+    for media in stored.values():
+        Media.files.delete(media['file_id'])
+        Media.discard(media['_id'])
+    return False
+
+
+def migrate_media(collection, batch_size=1000):
+    """Move inline media out of one booking collection; returns documents rewritten"""
+    fields = [f for f, _, _ in MEDIA_FIELDS]
+    legacy = {'$or': [{f: {'$exists': True}} for f in fields]}
+    updated = 0
+    last = None
+    while True:
+        query = dict(legacy, _id={'$gt': last}) if last else legacy
+        docs = list(collection.find(query, {f: 1 for f in fields}).sort('_id', 1).limit(batch_size))
+        if not docs:
+            return updated
+        updated += sum(move_media(collection, doc) for doc in docs)
+        last = docs[-1]['_id']
+
+
+def fmt(size):
+    return f"{size / 1e6:.2f} MB" if size is not None else 'n/a'
+
+
+def migrate(batch_size=1000):
+    """Migrate every collection, printing before/after sizes"""
+    for collection, fields in REF_FIELDS:
+        before = collection_sizes(collection)
+        updated = migrate_collection(collection, fields, batch_size)
+        after = collection_sizes(collection)
+        print(f"{collection.name}: {updated}/{before['count']} documents rewritten; "
+              f"data {fmt(before['size'])} -> {fmt(after['size'])}, "
+              f"indexes {fmt(before['index_size'])} -> {fmt(after['index_size'])}")
+    for collection in (InstantBooking.collection, InstantBooking.archive):
+        before = collection_sizes(collection)
+        updated = migrate_media(collection, batch_size)
+        after = collection_sizes(collection)
+        print(f"{collection.name}: inline media moved out of {updated}/{before['count']} documents; "
+              f"data {fmt(before['size'])} -> {fmt(after['size'])}")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,96 @@
+"""Provider notification digests.
+
+New bookings and subscriptions are queued in the notifications
+collection per provider. This job claims everything queued, renders one
+digest per provider and sends them all over a single SMTP session; urgent
+bookings wake the flusher so those providers are sent to straight away.
+Failed sends are retried on the next flush, up to NOTIFY_MAX_ATTEMPTS.
+Run once from the command line with:
+
+    python -m backend.jobs.notifications
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import User, Notification, is_ref, ref
+from backend.utils.mail import send_batch
+from backend.utils.metrics import metrics
+from backend.utils.notifications import render_digest
+from backend.config import (NOTIFY_DIGEST_SECONDS, NOTIFY_DIGEST_MAX_ITEMS, NOTIFY_SEND_LEASE_SECONDS,
+                            NOTIFY_MAX_ATTEMPTS)
+
+# Set when an urgent booking is queued so the flusher sends it without waiting a window
+urgent = threading.Event()
+
+
+def flush(urgent_only=False):
+    """Send one digest per provider with queued notifications; returns the number sent"""
+    provider_ids = Notification.urgent_providers() if urgent_only else None
+    if urgent_only and not provider_ids:
+        return 0
+    batch = Notification.claim_batch(NOTIFY_SEND_LEASE_SECONDS, provider_ids)
+    if not batch:
+        return 0
+
+    by_provider = {}
+    for notification in batch:
+        by_provider.setdefault(notification['provider_id'], []).append(notification)
+    # Placeholder ids (e.g. the frontend's mock providers) are not looked up
+    providers = {p['_id']: p for p in User.find_by_ids([p for p in by_provider if is_ref(p)])}
+
+    digests = []
+    for provider_id, notifications in by_provider.items():
+        provider = providers.get(ref(provider_id))
+        if not provider or not provider.get('email'):
+            # Nobody to send to; give up on these rather than retrying
+            Notification.mark_failed([n['_id'] for n in notifications], 0)
+            continue
+        subject, body = render_digest(provider, notifications, NOTIFY_DIGEST_MAX_ITEMS)
+        digests.append((provider['email'], subject, body, notifications))
+
+    results = send_batch([(to, subject, body) for to, subject, body, _ in digests])
+    now = datetime.utcnow()
+    sent = 0
+    for (_, _, _, notifications), ok in zip(digests, results):
+        ids = [n['_id'] for n in notifications]
+        if not ok:
+            Notification.mark_failed(ids, NOTIFY_MAX_ATTEMPTS)
+            metrics.incr('notifications.failed_digests')
+            continue
+        Notification.mark_sent(ids)
+        sent += 1
+        metrics.incr('notifications.digests_sent')
+        metrics.observe('notifications.batch_size', len(notifications))
+        for n in notifications:
+            metrics.observe('notifications.latency_seconds', (now - n['created_at']).total_seconds())
+    return sent
+
+
+def start_notification_flusher(interval=NOTIFY_DIGEST_SECONDS):
+    """Flush digests every interval seconds on a daemon thread, and immediately for urgent bookings"""
+    def run():
+        next_flush = time.monotonic() + interval
+        while True:
+            woken = urgent.wait(max(0.0, next_flush - time.monotonic()))
+            urgent.clear()
+            try:
+                if woken:
+                    flush(urgent_only=True)
+                else:
+                    next_flush = time.monotonic() + interval
+                    flush()
+            except Exception as e:
+                print(f"Notification flusher error: {type(e).__name__}: {str(e)}")
+
+    thread = threading.Thread(target=run, name='notification-flusher', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    print(f"Sent {flush()} digest(s)")
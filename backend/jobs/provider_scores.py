@@ -0,0 +1,43 @@
+"""Rebuild provider score counters from the bookings collection.
+
+Scores are normally maintained incrementally as bookings change; run this
+once to backfill providers from existing history, or to repair drift:
+
+    python -m backend.jobs.provider_scores
+"""
+import sys
+import os
+from itertools import chain
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import InstantBooking, ProviderScore, ref_str
+
+COUNTERS = ['accepted', 'completed', 'open_load', 'thumbs_up', 'thumbs_down']
+
+
+def rebuild():
+    """Recount every provider's counters; response times are kept as recorded"""
+    counters = {}
+    bookings = chain(*(
+        collection.find(
+            {'provider_id': {'$nin': [None, '']}},
+            {'provider_id': 1, 'status': 1, 'feedback': 1}
+        ).batch_size(1000)
+        for collection in (InstantBooking.collection, InstantBooking.archive)
+    ))
+    for booking in bookings:
+        counts = counters.setdefault(ref_str(booking['provider_id']), dict.fromkeys(COUNTERS, 0))
+        for counter, statuses in ProviderScore.STATUS_COUNTERS.items():
+            if booking.get('status') in statuses:
+                counts[counter] += 1
+        if booking.get('feedback') in ('thumbs_up', 'thumbs_down'):
+            counts[booking['feedback']] += 1
+
+    for provider_id, counts in counters.items():
+        ProviderScore.reset(provider_id, counts)
+    return len(counters)
+
+
+if __name__ == '__main__':
+    print(f"Rebuilt scores for {rebuild()} providers")
@@ -1,10 +1,71 @@
-from pymongo import MongoClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from itertools import chain
 from datetime import datetime, timedelta
 from bson import ObjectId
+import base64
+import binascii
 import bcrypt
+import io
+import re
+from backend.utils.sync import SYNC_RETENTION, sync_window
+from backend.config import DUAL_READ_REFS, IDEMPOTENCY_TTL_SECONDS
+from backend import storage
 
-client = MongoClient('mongodb://localhost:27017/')
-db = client['local_service_platform']
+db = storage.connect()
+
+HEX_ID = re.compile(r'^[0-9a-f]{24}$')
+
+
+def ref(value):
+    """Compact form of a document reference: 24-hex ids are stored as ObjectId"""
+    if isinstance(value, str) and HEX_ID.match(value):
+        return ObjectId(value)
+    return value
+
+
+def is_ref(value):
+    """True if value is an ObjectId or its 24-hex string form"""
+    return isinstance(ref(value), ObjectId)
+
+
+def ref_match(value):
+    """Query value matching a reference stored in either form.
+    
+    Until the ObjectId migration has run everywhere (DUAL_READ_REFS), old
+    documents still hold references as hex strings.
+    """
+    compact = ref(value)
+    if DUAL_READ_REFS and isinstance(compact, ObjectId):
+        return {'$in': [compact, str(compact)]}
+    return compact
+
+
+def ref_str(value):
+    """API form of a stored reference"""
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+# Callbacks run after a document is written, keyed by kind ('user',
+# 'booking', 'subscription', 'payment'); used to keep in-process indexes
+# and caches in step with writes made by this worker
+_write_hooks = {}
+
+
+def on_write(kind, hook):
+    """Register hook(doc) to run after each write of a kind of document"""
+    _write_hooks.setdefault(kind, []).append(hook)
+
+
+def notify_write(kind, doc):
+    """Run the write hooks for a document; hook failures never fail the write"""
+    if not doc:
+        return
+    for hook in _write_hooks.get(kind, []):
+        try:
+            hook(doc)
+        except Exception as e:
+            print(f"Write hook error ({kind}): {type(e).__name__}: {str(e)}")
 
 class User:
     collection = db['users']
@@ -15,6 +76,7 @@ class User:
         password = data.get('password', '')
         password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
         
+        now = datetime.utcnow()
         user = {
             'name': data.get('name'),
             'email': data.get('email'),
@@ -28,11 +90,13 @@ class User:
             'service_type': data.get('serviceType'),
             'service_area': data.get('serviceArea'),
             'status': 'pending' if data.get('role') == 'provider' else 'active',
-            'created_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
         
         result = User.collection.insert_one(user)
         user['_id'] = result.inserted_id
+        notify_write('user', user)
         return user
     
     @staticmethod
@@ -45,6 +109,29 @@ class User:
         """Find user by ID"""
         return User.collection.find_one({'_id': ObjectId(user_id)})
     
+    @staticmethod
+    def find_by_ids(user_ids):
+        """Find users by ID, in the order given"""
+        users = {u['_id']: u for u in User.collection.find({'_id': {'$in': [ObjectId(i) for i in user_ids]}})}
+        return [users[ObjectId(i)] for i in user_ids if ObjectId(i) in users]
+    
+    @staticmethod
+    def find_providers(since=None):
+        """Cursor over provider profiles, optionally only those changed since a sync point"""
+        query = {'role': 'provider'}
+        if since:
+            query['updated_at'] = {'$gt': sync_window(since)}
+        return User.collection.find(query, {'password_hash': 0, 'otp': 0, 'otp_expiry': 0})
+    
+    @staticmethod
+    def find_providers_for(service_type):
+        """Verified providers offering a service type (case-insensitive)"""
+        return list(User.collection.find(
+            {'role': 'provider', 'verified': True,
+             'service_type': {'$regex': f'^{re.escape(service_type or "")}$', '$options': 'i'}},
+            {'_id': 1, 'name': 1, 'email': 1}
+        ))
+    
     @staticmethod
     def update_otp(email, otp):
         """Update user OTP and expiry (5 minutes)"""
@@ -99,64 +186,260 @@ class User:
 
 class InstantBooking:
     collection = db['instant_bookings']
+    archive = db['instant_bookings_archive']
+    
+    # Columns for finance exports; media fields are deliberately left out
+    EXPORT_FIELDS = [
+        'customer_id', 'customer_name', 'service_type', 'description', 'address',
+        'phone', 'status', 'provider_id', 'provider_name', 'price', 'quote',
+        'feedback', 'feedback_message', 'created_at', 'updated_at'
+    ]
+    
+    # API field -> stored field, for ?fields= sparse responses
+    FIELDS = {
+        'id': '_id', 'customer_id': 'customer_id', 'customer_name': 'customer_name',
+        'service_type': 'service_type', 'description': 'description', 'image': 'image',
+        'voice_note': 'voice_note', 'image_id': 'image_id', 'voice_note_id': 'voice_note_id',
+        'address': 'address', 'phone': 'phone', 'urgent': 'urgent', 'status': 'status',
+        'provider_id': 'provider_id', 'provider_name': 'provider_name', 'price': 'price',
+        'quote': 'quote', 'feedback': 'feedback', 'feedback_message': 'feedback_message',
+        'claim_expires_at': 'claim_expires_at', 'visit_at': 'visit_at', 'created_at': 'created_at'
+    }
+    
+    # Fields the visit schedule index keeps for accepted bookings
+    SCHEDULE_FIELDS = ['provider_id', 'customer_name', 'service_type', 'status', 'visit_at']
+    
+    # Statuses only the provider holding (or taking) a booking may set
+    PROVIDER_STATUSES = ['accepted', 'rejected', 'completed']
     
     @staticmethod
     def create(data):
         """Create a new instant booking"""
+        now = datetime.utcnow()
         booking = {
-            'customer_id': data.get('customerId'),
+            'customer_id': ref(data.get('customerId')),
             'customer_name': data.get('customerName'),
             'service_type': data.get('serviceType'),
             'description': data.get('description'),
-            'image': data.get('image'),
-            'voice_note': data.get('voiceNote'),
+            'image_id': ref(data.get('imageId')),
+            'voice_note_id': ref(data.get('voiceNoteId')),
             'address': data.get('address'),
             'phone': data.get('phone'),
+            'urgent': bool(data.get('urgent')),
             'status': 'pending',
-            'provider_id': data.get('providerId'),
+            'provider_id': ref(data.get('providerId')),
             'provider_name': data.get('providerName'),
             'price': data.get('price'),
             'quote': data.get('quote'),
             'feedback': data.get('feedback'),
             'feedback_message': data.get('feedbackMessage'),
-            'created_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
         
         result = InstantBooking.collection.insert_one(booking)
         booking['_id'] = result.inserted_id
+        notify_write('booking', booking)
         return booking
     
     @staticmethod
-    def find_by_id(booking_id):
-        """Find booking by ID"""
-        return InstantBooking.collection.find_one({'_id': ObjectId(booking_id)})
+    def find_by_id(booking_id, projection=None):
+        """Find booking by ID, falling back to the archive"""
+        query = {'_id': ObjectId(booking_id)}
+        return (InstantBooking.collection.find_one(query, projection)
+                or InstantBooking.archive.find_one(query, projection))
     
     @staticmethod
-    def find_by_customer(customer_id):
-        """Find all bookings for a customer"""
-        return list(InstantBooking.collection.find({'customer_id': customer_id}).sort('created_at', -1))
+    def find_by_ids(booking_ids):
+        """Find bookings by ID, in the order given, falling back to the archive"""
+        ids = [ObjectId(i) for i in booking_ids]
+        bookings = {b['_id']: b for b in InstantBooking.collection.find({'_id': {'$in': ids}})}
+        missing = [i for i in ids if i not in bookings]
+        if missing:
+            bookings.update((b['_id'], b) for b in InstantBooking.archive.find({'_id': {'$in': missing}}))
+        return [bookings[i] for i in ids if i in bookings]
     
     @staticmethod
-    def find_by_provider(provider_id):
-        """Find all bookings for a provider"""
-        return list(InstantBooking.collection.find(
-            {'$or': [{'provider_id': provider_id}, {'status': 'pending'}]}
-        ).sort('created_at', -1))
+    def find_for_search(since=None):
+        """Cursor over bookings without media, optionally only those changed since a sync point"""
+        query = {}
+        if since:
+            query['updated_at'] = {'$gt': sync_window(since)}
+        return InstantBooking.collection.find(query, {'image': 0, 'voice_note': 0}).batch_size(1000)
     
     @staticmethod
-    def find_all_pending():
+    def find_for_schedule(since=None):
+        """Cursor over accepted bookings' visit fields, or all bookings changed since a sync point"""
+        query = {'status': 'accepted'}
+        if since:
+            query = {'updated_at': {'$gt': sync_window(since)}}
+        return InstantBooking.collection.find(query, {f: 1 for f in InstantBooking.SCHEDULE_FIELDS})
+    
+    @staticmethod
+    def find_by_customer(customer_id, skip=0, limit=None, projection=None):
+        """Find bookings for a customer, newest first (archive only past the hot window)"""
+        return find_tiered(InstantBooking.collection, InstantBooking.archive,
+                           {'customer_id': ref_match(customer_id)}, skip, limit, projection)
+    
+    @staticmethod
+    def find_by_provider(provider_id, skip=0, limit=None, projection=None):
+        """Find bookings for a provider plus pending ones (archive only past the hot window)"""
+        return find_tiered(InstantBooking.collection, InstantBooking.archive,
+                           {'$or': [{'provider_id': ref_match(provider_id)}, {'status': 'pending'}]},
+                           skip, limit, projection)
+    
+    @staticmethod
+    def find_all_pending(projection=None):
         """Find all pending bookings"""
-        return list(InstantBooking.collection.find({'status': 'pending'}).sort('created_at', -1))
+        return list(InstantBooking.collection.find({'status': 'pending'}, projection).sort('created_at', -1))
+    
+    @staticmethod
+    def find_changes_by_customer(customer_id, since, projection=None):
+        """Find a customer's bookings changed since a sync point"""
+        return find_changes(InstantBooking.collection, 'booking', {'customer_id': ref_match(customer_id)}, since,
+                            projection=projection)
+    
+    @staticmethod
+    def find_changes_by_provider(provider_id, since, projection=None):
+        """Find a provider's bookings (and pending ones) changed since a sync point"""
+        return find_changes(
+            InstantBooking.collection, 'booking',
+            {'$or': [{'provider_id': ref_match(provider_id)}, {'status': 'pending'}]}, since,
+            scope={'$or': [{'provider_id': ref_match(provider_id)}, InstantBooking.unlisted_since(since)]},
+            projection=projection
+        )
+    
+    @staticmethod
+    def find_pending_changes(since, projection=None):
+        """Find pending bookings changed since a sync point"""
+        return find_changes(InstantBooking.collection, 'booking', {'status': 'pending'}, since,
+                            scope=InstantBooking.unlisted_since(since), projection=projection)
+    
+    @staticmethod
+    def unlisted_since(since):
+        """Condition matching bookings that left the pending pool since a sync point"""
+        return {'unlisted_at': {'$gt': sync_window(since)}}
+    
+    @staticmethod
+    def mark_unlisted(before, after, session=None):
+        """Stamp a booking that just left the pending pool, so pollers of the pool drop it"""
+        if before and after and before.get('status') == 'pending' and after.get('status') != 'pending':
+            InstantBooking.collection.update_one(
+                {'_id': before['_id'], 'status': {'$ne': 'pending'}},
+                {'$set': {'unlisted_at': after['updated_at']}},
+                session=session
+            )
     
     @staticmethod
     def update(booking_id, updates):
         """Update a booking"""
+        if 'provider_id' in updates:
+            updates['provider_id'] = ref(updates['provider_id'])
         updates['updated_at'] = datetime.utcnow()
-        InstantBooking.collection.update_one(
+        before = InstantBooking.collection.find_one_and_update(
             {'_id': ObjectId(booking_id)},
             {'$set': updates}
         )
-        return InstantBooking.find_by_id(booking_id)
+        booking = InstantBooking.find_by_id(booking_id)
+        InstantBooking.mark_unlisted(before, booking)
+        if booking and updates.get('status') == 'cancelled':
+            Tombstone.record('booking', booking, 'cancelled')
+        notify_write('booking', booking)
+        return booking
+    
+    @staticmethod
+    def export_cursor(start=None, end=None, provider_id=None, batch_size=1000):
+        """Cursor over bookings for export without media, archive first, each tier oldest first"""
+        return chain(*(
+            collection.find(
+                export_query(start, end, provider_id),
+                {f: 1 for f in InstantBooking.EXPORT_FIELDS}
+            ).sort('created_at', 1).batch_size(batch_size)
+            for collection in (InstantBooking.archive, InstantBooking.collection)
+        ))
+    
+    @staticmethod
+    def archive_before(cutoff, batch_size):
+        """Move one batch of completed/cancelled bookings created before cutoff to the archive"""
+        return archive_batch(InstantBooking.collection, InstantBooking.archive, {
+            'status': {'$in': ['completed', 'cancelled']},
+            'created_at': {'$lt': cutoff}
+        }, batch_size)
+    
+    @staticmethod
+    def update_if(booking_id, condition, updates):
+        """Update a booking only if it still matches condition.
+        
+        Returns the updated booking, or None if another writer got there first.
+        """
+        if 'provider_id' in updates:
+            updates['provider_id'] = ref(updates['provider_id'])
+        updates['updated_at'] = datetime.utcnow()
+        before = InstantBooking.collection.find_one_and_update(
+            {'$and': [{'_id': ObjectId(booking_id)}, condition]},
+            {'$set': updates}
+        )
+        if not before:
+            return None
+        booking = dict(before, **updates)
+        InstantBooking.mark_unlisted(before, booking)
+        notify_write('booking', booking)
+        return booking
+    
+    @staticmethod
+    def claimable():
+        """Condition matching bookings no provider currently holds"""
+        return {'$or': [
+            {'status': 'pending'},
+            {'status': 'claimed', 'claim_expires_at': {'$lte': datetime.utcnow()}}
+        ]}
+    
+    @staticmethod
+    def acceptable_by(provider_id):
+        """Condition matching bookings provider_id may accept: unclaimed, or already held by them"""
+        return {'$or': [
+            InstantBooking.claimable(),
+            {'status': {'$in': ['claimed', 'accepted']}, 'provider_id': ref_match(provider_id)}
+        ]}
+    
+    @staticmethod
+    def claim(booking_id, provider_id, provider_name, lease_seconds):
+        """Atomically claim a pending booking for a provider under a time-limited lease.
+        
+        A booking whose lease has run out is claimable again even before the
+        sweeper reverts it. Returns the claimed booking, or None if it is taken.
+        """
+        return InstantBooking.update_if(booking_id, InstantBooking.claimable(), {
+            'status': 'claimed',
+            'provider_id': provider_id,
+            'provider_name': provider_name,
+            'claim_expires_at': datetime.utcnow() + timedelta(seconds=lease_seconds)
+        })
+    
+    @staticmethod
+    def release_claim(booking_id, provider_id):
+        """Give a claimed booking back to the pending pool"""
+        booking = InstantBooking.collection.find_one_and_update(
+            {'_id': ObjectId(booking_id), 'status': 'claimed', 'provider_id': ref_match(provider_id)},
+            {'$set': {'status': 'pending', 'provider_id': None, 'provider_name': None,
+                      'updated_at': datetime.utcnow()},
+             '$unset': {'claim_expires_at': 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        notify_write('booking', booking)
+        return booking
+    
+    @staticmethod
+    def release_expired_claims():
+        """Revert every claim whose lease has expired to pending"""
+        now = datetime.utcnow()
+        result = InstantBooking.collection.update_many(
+            {'status': 'claimed', 'claim_expires_at': {'$lte': now}},
+            {'$set': {'status': 'pending', 'provider_id': None, 'provider_name': None,
+                      'updated_at': now},
+             '$unset': {'claim_expires_at': 1}}
+        )
+        return result.modified_count
     
     @staticmethod
     def to_dict(booking):
@@ -165,21 +448,26 @@ class InstantBooking:
             return None
         return {
             'id': str(booking['_id']),
-            'customer_id': booking.get('customer_id'),
+            'customer_id': ref_str(booking.get('customer_id')),
             'customer_name': booking.get('customer_name'),
             'service_type': booking.get('service_type'),
             'description': booking.get('description'),
             'image': booking.get('image'),
             'voice_note': booking.get('voice_note'),
+            'image_id': ref_str(booking.get('image_id')),
+            'voice_note_id': ref_str(booking.get('voice_note_id')),
             'address': booking.get('address'),
             'phone': booking.get('phone'),
+            'urgent': booking.get('urgent', False),
             'status': booking.get('status'),
-            'provider_id': booking.get('provider_id'),
+            'provider_id': ref_str(booking.get('provider_id')),
             'provider_name': booking.get('provider_name'),
             'price': booking.get('price'),
             'quote': booking.get('quote'),
             'feedback': booking.get('feedback'),
             'feedback_message': booking.get('feedback_message'),
+            'claim_expires_at': booking.get('claim_expires_at').isoformat() if booking.get('claim_expires_at') else None,
+            'visit_at': booking.get('visit_at').isoformat() if booking.get('visit_at') else None,
             'created_at': booking.get('created_at').isoformat() if booking.get('created_at') else None
         }
 
@@ -187,60 +475,107 @@ class InstantBooking:
 class Subscription:
     collection = db['subscriptions']
     
+    # API field -> stored field, for ?fields= sparse responses
+    FIELDS = {
+        'id': '_id', 'customer_id': 'customer_id', 'service_id': 'service_id', 'provider_id': 'provider_id',
+        'plan': 'plan', 'price': 'price', 'status': 'status', 'start_date': 'start_date',
+        'end_date': 'end_date', 'service_name': 'service_name', 'provider_name': 'provider_name',
+        'service_type': 'service_type', 'location': 'location', 'created_at': 'created_at'
+    }
+    
+    # Plan length in days
+    PLAN_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30, 'quarterly': 90, 'annual': 365}
+    
+    # Days between visits: daily visits on the short plans, weekly on the
+    # monthly and quarterly ones, monthly on the annual one
+    VISIT_DAYS = {'daily': 1, 'weekly': 1, 'monthly': 7, 'quarterly': 7, 'annual': 30}
+    
+    # Fields the visit schedule index keeps for active subscriptions
+    SCHEDULE_FIELDS = ['provider_id', 'customer_id', 'plan', 'status', 'start_date', 'end_date', 'service_name']
+    
     @staticmethod
     def create(data):
         """Create a new subscription"""
-        # Calculate duration in days based on plan
-        plan = data.get('plan', 'monthly')
-        duration_days = 1  # default for daily
-        if plan == 'weekly':
-            duration_days = 7
-        elif plan == 'monthly':
-            duration_days = 30
-        elif plan == 'quarterly':
-            duration_days = 90
-        elif plan == 'annual':
-            duration_days = 365
+        subscription = Subscription.build(data)
+        result = Subscription.collection.insert_one(subscription)
+        subscription['_id'] = result.inserted_id
+        notify_write('subscription', subscription)
+        return subscription
+    
+    @staticmethod
+    def build(data):
+        """New subscription document from request data (not yet stored)"""
+        # Calculate duration in days based on plan (default for daily)
+        duration_days = Subscription.PLAN_DAYS.get(data.get('plan', 'monthly'), 1)
         
+        now = datetime.utcnow()
+        # The first visit is at startDate when the caller parsed one, else now
+        start = data.get('startDate') if isinstance(data.get('startDate'), datetime) else now
         subscription = {
-            'customer_id': data.get('customerId'),
-            'service_id': data.get('serviceId'),
-            'provider_id': data.get('providerId'),
+            'customer_id': ref(data.get('customerId')),
+            'service_id': ref(data.get('serviceId')),
+            'provider_id': ref(data.get('providerId')),
             'plan': data.get('plan'),
             'price': data.get('price'),
             'status': 'active',
-            'start_date': datetime.utcnow(),
-            'end_date': datetime.utcnow() + timedelta(days=duration_days),
+            'start_date': start,
+            'end_date': start + timedelta(days=duration_days),
             'service_name': data.get('serviceName'),
             'provider_name': data.get('providerName'),
             'service_type': data.get('serviceType'),
             'location': data.get('location'),
-            'created_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
-        
-        result = Subscription.collection.insert_one(subscription)
-        subscription['_id'] = result.inserted_id
         return subscription
     
     @staticmethod
-    def find_by_id(subscription_id):
+    def find_by_id(subscription_id, projection=None):
         """Find subscription by ID"""
-        return Subscription.collection.find_one({'_id': ObjectId(subscription_id)})
+        return Subscription.collection.find_one({'_id': ObjectId(subscription_id)}, projection)
     
     @staticmethod
-    def find_by_customer(customer_id):
+    def find_by_customer(customer_id, projection=None):
         """Find all subscriptions for a customer"""
-        return list(Subscription.collection.find({'customer_id': customer_id}).sort('created_at', -1))
+        return list(Subscription.collection.find({'customer_id': ref_match(customer_id)}, projection)
+                    .sort('created_at', -1))
     
     @staticmethod
-    def find_by_provider(provider_id):
+    def find_by_provider(provider_id, projection=None):
         """Find all subscriptions for a provider"""
-        return list(Subscription.collection.find({'provider_id': provider_id}).sort('created_at', -1))
+        return list(Subscription.collection.find({'provider_id': ref_match(provider_id)}, projection)
+                    .sort('created_at', -1))
     
     @staticmethod
-    def find_all_active():
+    def find_all_active(projection=None):
         """Find all active subscriptions"""
-        return list(Subscription.collection.find({'status': 'active'}).sort('created_at', -1))
+        return list(Subscription.collection.find({'status': 'active'}, projection).sort('created_at', -1))
+    
+    @staticmethod
+    def find_for_schedule(since=None):
+        """Cursor over active subscriptions' visit fields, or all subscriptions changed since a sync point"""
+        query = {'status': 'active'}
+        if since:
+            query = {'updated_at': {'$gt': sync_window(since)}}
+        return Subscription.collection.find(query, {f: 1 for f in Subscription.SCHEDULE_FIELDS})
+    
+    @staticmethod
+    def find_changes_by_customer(customer_id, since, projection=None):
+        """Find a customer's subscriptions changed since a sync point"""
+        return find_changes(Subscription.collection, 'subscription', {'customer_id': ref_match(customer_id)}, since,
+                            projection=projection)
+    
+    @staticmethod
+    def find_changes_by_provider(provider_id, since, projection=None):
+        """Find a provider's subscriptions changed since a sync point"""
+        return find_changes(Subscription.collection, 'subscription', {'provider_id': ref_match(provider_id)}, since,
+                            projection=projection)
+    
+    @staticmethod
+    def find_active_changes(since, projection=None):
+        """Find active subscriptions changed since a sync point"""
+        return find_changes(Subscription.collection, 'subscription', {'status': 'active'}, since, scope={},
+                            projection=projection)
     
     @staticmethod
     def update(subscription_id, updates):
@@ -250,7 +585,11 @@ class Subscription:
             {'_id': ObjectId(subscription_id)},
             {'$set': updates}
         )
-        return Subscription.find_by_id(subscription_id)
+        subscription = Subscription.find_by_id(subscription_id)
+        if subscription and updates.get('status') == 'cancelled':
+            Tombstone.record('subscription', subscription, 'cancelled')
+        notify_write('subscription', subscription)
+        return subscription
     
     @staticmethod
     def to_dict(subscription):
@@ -259,9 +598,9 @@ class Subscription:
             return None
         return {
             'id': str(subscription['_id']),
-            'customer_id': subscription.get('customer_id'),
-            'service_id': subscription.get('service_id'),
-            'provider_id': subscription.get('provider_id'),
+            'customer_id': ref_str(subscription.get('customer_id')),
+            'service_id': ref_str(subscription.get('service_id')),
+            'provider_id': ref_str(subscription.get('provider_id')),
             'plan': subscription.get('plan'),
             'price': subscription.get('price'),
             'status': subscription.get('status'),
@@ -275,53 +614,186 @@ class Subscription:
         }
 
 
+class Service:
+    collection = db['services']
+    
+    PLANS = ['daily', 'weekly', 'monthly', 'quarterly', 'annual']
+    
+    @staticmethod
+    def create(data):
+        """Create a new catalog service"""
+        now = datetime.utcnow()
+        service = {
+            'provider_id': ref(data.get('providerId')),
+            'provider_name': data.get('providerName'),
+            'service_type': data.get('serviceType'),
+            'description': data.get('description'),
+            'location': data.get('location'),
+            'image': data.get('image'),
+            'prices': {plan: price for plan, price in (data.get('prices') or {}).items() if plan in Service.PLANS},
+            'rating': data.get('rating', 0),
+            'reviews': data.get('reviews', 0),
+            'status': 'active',
+            'created_at': now,
+            'updated_at': now
+        }
+        
+        result = Service.collection.insert_one(service)
+        service['_id'] = result.inserted_id
+        notify_write('service', service)
+        return service
+    
+    @staticmethod
+    def find_by_id(service_id):
+        """Find service by ID"""
+        return Service.collection.find_one({'_id': ObjectId(service_id)})
+    
+    @staticmethod
+    def find_all(since=None):
+        """Cursor over all services, optionally only those changed since a sync point"""
+        query = {}
+        if since:
+            query['updated_at'] = {'$gt': sync_window(since)}
+        return Service.collection.find(query)
+    
+    @staticmethod
+    def update(service_id, updates):
+        """Update a service"""
+        updates['updated_at'] = datetime.utcnow()
+        Service.collection.update_one(
+            {'_id': ObjectId(service_id)},
+            {'$set': updates}
+        )
+        service = Service.find_by_id(service_id)
+        notify_write('service', service)
+        return service
+    
+    @staticmethod
+    def to_dict(service):
+        """Convert service document to dictionary"""
+        if not service:
+            return None
+        return {
+            'id': str(service['_id']),
+            'provider_id': ref_str(service.get('provider_id')),
+            'provider_name': service.get('provider_name'),
+            'service_type': service.get('service_type'),
+            'description': service.get('description'),
+            'location': service.get('location'),
+            'image': service.get('image'),
+            'prices': service.get('prices') or {},
+            'rating': service.get('rating'),
+            'reviews': service.get('reviews'),
+            'status': service.get('status'),
+            'created_at': service.get('created_at').isoformat() if service.get('created_at') else None
+        }
+
+
 class Payment:
     collection = db['payments']
+    archive = db['payments_archive']
+    
+    # Columns for finance exports
+    EXPORT_FIELDS = [
+        'user_id', 'provider_id', 'customer_id', 'amount', 'type', 'status',
+        'subscription_id', 'booking_id', 'plan', 'created_at'
+    ]
+    
+    # API field -> stored field, for ?fields= sparse responses
+    FIELDS = {
+        'id': '_id', 'user_id': 'user_id', 'provider_id': 'provider_id', 'customer_id': 'customer_id',
+        'amount': 'amount', 'type': 'type', 'status': 'status', 'subscription_id': 'subscription_id',
+        'booking_id': 'booking_id', 'plan': 'plan', 'created_at': 'created_at'
+    }
     
     @staticmethod
     def create(data):
         """Create a new payment record"""
+        payment = Payment.build(data)
+        result = Payment.collection.insert_one(payment)
+        payment['_id'] = result.inserted_id
+        notify_write('payment', payment)
+        return payment
+    
+    @staticmethod
+    def build(data):
+        """New payment document from request data (not yet stored)"""
+        now = datetime.utcnow()
         payment = {
-            'user_id': data.get('userId'),
-            'provider_id': data.get('providerId'),
-            'customer_id': data.get('customerId'),
+            'user_id': ref(data.get('userId')),
+            'provider_id': ref(data.get('providerId')),
+            'customer_id': ref(data.get('customerId')),
             'amount': data.get('amount'),
             'type': data.get('type'),  # 'subscription' or 'instant'
             'status': data.get('status', 'success'),
-            'subscription_id': data.get('subscriptionId'),
-            'booking_id': data.get('bookingId'),
+            'subscription_id': ref(data.get('subscriptionId')),
+            'booking_id': ref(data.get('bookingId')),
             'plan': data.get('plan'),
-            'created_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
-        
-        result = Payment.collection.insert_one(payment)
-        payment['_id'] = result.inserted_id
         return payment
     
     @staticmethod
-    def find_by_id(payment_id):
-        """Find payment by ID"""
-        return Payment.collection.find_one({'_id': ObjectId(payment_id)})
+    def find_by_id(payment_id, projection=None):
+        """Find payment by ID, falling back to the archive"""
+        query = {'_id': ObjectId(payment_id)}
+        return Payment.collection.find_one(query, projection) or Payment.archive.find_one(query, projection)
     
     @staticmethod
-    def find_by_user(user_id):
-        """Find all payments for a user (customer)"""
-        return list(Payment.collection.find({'user_id': user_id}).sort('created_at', -1))
+    def find_by_user(user_id, skip=0, limit=None, projection=None):
+        """Find payments for a user (customer), newest first (archive only past the hot window)"""
+        return find_tiered(Payment.collection, Payment.archive, {'user_id': ref_match(user_id)},
+                           skip, limit, projection)
     
     @staticmethod
-    def find_by_provider(provider_id):
-        """Find all payments for a provider"""
-        return list(Payment.collection.find({'provider_id': provider_id}).sort('created_at', -1))
+    def find_by_provider(provider_id, skip=0, limit=None, projection=None):
+        """Find payments for a provider, newest first (archive only past the hot window)"""
+        return find_tiered(Payment.collection, Payment.archive, {'provider_id': ref_match(provider_id)},
+                           skip, limit, projection)
+    
+    @staticmethod
+    def find_changes_by_user(user_id, since, projection=None):
+        """Find a user's payments recorded since a sync point"""
+        return find_changes(Payment.collection, 'payment', {'user_id': ref_match(user_id)}, since,
+                            projection=projection)
+    
+    @staticmethod
+    def find_changes_by_provider(provider_id, since, projection=None):
+        """Find a provider's payments recorded since a sync point"""
+        return find_changes(Payment.collection, 'payment', {'provider_id': ref_match(provider_id)}, since,
+                            projection=projection)
+    
+    @staticmethod
+    def export_cursor(start=None, end=None, provider_id=None, batch_size=1000):
+        """Cursor over payments for export, archive first, each tier oldest first"""
+        return chain(*(
+            collection.find(
+                export_query(start, end, provider_id),
+                {f: 1 for f in Payment.EXPORT_FIELDS}
+            ).sort('created_at', 1).batch_size(batch_size)
+            for collection in (Payment.archive, Payment.collection)
+        ))
     
     @staticmethod
-    def find_by_subscription(subscription_id):
-        """Find payment by subscription ID"""
-        return Payment.collection.find_one({'subscription_id': subscription_id})
+    def archive_before(cutoff, batch_size):
+        """Move one batch of settled payments created before cutoff to the archive"""
+        return archive_batch(Payment.collection, Payment.archive, {
+            'status': 'success',
+            'created_at': {'$lt': cutoff}
+        }, batch_size)
     
     @staticmethod
-    def find_by_booking(booking_id):
-        """Find payment by booking ID"""
-        return Payment.collection.find_one({'booking_id': booking_id})
+    def find_by_subscription(subscription_id, projection=None):
+        """Find payment by subscription ID, falling back to the archive"""
+        query = {'subscription_id': ref_match(subscription_id)}
+        return Payment.collection.find_one(query, projection) or Payment.archive.find_one(query, projection)
+    
+    @staticmethod
+    def find_by_booking(booking_id, projection=None):
+        """Find payment by booking ID, falling back to the archive"""
+        query = {'booking_id': ref_match(booking_id)}
+        return Payment.collection.find_one(query, projection) or Payment.archive.find_one(query, projection)
     
     @staticmethod
     def to_dict(payment):
@@ -330,14 +802,714 @@ class Payment:
             return None
         return {
             'id': str(payment['_id']),
-            'user_id': payment.get('user_id'),
-            'provider_id': payment.get('provider_id'),
-            'customer_id': payment.get('customer_id'),
+            'user_id': ref_str(payment.get('user_id')),
+            'provider_id': ref_str(payment.get('provider_id')),
+            'customer_id': ref_str(payment.get('customer_id')),
             'amount': payment.get('amount'),
             'type': payment.get('type'),
             'status': payment.get('status'),
-            'subscription_id': payment.get('subscription_id'),
-            'booking_id': payment.get('booking_id'),
+            'subscription_id': ref_str(payment.get('subscription_id')),
+            'booking_id': ref_str(payment.get('booking_id')),
             'plan': payment.get('plan'),
             'created_at': payment.get('created_at').isoformat() if payment.get('created_at') else None
         }
+
+
+class Checkout:
+    # Bookings in these states cannot be paid for; a booking also cannot be
+    # paid for twice (checkout stamps it with its payment_id)
+    UNPAYABLE = ['cancelled', 'rejected']
+    
+    supports_transactions = None
+    
+    @staticmethod
+    def transactions_available():
+        """Whether the server can run multi-document transactions (replica set or sharded)"""
+        if Checkout.supports_transactions is None:
+            try:
+                hello = db.command('hello')
+                Checkout.supports_transactions = bool(hello.get('setName') or hello.get('msg') == 'isdbgrid')
+            except Exception:
+                Checkout.supports_transactions = False
+        return Checkout.supports_transactions
+    
+    @staticmethod
+    def run(booking_id=None, subscription=None, payment=None):
+        """Complete a booking and/or store a subscription and its payment as one unit.
+        
+        subscription and payment are documents from build(); the payment is
+        linked to the new subscription and to booking_id. On a replica set
+        the writes share a transaction; otherwise completed steps are undone
+        if a later one fails. Write hooks run only once everything is stored.
+        Returns (booking before, booking after, subscription, payment);
+        raises ValueError if the booking cannot be paid for or is already paid.
+        """
+        if Checkout.transactions_available():
+            with db.database.client.start_session() as session:
+                before, after = session.with_transaction(
+                    lambda s: Checkout.write(booking_id, subscription, payment, s, [])
+                )
+        else:
+            undo = []
+            try:
+                before, after = Checkout.write(booking_id, subscription, payment, None, undo)
+            except Exception:
+                for step in reversed(undo):
+                    try:
+                        step()
+                    except Exception as e:
+                        print(f"Checkout compensation failed: {type(e).__name__}: {str(e)}")
+                raise
+        
+        if after:
+            notify_write('booking', after)
+        if subscription:
+            notify_write('subscription', subscription)
+        notify_write('payment', payment)
+        return before, after, subscription, payment
+    
+    @staticmethod
+    def write(booking_id, subscription, payment, session, undo):
+        """The checkout writes, registering a compensating action in undo after each one"""
+        before = after = None
+        payment['_id'] = ObjectId()
+        if booking_id:
+            # Bookings paid for before payment_id was stamped only have the payment to go by
+            if Payment.collection.find_one({'booking_id': ref_match(booking_id)}, {'_id': 1}, session=session):
+                raise ValueError('Booking has already been paid for')
+            now = datetime.utcnow()
+            before = InstantBooking.collection.find_one_and_update(
+                {'_id': ObjectId(booking_id), 'status': {'$nin': Checkout.UNPAYABLE}, 'payment_id': None},
+                {'$set': {'status': 'completed', 'payment_id': payment['_id'], 'updated_at': now}},
+                session=session
+            )
+            if not before:
+                raise ValueError('Booking not found, already paid for or cannot be paid for')
+            after = dict(before, status='completed', payment_id=payment['_id'], updated_at=now)
+            InstantBooking.mark_unlisted(before, after, session)
+            undo.append(lambda: InstantBooking.collection.update_one(
+                {'_id': before['_id'], 'payment_id': payment['_id']},
+                {'$set': {'status': before['status'], 'payment_id': None, 'updated_at': datetime.utcnow()}}
+            ))
+            payment['booking_id'] = before['_id']
+        if subscription:
+            subscription.pop('_id', None)
+            subscription['_id'] = Subscription.collection.insert_one(subscription, session=session).inserted_id
+            undo.append(lambda: Subscription.collection.delete_one({'_id': subscription['_id']}))
+            payment['subscription_id'] = subscription['_id']
+            payment['plan'] = subscription['plan']
+        Payment.collection.insert_one(payment, session=session)
+        return before, after
+
+
+class Media:
+    collection = db['media']
+    files = storage.bucket(db, 'media_files')
+    
+    # Content type assumed for inline base64 sent without a data: URL prefix
+    INLINE_TYPES = {'image': 'image/jpeg', 'audio': 'audio/webm'}
+    
+    @staticmethod
+    def create(kind, content_type, filename):
+        """Create the record for an upload before its bytes are stored"""
+        media = {
+            'kind': kind,
+            'content_type': content_type,
+            'filename': filename,
+            'status': 'uploading',
+            'size': 0,
+            'file_id': None,
+            'renditions': {},
+            'created_at': datetime.utcnow()
+        }
+        result = Media.collection.insert_one(media)
+        media['_id'] = result.inserted_id
+        return media
+    
+    @staticmethod
+    def upload(source, filename, content_type, chunk_size, max_bytes=None):
+        """Stream a file-like source into GridFS chunk by chunk.
+        
+        Returns (file_id, size). Raises ValueError, discarding the partial
+        file, once more than max_bytes have been read.
+        """
+        stream = Media.files.open_upload_stream(filename, metadata={'content_type': content_type})
+        size = 0
+        try:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f'File exceeds the {max_bytes} byte limit')
+                stream.write(chunk)
+        except Exception:
+            stream.abort()
+            raise
+        stream.close()
+        return stream._id, size
+    
+    @staticmethod
+    def store(media_id, source, chunk_size, max_bytes):
+        """Store the original bytes of an upload and queue it for processing"""
+        media = Media.find_by_id(media_id)
+        file_id, size = Media.upload(source, media['filename'], media['content_type'], chunk_size, max_bytes)
+        return Media.collection.find_one_and_update(
+            {'_id': media['_id']},
+            {'$set': {'file_id': file_id, 'size': size, 'status': 'uploaded'}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def from_inline(kind, value, chunk_size, max_bytes=None, types=None):
+        """Store a base64 string (or data: URL) sent inline as a media upload.
+        
+        Raises ValueError, storing nothing, if it does not decode, is not
+        one of types or is larger than max_bytes.
+        """
+        if not isinstance(value, str):
+            raise ValueError('Not a base64 string')
+        content_type = Media.INLINE_TYPES[kind]
+        if value.startswith('data:'):
+            header, _, value = value.partition(',')
+            content_type = header[5:].split(';')[0].lower() or content_type
+        if types is not None and content_type not in types:
+            raise ValueError(f'Unsupported content type {content_type}')
+        try:
+            data = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError('Not valid base64')
+        if max_bytes is not None and len(data) > max_bytes:
+            raise ValueError(f'File exceeds the {max_bytes} byte limit')
+        media = Media.create(kind, content_type, f'inline-{kind}')
+        try:
+            return Media.store(media['_id'], io.BytesIO(data), chunk_size, max_bytes)
+        except Exception:
+            Media.discard(media['_id'])
+            raise
+    
+    @staticmethod
+    def discard(media_id):
+        """Remove an upload record that never completed"""
+        Media.collection.delete_one({'_id': ObjectId(media_id)})
+    
+    @staticmethod
+    def find_by_id(media_id):
+        """Find media by ID"""
+        return Media.collection.find_one({'_id': ObjectId(media_id)})
+    
+    @staticmethod
+    def claim_next(stale_after):
+        """Claim the oldest upload awaiting processing (or stuck in processing past stale_after seconds)"""
+        now = datetime.utcnow()
+        return Media.collection.find_one_and_update(
+            {'$or': [
+                {'status': 'uploaded'},
+                {'status': 'processing', 'processing_started_at': {'$lte': now - timedelta(seconds=stale_after)}}
+            ]},
+            {'$set': {'status': 'processing', 'processing_started_at': now}},
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def add_rendition(media_id, name, file_id, content_type, size):
+        """Record a derived rendition (thumbnail, compressed audio) of a media file"""
+        Media.collection.update_one(
+            {'_id': media_id},
+            {'$set': {f'renditions.{name}': {'file_id': file_id, 'content_type': content_type, 'size': size}}}
+        )
+    
+    @staticmethod
+    def finish(media_id, status, error=None):
+        """Mark processing as done ('ready') or failed"""
+        Media.collection.update_one(
+            {'_id': media_id},
+            {'$set': {'status': status, 'error': error, 'processed_at': datetime.utcnow()}}
+        )
+    
+    @staticmethod
+    def open(media, rendition=None):
+        """Open the stored bytes of a rendition (or the original) as (stream, content_type)"""
+        stored = (media.get('renditions') or {}).get(rendition) if rendition else None
+        if stored:
+            return Media.files.open_download_stream(stored['file_id']), stored['content_type']
+        return Media.files.open_download_stream(media['file_id']), media['content_type']
+    
+    @staticmethod
+    def to_dict(media):
+        """Convert media document to dictionary"""
+        if not media:
+            return None
+        return {
+            'id': str(media['_id']),
+            'kind': media.get('kind'),
+            'content_type': media.get('content_type'),
+            'size': media.get('size'),
+            'status': media.get('status'),
+            'renditions': sorted((media.get('renditions') or {}).keys()),
+            'created_at': media.get('created_at').isoformat() if media.get('created_at') else None
+        }
+
+
+class Notification:
+    collection = db['notifications']
+    
+    @staticmethod
+    def enqueue(provider_ids, kind, ref_id, summary, urgent=False):
+        """Queue an event for each provider's next digest; returns how many were new (not repeats)"""
+        now = datetime.utcnow()
+        notifications = [{
+            'key': f'{kind}:{ref_id}:{provider_id}',
+            'provider_id': ref(provider_id),
+            'kind': kind,
+            'ref_id': ref(ref_id),
+            'summary': summary,
+            'urgent': urgent,
+            'status': 'pending',
+            'attempts': 0,
+            'batch_id': None,
+            'created_at': now,
+            'sent_at': None
+        } for provider_id in provider_ids]
+        if not notifications:
+            return 0
+        try:
+            return len(Notification.collection.insert_many(notifications, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get('nInserted', 0)
+    
+    @staticmethod
+    def urgent_providers():
+        """Providers with an urgent notification waiting"""
+        return Notification.collection.distinct('provider_id', {'status': 'pending', 'urgent': True})
+    
+    @staticmethod
+    def claim_batch(lease_seconds, provider_ids=None):
+        """Atomically take pending notifications (or ones stuck sending past the lease) into a new batch.
+        
+        Concurrent flushers each get a disjoint set because every document is
+        moved out of 'pending' by exactly one update. Returns the batch's
+        notifications, oldest first.
+        """
+        now = datetime.utcnow()
+        batch_id = ObjectId()
+        query = {'$or': [
+            {'status': 'pending'},
+            {'status': 'sending', 'claimed_at': {'$lte': now - timedelta(seconds=lease_seconds)}}
+        ]}
+        if provider_ids is not None:
+            query['provider_id'] = {'$in': list(provider_ids)}
+        Notification.collection.update_many(
+            query,
+            {'$set': {'status': 'sending', 'batch_id': batch_id, 'claimed_at': now}}
+        )
+        return list(Notification.collection.find({'batch_id': batch_id}).sort('created_at', 1))
+    
+    @staticmethod
+    def mark_sent(ids):
+        """Mark notifications as delivered"""
+        Notification.collection.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'status': 'sent', 'sent_at': datetime.utcnow()}}
+        )
+    
+    @staticmethod
+    def mark_failed(ids, max_attempts):
+        """Return notifications to the queue, giving up on those out of attempts"""
+        Notification.collection.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'status': 'pending', 'batch_id': None}, '$inc': {'attempts': 1}}
+        )
+        Notification.collection.update_many(
+            {'_id': {'$in': ids}, 'attempts': {'$gte': max_attempts}},
+            {'$set': {'status': 'failed'}}
+        )
+
+
+class IdempotencyKey:
+    collection = db['idempotency_keys']
+    
+    @staticmethod
+    def begin(scope, fingerprint, lease_seconds):
+        """Claim an idempotency key for a new request.
+        
+        Returns None if this request now owns the key, otherwise the stored
+        record (completed, or still in progress elsewhere). A claim whose
+        lease expired without completing is taken over.
+        """
+        now = datetime.utcnow()
+        for _ in range(2):
+            try:
+                IdempotencyKey.collection.insert_one({
+                    '_id': scope,
+                    'fingerprint': fingerprint,
+                    'status': 'in_progress',
+                    'locked_until': now + timedelta(seconds=lease_seconds),
+                    'created_at': now
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            taken = IdempotencyKey.collection.find_one_and_update(
+                {'_id': scope, 'status': 'in_progress', 'fingerprint': fingerprint, 'locked_until': {'$lte': now}},
+                {'$set': {'locked_until': now + timedelta(seconds=lease_seconds)}}
+            )
+            if taken:
+                return None
+            existing = IdempotencyKey.collection.find_one({'_id': scope})
+            if existing:
+                return existing
+            # Expired between the insert and the lookup; claim it again
+        return IdempotencyKey.collection.find_one({'_id': scope})
+    
+    @staticmethod
+    def complete(scope, status_code, body, mimetype):
+        """Store the response to replay for repeats of the key"""
+        IdempotencyKey.collection.update_one(
+            {'_id': scope},
+            {'$set': {'status': 'done', 'status_code': status_code, 'body': body, 'mimetype': mimetype},
+             '$unset': {'locked_until': ''}}
+        )
+    
+    @staticmethod
+    def release(scope):
+        """Drop an unfinished claim so the client can retry the request"""
+        IdempotencyKey.collection.delete_one({'_id': scope, 'status': 'in_progress'})
+
+
+class Tombstone:
+    collection = db['tombstones']
+    
+    @staticmethod
+    def record(kind, doc, reason):
+        """Record that a document was cancelled or deleted so delta syncs can drop it"""
+        Tombstone.collection.insert_one({
+            'kind': kind,
+            'doc_id': str(doc['_id']),
+            'customer_id': doc.get('customer_id'),
+            'provider_id': doc.get('provider_id'),
+            'user_id': doc.get('user_id'),
+            'reason': reason,
+            'removed_at': datetime.utcnow()
+        })
+    
+    @staticmethod
+    def find_since(kind, query, since):
+        """Find ids of documents of a kind tombstoned since a sync point"""
+        tombstones = Tombstone.collection.find(
+            {'$and': [{'kind': kind, 'removed_at': {'$gt': sync_window(since)}}, query]},
+            {'doc_id': 1}
+        )
+        return [t['doc_id'] for t in tombstones]
+
+
+class ProviderScore:
+    collection = db['provider_scores']
+    
+    # Priors that keep providers with a handful of jobs from jumping to the
+    # top (or bottom) of the rankings
+    PRIOR_RATINGS = 5
+    PRIOR_RATING = 0.8
+    PRIOR_JOBS = 5
+    PRIOR_COMPLETION = 0.8
+    
+    # Counter -> booking statuses it counts
+    STATUS_COUNTERS = {
+        'accepted': ('accepted', 'completed'),
+        'open_load': ('accepted',),
+        'completed': ('completed',)
+    }
+    
+    @staticmethod
+    def find_by_provider(provider_id):
+        """Find a provider's score document"""
+        return ProviderScore.collection.find_one({'provider_id': provider_id})
+    
+    @staticmethod
+    def find_all(since=None):
+        """Cursor over score documents, optionally only those changed since a sync point"""
+        query = {}
+        if since:
+            query['updated_at'] = {'$gt': sync_window(since)}
+        return ProviderScore.collection.find(query)
+    
+    @staticmethod
+    def compute(doc):
+        """Derived metrics and the overall ranking score from the raw counters"""
+        up, down = doc.get('thumbs_up', 0), doc.get('thumbs_down', 0)
+        accepted, completed = doc.get('accepted', 0), doc.get('completed', 0)
+        responses = doc.get('responses', 0)
+        
+        rating = (up + ProviderScore.PRIOR_RATING * ProviderScore.PRIOR_RATINGS) / (up + down + ProviderScore.PRIOR_RATINGS)
+        completion = (completed + ProviderScore.PRIOR_COMPLETION * ProviderScore.PRIOR_JOBS) / (accepted + ProviderScore.PRIOR_JOBS)
+        avg_response = doc.get('response_seconds', 0) / responses if responses else None
+        # An hour to respond halves the responsiveness credit
+        responsiveness = 1 / (1 + avg_response / 3600) if avg_response is not None else 0.5
+        load_penalty = 0.05 * max(doc.get('open_load', 0), 0)
+        
+        return {
+            'rating_avg': round(up / (up + down), 4) if up + down else None,
+            'completion_rate': round(completed / accepted, 4) if accepted else None,
+            'avg_response_seconds': round(avg_response, 1) if avg_response is not None else None,
+            'score': round(0.5 * rating + 0.3 * completion + 0.2 * responsiveness - load_penalty, 6)
+        }
+    
+    @staticmethod
+    def apply(provider_id, increments):
+        """Atomically add increments to a provider's counters, then refresh the derived score"""
+        doc = ProviderScore.collection.find_one_and_update(
+            {'provider_id': provider_id},
+            {'$inc': increments, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return ProviderScore.refresh(doc)
+    
+    @staticmethod
+    def reset(provider_id, counters):
+        """Overwrite a provider's counters (used when rebuilding from bookings) and refresh the score"""
+        doc = ProviderScore.collection.find_one_and_update(
+            {'provider_id': provider_id},
+            {'$set': dict(counters, updated_at=datetime.utcnow())},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return ProviderScore.refresh(doc)
+    
+    @staticmethod
+    def refresh(doc):
+        """Store the derived metrics for a score document and notify the ranking index"""
+        derived = ProviderScore.compute(doc)
+        if 'service_type' not in doc:
+            # Copy the ranking keys from the provider profile on first score
+            provider_id = doc['provider_id']
+            provider = User.find_by_id(provider_id) if ObjectId.is_valid(provider_id) else None
+            derived['service_type'] = (provider or {}).get('service_type')
+            derived['service_area'] = (provider or {}).get('service_area')
+        ProviderScore.collection.update_one({'_id': doc['_id']}, {'$set': derived})
+        doc.update(derived)
+        notify_write('provider_score', doc)
+        return doc
+    
+    @staticmethod
+    def booking_increments(before, after):
+        """Counter increments implied by a booking changing from before to after"""
+        increments = {}
+        old_status, new_status = before.get('status'), after.get('status')
+        if new_status != old_status:
+            # Same counting as the rebuild job: accepted covers completed jobs
+            # too, so a booking completed without passing through accepted
+            # still counts as taken on
+            for counter, statuses in ProviderScore.STATUS_COUNTERS.items():
+                increments[counter] = (new_status in statuses) - (old_status in statuses)
+            if new_status == 'accepted' and old_status in ('pending', 'claimed') and after.get('created_at'):
+                increments['responses'] = 1
+                increments['response_seconds'] = (after['updated_at'] - after['created_at']).total_seconds()
+        
+        old_feedback, new_feedback = before.get('feedback'), after.get('feedback')
+        if new_feedback != old_feedback:
+            if old_feedback in ('thumbs_up', 'thumbs_down'):
+                increments[old_feedback] = increments.get(old_feedback, 0) - 1
+            if new_feedback in ('thumbs_up', 'thumbs_down'):
+                increments[new_feedback] = increments.get(new_feedback, 0) + 1
+        return {k: v for k, v in increments.items() if v}
+    
+    @staticmethod
+    def record_booking_change(before, after):
+        """Update the provider's score for a booking status or feedback change"""
+        provider_id = ref_str(after.get('provider_id') or before.get('provider_id'))
+        if not provider_id:
+            return None
+        increments = ProviderScore.booking_increments(before, after)
+        if not increments:
+            return None
+        return ProviderScore.apply(provider_id, increments)
+    
+    @staticmethod
+    def to_dict(doc):
+        """Convert score document to dictionary"""
+        if not doc:
+            return None
+        return {
+            'provider_id': doc.get('provider_id'),
+            'service_type': doc.get('service_type'),
+            'service_area': doc.get('service_area'),
+            'score': doc.get('score'),
+            'rating_avg': doc.get('rating_avg'),
+            'ratings': doc.get('thumbs_up', 0) + doc.get('thumbs_down', 0),
+            'completion_rate': doc.get('completion_rate'),
+            'completed': doc.get('completed', 0),
+            'avg_response_seconds': doc.get('avg_response_seconds'),
+            'open_load': doc.get('open_load', 0)
+        }
+
+
+class DailyAnalytics:
+    collection = db['daily_analytics']
+    
+    @staticmethod
+    def upsert(summary):
+        """Write the summary document for one day, replacing any earlier run"""
+        summary['computed_at'] = datetime.utcnow()
+        DailyAnalytics.collection.replace_one({'date': summary['date']}, summary, upsert=True)
+    
+    @staticmethod
+    def find_range(start, end):
+        """Find daily summaries with start <= date <= end (YYYY-MM-DD strings)"""
+        return list(DailyAnalytics.collection.find(
+            {'date': {'$gte': start, '$lte': end}}, {'_id': 0}
+        ).sort('date', 1))
+    
+    @staticmethod
+    def latest_date():
+        """Most recent day that has a summary, or None"""
+        latest = DailyAnalytics.collection.find_one({}, {'date': 1}, sort=[('date', -1)])
+        return latest['date'] if latest else None
+    
+    @staticmethod
+    def to_dict(summary):
+        """Convert summary document to dictionary"""
+        if not summary:
+            return None
+        return {
+            'date': summary.get('date'),
+            'bookings': summary.get('bookings'),
+            'subscriptions': summary.get('subscriptions'),
+            'revenue': summary.get('revenue'),
+            'computed_at': summary.get('computed_at').isoformat() if summary.get('computed_at') else None
+        }
+
+
+def find_changes(collection, kind, query, since, scope=None, projection=None):
+    """Find documents created or updated since a sync point.
+    
+    Returns (changed, removed_ids). changed holds the documents matching
+    query, oldest change first. removed_ids holds tombstoned ids and, when
+    scope is given, ids of documents in scope that changed but no longer
+    match query (e.g. a booking that is no longer pending).
+    """
+    window = {'updated_at': {'$gt': sync_window(since)}}
+    changed = list(collection.find({'$and': [query, window]}, projection).sort('updated_at', 1))
+    changed_ids = {str(doc['_id']) for doc in changed}
+    
+    removed = set(Tombstone.find_since(kind, query if scope is None else scope, since))
+    if scope is not None:
+        left = collection.find({'$and': [scope, window, {'$nor': [query]}]}, {'_id': 1})
+        removed.update(str(doc['_id']) for doc in left)
+    
+    return changed, sorted(removed - changed_ids)
+
+
+def find_tiered(hot, archive, query, skip=0, limit=None, projection=None):
+    """Page through a hot collection and its archive, newest first.
+    
+    Archived documents are old, but old documents are not all archived
+    (a booking still accepted stays hot), so pages are ordered by
+    (created_at, _id) across both tiers. The archive is only read in full
+    once its newest match would fall inside the requested page. Without a
+    limit only the hot tier is returned; older history is read page by page.
+    """
+    order = [('created_at', -1), ('_id', -1)]
+    if projection:
+        projection = dict(projection, created_at=1)
+    docs = list(hot.find(query, projection).sort(order).skip(skip).limit(limit or 0))
+    if not limit:
+        return docs
+    
+    newest = next(iter(archive.find(query, {'created_at': 1}).sort(order).limit(1)), None)
+    if newest is None or (len(docs) == limit and tier_key(newest) < tier_key(docs[-1])):
+        return docs
+    
+    # The page reaches archived documents: merge both tiers up to its end
+    end = skip + limit
+    merged = (list(hot.find(query, projection).sort(order).limit(end))
+              + list(archive.find(query, projection).sort(order).limit(end)))
+    merged.sort(key=tier_key, reverse=True)
+    return merged[skip:end]
+
+
+def tier_key(doc):
+    return doc.get('created_at') or datetime.min, doc['_id']
+
+
+def archive_batch(hot, archive, query, batch_size):
+    """Move one batch of documents matching query from hot to archive.
+    
+    Copies before deleting and tolerates documents already present in the
+    archive, so a run interrupted between the two steps resumes cleanly.
+    Returns the number of documents moved.
+    """
+    docs = list(hot.find(query).sort('_id', 1).limit(batch_size))
+    if not docs:
+        return 0
+    try:
+        archive.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate keys are copies left by an interrupted run; anything else is real
+        if any(err['code'] != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+    hot.delete_many({'_id': {'$in': [d['_id'] for d in docs]}})
+    return len(docs)
+
+
+def export_query(start=None, end=None, provider_id=None):
+    """Build a created_at range / provider filter for exports"""
+    query = {}
+    if start or end:
+        query['created_at'] = {}
+        if start:
+            query['created_at']['$gte'] = start
+        if end:
+            query['created_at']['$lt'] = end
+    if provider_id:
+        query['provider_id'] = ref_match(provider_id)
+    return query
+
+
+def ensure_indexes():
+    """Create the indexes the query methods rely on"""
+    InstantBooking.collection.create_index([('customer_id', 1), ('updated_at', 1)])
+    InstantBooking.collection.create_index([('provider_id', 1), ('updated_at', 1)])
+    InstantBooking.collection.create_index([('status', 1), ('updated_at', 1)])
+    InstantBooking.collection.create_index('updated_at')
+    User.collection.create_index([('role', 1), ('updated_at', 1)])
+    InstantBooking.collection.create_index([('status', 1), ('claim_expires_at', 1)])
+    Subscription.collection.create_index([('customer_id', 1), ('updated_at', 1)])
+    Subscription.collection.create_index([('provider_id', 1), ('updated_at', 1)])
+    Subscription.collection.create_index([('status', 1), ('updated_at', 1)])
+    Subscription.collection.create_index('updated_at')
+    Payment.collection.create_index([('user_id', 1), ('updated_at', 1)])
+    Payment.collection.create_index([('provider_id', 1), ('updated_at', 1)])
+    Payment.collection.create_index([('provider_id', 1), ('created_at', 1)])
+    Payment.collection.create_index('created_at')
+    InstantBooking.collection.create_index([('provider_id', 1), ('created_at', 1)])
+    InstantBooking.collection.create_index('created_at')
+    InstantBooking.collection.create_index([('status', 1), ('created_at', 1)])
+    InstantBooking.archive.create_index([('customer_id', 1), ('created_at', -1)])
+    InstantBooking.archive.create_index([('provider_id', 1), ('created_at', -1)])
+    InstantBooking.archive.create_index('created_at')
+    Payment.collection.create_index([('status', 1), ('created_at', 1)])
+    Payment.archive.create_index([('user_id', 1), ('created_at', -1)])
+    Payment.archive.create_index([('provider_id', 1), ('created_at', -1)])
+    Payment.archive.create_index('created_at')
+    Payment.archive.create_index('subscription_id')
+    Payment.archive.create_index('booking_id')
+    Subscription.collection.create_index('created_at')
+    DailyAnalytics.collection.create_index('date', unique=True)
+    Service.collection.create_index('updated_at')
+    Media.collection.create_index([('status', 1), ('created_at', 1)])
+    Notification.collection.create_index('key', unique=True)
+    Notification.collection.create_index([('status', 1), ('provider_id', 1)])
+    Notification.collection.create_index('batch_id')
+    Notification.collection.create_index(
+        'sent_at', expireAfterSeconds=int(SYNC_RETENTION.total_seconds())
+    )
+    ProviderScore.collection.create_index('provider_id', unique=True)
+    ProviderScore.collection.create_index('updated_at')
+    IdempotencyKey.collection.create_index('created_at', expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+    Tombstone.collection.create_index([('kind', 1), ('removed_at', 1)])
+    Tombstone.collection.create_index(
+        'removed_at', expireAfterSeconds=int(SYNC_RETENTION.total_seconds())
+    )
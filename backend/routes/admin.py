@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from backend.models import DailyAnalytics
+from backend.jobs.analytics import refresh
+from backend.utils.metrics import metrics
+from backend.config import ANALYTICS_MAX_REFRESH_DAYS
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/admin/analytics', methods=['GET'])
+def get_analytics():
+    """Get daily analytics time-series (?from=YYYY-MM-DD&to=YYYY-MM-DD, default last 30 days)"""
+    try:
+        today = datetime.utcnow().date()
+        end = request.args.get('to') or today.isoformat()
+        start = request.args.get('from') or (today - timedelta(days=29)).isoformat()
+        # Validate before using the strings as range bounds
+        datetime.strptime(start, '%Y-%m-%d')
+        datetime.strptime(end, '%Y-%m-%d')
+        
+        summaries = DailyAnalytics.find_range(start, end)
+        return jsonify({
+            'success': True,
+            'from': start,
+            'to': end,
+            'days': [DailyAnalytics.to_dict(s) for s in summaries]
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@admin_bp.route('/admin/analytics/refresh', methods=['POST'])
+def refresh_analytics():
+    """Recompute recent daily summaries on demand (optional JSON {"from": "YYYY-MM-DD"}).
+    
+    Never reaches back more than ANALYTICS_MAX_REFRESH_DAYS days.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        start = datetime.strptime(data['from'], '%Y-%m-%d') if data.get('from') else None
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        if start and start > today:
+            return jsonify({'success': False, 'message': 'from cannot be in the future'}), 400
+        
+        days = refresh(start, earliest=today - timedelta(days=ANALYTICS_MAX_REFRESH_DAYS - 1))
+        return jsonify({
+            'success': True,
+            'message': f'Recomputed {days} daily summaries'
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@admin_bp.route('/admin/metrics', methods=['GET'])
+def get_metrics():
+    """Get this worker's counters and latency/size series"""
+    return jsonify({
+        'success': True,
+        'metrics': metrics.snapshot()
+    }), 200
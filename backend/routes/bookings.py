@@ -1,5 +1,15 @@
-from flask import Blueprint, request, jsonify
-from backend.models import InstantBooking
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response
+from backend.models import InstantBooking, ProviderScore, Media
+from backend.config import CLAIM_LEASE_SECONDS, MEDIA_TYPES, MEDIA_MAX_BYTES, MEDIA_CHUNK_BYTES
+from backend.utils.sync import parse_since, sync_response
+from backend.utils.paging import page_args
+from backend.utils.fields import sparse_fields
+from backend.utils.hot_reads import pending_bookings
+from backend.utils.schedule import schedule, parse_time
+from backend.utils.notifications import notify_new_booking
+from backend.jobs.notifications import urgent
+from backend.jobs.media import pending
 
 bookings_bp = Blueprint('bookings', __name__)
 
@@ -14,9 +24,38 @@ def create_booking():
         if not data.get(field):
             return jsonify({'success': False, 'message': f'{field} is required'}), 400
     
+    # Media uploaded through /api/media is referenced by id
+    for field, kind in (('imageId', 'image'), ('voiceNoteId', 'audio')):
+        if data.get(field):
+            try:
+                media = Media.find_by_id(data[field])
+            except Exception:
+                media = None
+            if not media or media.get('kind') != kind:
+                return jsonify({'success': False, 'message': f'{field} does not reference an uploaded {kind}'}), 400
+    
+    # Inline base64 from older clients is moved to media storage as well, so
+    # booking documents never carry the bytes
+    for field, id_field, kind in (('image', 'imageId', 'image'), ('voiceNote', 'voiceNoteId', 'audio')):
+        inline = data.pop(field, None)
+        if not inline or data.get(id_field):
+            continue
+        try:
+            media = Media.from_inline(kind, inline, MEDIA_CHUNK_BYTES, MEDIA_MAX_BYTES[kind], MEDIA_TYPES[kind])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'{field}: {str(e)}'}), 400
+        data[id_field] = str(media['_id'])
+        pending.set()
+    
     # Create booking in MongoDB
     booking = InstantBooking.create(data)
     
+    # Queue it for matching providers' next digest (urgent ones are sent at once)
+    try:
+        notify_new_booking(booking, wake=urgent)
+    except Exception as e:
+        print(f"Notification queue error: {type(e).__name__}: {str(e)}")
+    
     return jsonify({
         'success': True,
         'message': 'Booking created successfully',
@@ -28,13 +67,14 @@ def create_booking():
 def get_booking(booking_id):
     """Get a booking by ID"""
     try:
-        booking = InstantBooking.find_by_id(booking_id)
+        projection, to_dict = sparse_fields(InstantBooking)
+        booking = InstantBooking.find_by_id(booking_id, projection)
         if not booking:
             return jsonify({'success': False, 'message': 'Booking not found'}), 404
         
         return jsonify({
             'success': True,
-            'booking': InstantBooking.to_dict(booking)
+            'booking': to_dict(booking)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -42,39 +82,57 @@ def get_booking(booking_id):
 
 @bookings_bp.route('/customer/<customer_id>/bookings', methods=['GET'])
 def get_customer_bookings(customer_id):
-    """Get all bookings for a customer"""
+    """Get bookings for a customer (?page, ?limit), or only changes with ?since=<token>"""
     try:
-        bookings = InstantBooking.find_by_customer(customer_id)
-        return jsonify({
-            'success': True,
-            'bookings': [InstantBooking.to_dict(b) for b in bookings]
-        }), 200
+        projection, to_dict = sparse_fields(InstantBooking)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            bookings, removed = InstantBooking.find_changes_by_customer(customer_id, since, projection)
+            return jsonify(sync_response('bookings', bookings, to_dict, sync_point, removed)), 200
+        
+        skip, limit = page_args(None)
+        bookings = InstantBooking.find_by_customer(customer_id, skip, limit, projection)
+        return jsonify(sync_response('bookings', bookings, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
 @bookings_bp.route('/provider/<provider_id>/bookings', methods=['GET'])
 def get_provider_bookings(provider_id):
-    """Get all bookings for a provider"""
+    """Get bookings for a provider (?page, ?limit), or only changes with ?since=<token>"""
     try:
-        bookings = InstantBooking.find_by_provider(provider_id)
-        return jsonify({
-            'success': True,
-            'bookings': [InstantBooking.to_dict(b) for b in bookings]
-        }), 200
+        projection, to_dict = sparse_fields(InstantBooking)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            bookings, removed = InstantBooking.find_changes_by_provider(provider_id, since, projection)
+            return jsonify(sync_response('bookings', bookings, to_dict, sync_point, removed)), 200
+        
+        skip, limit = page_args(None)
+        bookings = InstantBooking.find_by_provider(provider_id, skip, limit, projection)
+        return jsonify(sync_response('bookings', bookings, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
 @bookings_bp.route('/bookings/pending', methods=['GET'])
 def get_pending_bookings():
-    """Get all pending bookings"""
+    """Get all pending bookings, or only changes with ?since=<token>"""
+    def read():
+        projection, to_dict = sparse_fields(InstantBooking)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            bookings, removed = InstantBooking.find_pending_changes(since, projection)
+            return jsonify(sync_response('bookings', bookings, to_dict, sync_point, removed)).get_data()
+        
+        bookings = InstantBooking.find_all_pending(projection)
+        return jsonify(sync_response('bookings', bookings, to_dict, sync_point)).get_data()
+    
     try:
-        bookings = InstantBooking.find_all_pending()
-        return jsonify({
-            'success': True,
-            'bookings': [InstantBooking.to_dict(b) for b in bookings]
-        }), 200
+        # Every caller gets the same answer, so identical reads share one query
+        return Response(pending_bookings.get(request.full_path, read), mimetype='application/json'), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
@@ -106,7 +164,37 @@ def update_booking(booking_id):
         if 'feedback_message' in data:
             updates['feedback_message'] = data['feedback_message']
         
-        updated_booking = InstantBooking.update(booking_id, updates)
+        # Provider-driven changes are conditional: the booking must be
+        # unclaimed, or already claimed/accepted by the acting provider
+        status = updates.get('status')
+        provider_id = data.get('provider_id') or data.get('providerId')
+        if status in InstantBooking.PROVIDER_STATUSES and not provider_id:
+            return jsonify({'success': False, 'message': f'provider_id is required to mark a booking {status}'}), 400
+        
+        if status == 'accepted':
+            updates['provider_id'] = provider_id
+            if 'provider_name' not in updates and data.get('providerName'):
+                updates['provider_name'] = data['providerName']
+            updates['claim_expires_at'] = None
+            
+            # The visit starts at visitAt, which must fit the provider's schedule,
+            # or otherwise at the provider's next free slot from now
+            visit_at = parse_time(data.get('visitAt')) or booking.get('visit_at')
+            if visit_at is None:
+                visit_at = schedule.next_free(provider_id, datetime.utcnow(), ignore=('booking', booking_id))
+            elif not schedule.is_free(provider_id, visit_at, ignore=('booking', booking_id)):
+                return jsonify({'success': False, 'message': 'Provider already has a visit at that time'}), 409
+            updates['visit_at'] = visit_at
+        
+        if status in InstantBooking.PROVIDER_STATUSES or 'provider_id' in updates:
+            updated_booking = InstantBooking.update_if(booking_id, InstantBooking.acceptable_by(provider_id), updates)
+            if not updated_booking:
+                return jsonify({'success': False, 'message': 'Booking has been claimed by another provider'}), 409
+        else:
+            updated_booking = InstantBooking.update(booking_id, updates)
+        
+        # Keep the provider's reputation score in step with status and feedback changes
+        ProviderScore.record_booking_change(booking, updated_booking)
         
         return jsonify({
             'success': True,
@@ -115,3 +203,49 @@ def update_booking(booking_id):
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@bookings_bp.route('/instant-booking/<booking_id>/claim', methods=['POST'])
+def claim_booking(booking_id):
+    """Claim a pending booking for a provider under a time-limited lease"""
+    try:
+        data = request.get_json()
+        
+        if not data.get('providerId'):
+            return jsonify({'success': False, 'message': 'providerId is required'}), 400
+        
+        booking = InstantBooking.claim(booking_id, data['providerId'], data.get('providerName'), CLAIM_LEASE_SECONDS)
+        if not booking:
+            if not InstantBooking.find_by_id(booking_id):
+                return jsonify({'success': False, 'message': 'Booking not found'}), 404
+            return jsonify({'success': False, 'message': 'Booking has already been claimed'}), 409
+        
+        return jsonify({
+            'success': True,
+            'message': 'Booking claimed successfully',
+            'booking': InstantBooking.to_dict(booking)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@bookings_bp.route('/instant-booking/<booking_id>/release', methods=['POST'])
+def release_booking(booking_id):
+    """Release a claimed booking back to the pending pool"""
+    try:
+        data = request.get_json()
+        
+        if not data.get('providerId'):
+            return jsonify({'success': False, 'message': 'providerId is required'}), 400
+        
+        booking = InstantBooking.release_claim(booking_id, data['providerId'])
+        if not booking:
+            return jsonify({'success': False, 'message': 'Booking is not claimed by this provider'}), 409
+        
+        return jsonify({
+            'success': True,
+            'message': 'Booking released successfully',
+            'booking': InstantBooking.to_dict(booking)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify
+from backend.models import InstantBooking, Subscription, Payment, ProviderScore, Checkout
+from backend.routes.subscriptions import validate_subscription
+from backend.routes.payments import validate_payment
+from backend.utils.notifications import notify_new_subscription
+
+checkout_bp = Blueprint('checkout', __name__)
+
+
+@checkout_bp.route('/checkout', methods=['POST'])
+def checkout():
+    """Pay for a booking or a new subscription in one request.
+    
+    JSON: {"payment": {...}, "bookingId": "..."} for an instant booking, or
+    {"payment": {...}, "subscription": {...}} for a subscription, with the
+    same fields as POST /payment and POST /subscription.
+    """
+    data = request.get_json() or {}
+    payment_data = data.get('payment') or {}
+    subscription_data = data.get('subscription')
+    booking_id = data.get('bookingId')
+    
+    if not booking_id and not subscription_data:
+        return jsonify({'success': False, 'message': 'bookingId or subscription is required'}), 400
+    error = validate_payment(payment_data)
+    if error:
+        return jsonify({'success': False, 'message': f'payment.{error}'}), 400
+    if subscription_data:
+        error = validate_subscription(subscription_data)
+        if error:
+            message, status = error
+            return jsonify({'success': False, 'message': f'subscription.{message}'}), status
+    
+    try:
+        before, booking, subscription, payment = Checkout.run(
+            booking_id,
+            Subscription.build(subscription_data) if subscription_data else None,
+            Payment.build(payment_data)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Checkout failed and was rolled back: {str(e)}'}), 400
+    
+    if booking:
+        ProviderScore.record_booking_change(before, booking)
+    if subscription:
+        try:
+            notify_new_subscription(subscription)
+        except Exception as e:
+            print(f"Notification queue error: {type(e).__name__}: {str(e)}")
+    
+    return jsonify({
+        'success': True,
+        'message': 'Checkout completed successfully',
+        'booking': InstantBooking.to_dict(booking) if booking else None,
+        'subscription': Subscription.to_dict(subscription) if subscription else None,
+        'payment': Payment.to_dict(payment)
+    }), 201
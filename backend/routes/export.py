@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from backend.models import InstantBooking, Payment
+from backend.utils.export import stream_csv, stream_ndjson
+
+export_bp = Blueprint('export', __name__)
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson')
+}
+
+
+def parse_range():
+    """Read ?from=&to= as ISO dates; a bare 'to' date includes that whole day"""
+    start = request.args.get('from')
+    end = request.args.get('to')
+    start = datetime.fromisoformat(start) if start else None
+    if end:
+        end_date = datetime.fromisoformat(end)
+        end = end_date + timedelta(days=1) if len(end) == 10 else end_date
+    return start, end
+
+
+def export_response(name, model):
+    """Stream model rows matching the request filters as CSV or NDJSON"""
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+        start, end = parse_range()
+        cursor = model.export_cursor(start, end, request.args.get('provider_id'))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    stream, mimetype = FORMATS[fmt]
+    return Response(
+        stream_with_context(stream(cursor, model.EXPORT_FIELDS)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'}
+    )
+
+
+@export_bp.route('/export/payments', methods=['GET'])
+def export_payments():
+    """Stream the payment ledger (?from, ?to, ?provider_id, ?format=csv|ndjson)"""
+    return export_response('payments', Payment)
+
+
+@export_bp.route('/export/bookings', methods=['GET'])
+def export_bookings():
+    """Stream bookings without media (?from, ?to, ?provider_id, ?format=csv|ndjson)"""
+    return export_response('bookings', InstantBooking)
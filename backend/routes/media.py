@@ -0,0 +1,104 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from backend.models import Media
+from backend.jobs.media import pending
+from backend.config import MEDIA_TYPES, MEDIA_MAX_BYTES, MEDIA_CHUNK_BYTES
+
+media_bp = Blueprint('media', __name__)
+
+# A requested rendition that is not ready yet falls back to the original
+RENDITIONS = {'thumbnail', 'compressed', 'original'}
+
+
+def media_kind(content_type):
+    """'image' or 'audio' for an accepted content type, otherwise None"""
+    for kind, types in MEDIA_TYPES.items():
+        if content_type in types:
+            return kind
+    return None
+
+
+@media_bp.route('/media', methods=['POST'])
+def upload_media():
+    """Upload a booking photo or voice note as multipart field 'file'"""
+    # Reject a declared oversize body before the form parser reads any of it
+    largest = max(MEDIA_MAX_BYTES.values())
+    if request.content_length and request.content_length > largest + MEDIA_CHUNK_BYTES:
+        return jsonify({'success': False, 'message': f'File exceeds the {largest} byte limit'}), 413
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'file is required'}), 400
+    
+    content_type = (upload.mimetype or '').lower()
+    kind = media_kind(content_type)
+    if not kind:
+        return jsonify({'success': False, 'message': f'Unsupported content type {content_type}'}), 415
+    
+    max_bytes = MEDIA_MAX_BYTES[kind]
+    if request.content_length and request.content_length > max_bytes + MEDIA_CHUNK_BYTES:
+        return jsonify({'success': False, 'message': f'File exceeds the {max_bytes} byte limit'}), 413
+    
+    media = Media.create(kind, content_type, upload.filename)
+    try:
+        media = Media.store(media['_id'], upload.stream, MEDIA_CHUNK_BYTES, max_bytes)
+    except ValueError as e:
+        Media.discard(media['_id'])
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except Exception as e:
+        Media.discard(media['_id'])
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    pending.set()
+    return jsonify({
+        'success': True,
+        'message': 'Media uploaded successfully',
+        'media': Media.to_dict(media)
+    }), 201
+
+
+@media_bp.route('/media/<media_id>', methods=['GET'])
+def get_media(media_id):
+    """Stream media bytes (?rendition=thumbnail|compressed|original)"""
+    try:
+        rendition = request.args.get('rendition')
+        if rendition and rendition not in RENDITIONS:
+            return jsonify({'success': False, 'message': 'rendition must be thumbnail, compressed or original'}), 400
+        media = Media.find_by_id(media_id)
+        if not media or not media.get('file_id'):
+            return jsonify({'success': False, 'message': 'Media not found'}), 404
+        stream, content_type = Media.open(media, rendition)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    def chunks():
+        with stream:
+            while True:
+                chunk = stream.read(MEDIA_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    
+    return Response(
+        stream_with_context(chunks()),
+        mimetype=content_type,
+        headers={
+            'Content-Length': str(stream.length),
+            'Cache-Control': 'private, max-age=86400'
+        }
+    )
+
+
+@media_bp.route('/media/<media_id>/info', methods=['GET'])
+def get_media_info(media_id):
+    """Get upload and processing status of media"""
+    try:
+        media = Media.find_by_id(media_id)
+        if not media:
+            return jsonify({'success': False, 'message': 'Media not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'media': Media.to_dict(media)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
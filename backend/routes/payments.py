@@ -1,18 +1,31 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from backend.models import Payment
+from backend.utils.sync import parse_since, sync_response
+from backend.utils.fields import sparse_fields
+from backend.utils.paging import page_args
 
 payments_bp = Blueprint('payments', __name__)
 
+
+def validate_payment(data):
+    """Error message for invalid payment request data, or None"""
+    required_fields = ['userId', 'providerId', 'amount', 'type']
+    for field in required_fields:
+        if not data.get(field):
+            return f'{field} is required'
+    return None
+
+
 @payments_bp.route('/payment', methods=['POST'])
 def create_payment():
     """Create a new payment record"""
     data = request.get_json()
     
     # Validate required fields
-    required_fields = ['userId', 'providerId', 'amount', 'type']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'success': False, 'message': f'{field} is required'}), 400
+    error = validate_payment(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
     
     # Create payment in MongoDB
     payment = Payment.create(data)
@@ -28,13 +41,14 @@ def create_payment():
 def get_payment(payment_id):
     """Get a payment by ID"""
     try:
-        payment = Payment.find_by_id(payment_id)
+        projection, to_dict = sparse_fields(Payment)
+        payment = Payment.find_by_id(payment_id, projection)
         if not payment:
             return jsonify({'success': False, 'message': 'Payment not found'}), 404
         
         return jsonify({
             'success': True,
-            'payment': Payment.to_dict(payment)
+            'payment': to_dict(payment)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -42,26 +56,36 @@ def get_payment(payment_id):
 
 @payments_bp.route('/customer/<customer_id>/payments', methods=['GET'])
 def get_customer_payments(customer_id):
-    """Get all payments for a customer"""
+    """Get payments for a customer (?page, ?limit), or only changes with ?since=<token>"""
     try:
-        payments = Payment.find_by_user(customer_id)
-        return jsonify({
-            'success': True,
-            'payments': [Payment.to_dict(p) for p in payments]
-        }), 200
+        projection, to_dict = sparse_fields(Payment)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            payments, removed = Payment.find_changes_by_user(customer_id, since, projection)
+            return jsonify(sync_response('payments', payments, to_dict, sync_point, removed)), 200
+        
+        skip, limit = page_args(None)
+        payments = Payment.find_by_user(customer_id, skip, limit, projection)
+        return jsonify(sync_response('payments', payments, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
 @payments_bp.route('/provider/<provider_id>/payments', methods=['GET'])
 def get_provider_payments(provider_id):
-    """Get all payments for a provider"""
+    """Get payments for a provider (?page, ?limit), or only changes with ?since=<token>"""
     try:
-        payments = Payment.find_by_provider(provider_id)
-        return jsonify({
-            'success': True,
-            'payments': [Payment.to_dict(p) for p in payments]
-        }), 200
+        projection, to_dict = sparse_fields(Payment)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            payments, removed = Payment.find_changes_by_provider(provider_id, since, projection)
+            return jsonify(sync_response('payments', payments, to_dict, sync_point, removed)), 200
+        
+        skip, limit = page_args(None)
+        payments = Payment.find_by_provider(provider_id, skip, limit, projection)
+        return jsonify(sync_response('payments', payments, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
@@ -70,13 +94,14 @@ def get_provider_payments(provider_id):
 def get_subscription_payment(subscription_id):
     """Get payment by subscription ID"""
     try:
-        payment = Payment.find_by_subscription(subscription_id)
+        projection, to_dict = sparse_fields(Payment)
+        payment = Payment.find_by_subscription(subscription_id, projection)
         if not payment:
             return jsonify({'success': False, 'message': 'Payment not found'}), 404
         
         return jsonify({
             'success': True,
-            'payment': Payment.to_dict(payment)
+            'payment': to_dict(payment)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -86,13 +111,14 @@ def get_subscription_payment(subscription_id):
 def get_booking_payment(booking_id):
     """Get payment by booking ID"""
     try:
-        payment = Payment.find_by_booking(booking_id)
+        projection, to_dict = sparse_fields(Payment)
+        payment = Payment.find_by_booking(booking_id, projection)
         if not payment:
             return jsonify({'success': False, 'message': 'Payment not found'}), 404
         
         return jsonify({
             'success': True,
-            'payment': Payment.to_dict(payment)
+            'payment': to_dict(payment)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
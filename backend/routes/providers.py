@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from backend.models import ProviderScore
+from backend.utils.ranking import ranking
+from backend.utils.schedule import schedule, parse_time
+
+providers_bp = Blueprint('providers', __name__)
+
+MAX_TOP_K = 100
+DEFAULT_SCHEDULE_DAYS = 7
+MAX_SCHEDULE_DAYS = 92
+
+
+@providers_bp.route('/providers/top', methods=['GET'])
+def get_top_providers():
+    """Get the best-ranked providers (?service_type, ?area, ?k)"""
+    try:
+        k = min(max(int(request.args.get('k', 10)), 1), MAX_TOP_K)
+        providers = ranking.top(request.args.get('service_type'), request.args.get('area'), k)
+        return jsonify({
+            'success': True,
+            'providers': providers
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@providers_bp.route('/provider/<provider_id>/score', methods=['GET'])
+def get_provider_score(provider_id):
+    """Get a provider's reputation score"""
+    try:
+        score = ProviderScore.find_by_provider(provider_id)
+        if not score:
+            return jsonify({'success': False, 'message': 'Score not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'score': ProviderScore.to_dict(score)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@providers_bp.route('/provider/<provider_id>/schedule', methods=['GET'])
+def get_provider_schedule(provider_id):
+    """Get a provider's visits between ?from and ?to (ISO 8601; default the next 7 days)"""
+    try:
+        start = parse_time(request.args.get('from')) or datetime.utcnow()
+        end = parse_time(request.args.get('to')) or start + timedelta(days=DEFAULT_SCHEDULE_DAYS)
+        if end <= start:
+            return jsonify({'success': False, 'message': 'to must be after from'}), 400
+        if end - start > timedelta(days=MAX_SCHEDULE_DAYS):
+            return jsonify({'success': False, 'message': f'Range is limited to {MAX_SCHEDULE_DAYS} days'}), 400
+        
+        return jsonify({
+            'success': True,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'visits': schedule.window(provider_id, start, end)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
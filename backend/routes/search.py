@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify
+from backend.models import InstantBooking, User
+from backend.utils.search import booking_index, provider_index
+from backend.utils.paging import page_args
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search/bookings', methods=['GET'])
+def search_bookings():
+    """Search bookings by description, address and service type (?q, ?status, ?service_type, ?provider_id, ?customer_id)"""
+    try:
+        offset, limit = page_args()
+        total, hits = booking_index.search(request.args.get('q', ''), request.args, offset, limit)
+        bookings = InstantBooking.find_by_ids([doc_id for doc_id, _ in hits])
+        return jsonify({
+            'success': True,
+            'total': total,
+            'bookings': [InstantBooking.to_dict(b) for b in bookings]
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@search_bp.route('/search/providers', methods=['GET'])
+def search_providers():
+    """Search providers by service type, service area and name (?q, ?service_type, ?service_area, ?status)"""
+    try:
+        offset, limit = page_args()
+        total, hits = provider_index.search(request.args.get('q', ''), request.args, offset, limit)
+        providers = User.find_by_ids([doc_id for doc_id, _ in hits])
+        return jsonify({
+            'success': True,
+            'total': total,
+            'providers': [User.to_dict(p) for p in providers]
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
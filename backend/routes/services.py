@@ -0,0 +1,108 @@
+from flask import Blueprint, request, jsonify
+from backend.models import Service
+from backend.utils.catalog import catalog, valid_price
+
+services_bp = Blueprint('services', __name__)
+
+
+def validate_prices(prices):
+    """Error message for an invalid plan -> price mapping, or None"""
+    if not isinstance(prices, dict):
+        return 'prices must be an object mapping plans to prices'
+    for plan, price in prices.items():
+        if plan in Service.PLANS and not valid_price(price):
+            return f'prices.{plan} must be a non-negative number'
+    return None
+
+
+@services_bp.route('/services', methods=['GET'])
+def get_services():
+    """Browse the catalog (?service_type, ?area, ?band, ?max_price, ?plan), served from memory"""
+    try:
+        max_price = request.args.get('max_price')
+        services = catalog.find(
+            service_type=request.args.get('service_type'),
+            area=request.args.get('area'),
+            band=request.args.get('band'),
+            max_price=float(max_price) if max_price else None,
+            plan=request.args.get('plan', 'monthly')
+        )
+        version = catalog.version
+        if request.if_none_match.contains(version):
+            return '', 304, {'ETag': f'"{version}"'}
+        
+        return jsonify({
+            'success': True,
+            'version': version,
+            'services': services
+        }), 200, {'ETag': f'"{version}"'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@services_bp.route('/services/<service_id>', methods=['GET'])
+def get_service(service_id):
+    """Get a catalog service by ID"""
+    service = catalog.get(service_id)
+    if not service:
+        return jsonify({'success': False, 'message': 'Service not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'service': service
+    }), 200
+
+
+@services_bp.route('/services', methods=['POST'])
+def create_service():
+    """Create a new catalog service"""
+    data = request.get_json()
+    
+    # Validate required fields
+    required_fields = ['providerId', 'providerName', 'serviceType', 'location', 'prices']
+    for field in required_fields:
+        if not data.get(field):
+            return jsonify({'success': False, 'message': f'{field} is required'}), 400
+    error = validate_prices(data['prices'])
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    service = Service.create(data)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Service created successfully',
+        'service': Service.to_dict(service)
+    }), 201
+
+
+@services_bp.route('/services/<service_id>', methods=['PUT'])
+def update_service(service_id):
+    """Update a catalog service (prices, description, deactivate, etc.)"""
+    try:
+        data = request.get_json()
+        
+        service = Service.find_by_id(service_id)
+        if not service:
+            return jsonify({'success': False, 'message': 'Service not found'}), 404
+        
+        # Update service with provided fields
+        updates = {}
+        for field in ['description', 'location', 'image', 'status', 'service_type']:
+            if field in data:
+                updates[field] = data[field]
+        if 'prices' in data:
+            error = validate_prices(data['prices'])
+            if error:
+                return jsonify({'success': False, 'message': error}), 400
+            updates['prices'] = {plan: price for plan, price in data['prices'].items() if plan in Service.PLANS}
+        
+        updated_service = Service.update(service_id, updates)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Service updated successfully',
+            'service': Service.to_dict(updated_service)
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
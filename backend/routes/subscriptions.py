@@ -1,22 +1,77 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response
 from backend.models import Subscription
+from backend.utils.sync import parse_since, sync_response
+from backend.utils.fields import sparse_fields
+from backend.utils.hot_reads import active_subscriptions
+from backend.utils.catalog import catalog
+from backend.utils.schedule import schedule, parse_time
+from backend.utils.notifications import notify_new_subscription
+from backend.config import CATALOG_STRICT
 
 subscriptions_bp = Blueprint('subscriptions', __name__)
 
+
+def validate_subscription(data):
+    """Error (message, status) for invalid subscription request data, or None"""
+    # Validate required fields
+    required_fields = ['customerId', 'serviceId', 'providerId', 'plan', 'price', 'serviceName', 'providerName']
+    for field in required_fields:
+        if not data.get(field):
+            return f'{field} is required', 400
+    try:
+        price = float(data['price'])
+    except (TypeError, ValueError):
+        return 'price must be a number', 400
+    
+    # Validate against the in-memory catalog when the service is listed there
+    service = catalog.get(data['serviceId'])
+    if service:
+        if service['provider_id'] != data['providerId']:
+            return 'Provider does not offer this service', 400
+        catalog_price = service['prices'].get(data['plan'])
+        if catalog_price is None:
+            return 'Plan not offered for this service', 400
+        if price != float(catalog_price):
+            return 'Price does not match the catalog', 400
+    elif CATALOG_STRICT:
+        return 'Service not found', 404
+    
+    # The first visit is at startDate (ISO 8601, default now); build() takes the parsed value
+    if isinstance(data.get('startDate'), str):
+        try:
+            data['startDate'] = parse_time(data['startDate'])
+        except ValueError:
+            return 'startDate must be an ISO 8601 timestamp', 400
+        if data['startDate'] and data['startDate'] < datetime.utcnow():
+            return 'startDate must not be in the past', 400
+    
+    # Refuse subscriptions whose visits would overbook the provider
+    clash = schedule.subscription_conflict(Subscription.build(data))
+    if clash:
+        return f'Provider has no free visit slot at {clash.isoformat()}', 409
+    return None
+
+
 @subscriptions_bp.route('/subscription', methods=['POST'])
 def create_subscription():
     """Create a new subscription"""
     data = request.get_json()
     
-    # Validate required fields
-    required_fields = ['customerId', 'serviceId', 'providerId', 'plan', 'price', 'serviceName', 'providerName']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'success': False, 'message': f'{field} is required'}), 400
+    error = validate_subscription(data)
+    if error:
+        message, status = error
+        return jsonify({'success': False, 'message': message}), status
     
     # Create subscription in MongoDB
     subscription = Subscription.create(data)
     
+    # Queue it for the provider's next digest
+    try:
+        notify_new_subscription(subscription)
+    except Exception as e:
+        print(f"Notification queue error: {type(e).__name__}: {str(e)}")
+    
     return jsonify({
         'success': True,
         'message': 'Subscription created successfully',
@@ -28,13 +83,14 @@ def create_subscription():
 def get_subscription(subscription_id):
     """Get a subscription by ID"""
     try:
-        subscription = Subscription.find_by_id(subscription_id)
+        projection, to_dict = sparse_fields(Subscription)
+        subscription = Subscription.find_by_id(subscription_id, projection)
         if not subscription:
             return jsonify({'success': False, 'message': 'Subscription not found'}), 404
         
         return jsonify({
             'success': True,
-            'subscription': Subscription.to_dict(subscription)
+            'subscription': to_dict(subscription)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -42,39 +98,55 @@ def get_subscription(subscription_id):
 
 @subscriptions_bp.route('/customer/<customer_id>/subscriptions', methods=['GET'])
 def get_customer_subscriptions(customer_id):
-    """Get all subscriptions for a customer"""
+    """Get all subscriptions for a customer, or only changes with ?since=<token>"""
     try:
-        subscriptions = Subscription.find_by_customer(customer_id)
-        return jsonify({
-            'success': True,
-            'subscriptions': [Subscription.to_dict(s) for s in subscriptions]
-        }), 200
+        projection, to_dict = sparse_fields(Subscription)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            subscriptions, removed = Subscription.find_changes_by_customer(customer_id, since, projection)
+            return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point, removed)), 200
+        
+        subscriptions = Subscription.find_by_customer(customer_id, projection)
+        return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
 @subscriptions_bp.route('/provider/<provider_id>/subscriptions', methods=['GET'])
 def get_provider_subscriptions(provider_id):
-    """Get all subscriptions for a provider"""
+    """Get all subscriptions for a provider, or only changes with ?since=<token>"""
     try:
-        subscriptions = Subscription.find_by_provider(provider_id)
-        return jsonify({
-            'success': True,
-            'subscriptions': [Subscription.to_dict(s) for s in subscriptions]
-        }), 200
+        projection, to_dict = sparse_fields(Subscription)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            subscriptions, removed = Subscription.find_changes_by_provider(provider_id, since, projection)
+            return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point, removed)), 200
+        
+        subscriptions = Subscription.find_by_provider(provider_id, projection)
+        return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point)), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
 @subscriptions_bp.route('/subscriptions/active', methods=['GET'])
 def get_active_subscriptions():
-    """Get all active subscriptions"""
+    """Get all active subscriptions, or only changes with ?since=<token>"""
+    def read():
+        projection, to_dict = sparse_fields(Subscription)
+        since = parse_since(request.args.get('since'))
+        sync_point = datetime.utcnow()
+        if since:
+            subscriptions, removed = Subscription.find_active_changes(since, projection)
+            return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point, removed)).get_data()
+        
+        subscriptions = Subscription.find_all_active(projection)
+        return jsonify(sync_response('subscriptions', subscriptions, to_dict, sync_point)).get_data()
+    
     try:
-        subscriptions = Subscription.find_all_active()
-        return jsonify({
-            'success': True,
-            'subscriptions': [Subscription.to_dict(s) for s in subscriptions]
-        }), 200
+        # Every caller gets the same answer, so identical reads share one query
+        return Response(active_subscriptions.get(request.full_path, read), mimetype='application/json'), 200
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
@@ -0,0 +1,42 @@
+"""Storage backends for the model classes.
+
+The models use collections through the pymongo API. STORAGE_BACKEND
+picks what is behind it: 'mongo' (the default) connects to MongoDB, and
+'memory' keeps everything in process (backend.storage.memory) so tests
+and benchmarks run without a mongod and measure only Python-side cost.
+The suite under backend/tests uses it (python -m pytest backend/tests);
+its parity tests also run against MongoDB when MONGO_TEST_URI answers.
+"""
+from backend.config import STORAGE_BACKEND, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+
+DATABASE_NAME = 'local_service_platform'
+
+
+def connect(backend=STORAGE_BACKEND):
+    """Database handle for the configured backend, behind the mongo circuit breaker"""
+    from backend.storage.guard import GuardedDatabase
+    if backend == 'mongo':
+        from pymongo import MongoClient
+        client = MongoClient(
+            'mongodb://localhost:27017/',
+            serverSelectionTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS
+        )
+        return GuardedDatabase(client[DATABASE_NAME])
+    if backend == 'memory':
+        from backend.storage.memory import MemoryDatabase
+        return GuardedDatabase(MemoryDatabase(DATABASE_NAME))
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r} (expected 'mongo' or 'memory')")
+
+
+def bucket(db, name):
+    """File bucket (GridFS, or its in-memory stand-in) on db"""
+    from backend.storage.guard import GuardedDatabase
+    from backend.storage.memory import MemoryDatabase, MemoryBucket
+    if isinstance(db, GuardedDatabase):
+        db = db.database
+    if isinstance(db, MemoryDatabase):
+        return MemoryBucket(db, bucket_name=name)
+    from gridfs import GridFSBucket
+    return GridFSBucket(db, bucket_name=name)
@@ -0,0 +1,97 @@
+"""Circuit-breaker wrapper around a database handle.
+
+Every collection method call goes through the mongo breaker: calls fail
+fast with CircuitOpenError while it is open, and connection failures and
+timeouts count towards opening it. Cursors are wrapped too, so errors
+raised while iterating are counted like any other.
+"""
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, WTimeoutError
+from backend.utils.resilience import mongo_breaker, mark_failure, inject
+
+FAILURES = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+
+
+def is_failure(exc):
+    return isinstance(exc, FAILURES)
+
+
+class GuardedCursor:
+    """Cursor proxy that reports the outcome of its first batch (and any later error)"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.reported = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self.cursor else result
+        return chained
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            doc = next(self.cursor)
+        except StopIteration:
+            self.report(True)
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.report(False)
+                mark_failure(mongo_breaker.name)
+            raise
+        self.report(True)
+        return doc
+
+    def report(self, ok):
+        if not self.reported or not ok:
+            self.reported = True
+            mongo_breaker.record(ok)
+
+
+class GuardedCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self.collection, name)
+        if not callable(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            mongo_breaker.check()
+            try:
+                inject(mongo_breaker.name)
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                failed = is_failure(e)
+                mongo_breaker.record(not failed)
+                if failed:
+                    mark_failure(mongo_breaker.name)
+                raise
+            if hasattr(result, '__next__'):
+                # Lazy: the server is only contacted when iteration starts
+                return GuardedCursor(result)
+            mongo_breaker.record(True)
+            return result
+        return guarded
+
+
+class GuardedDatabase:
+    def __init__(self, database):
+        self.database = database
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = GuardedCollection(self.database[name])
+        return self.collections[name]
+
+    def command(self, *args, **kwargs):
+        return GuardedCollection(self.database).command(*args, **kwargs)
@@ -0,0 +1,774 @@
+"""In-process implementation of the pymongo API subset the models use.
+
+Documents live in a dict keyed by _id per collection. Every create_index
+also builds a hash index on its first field, and queries with an equality
+or $in on an indexed field only scan that bucket, so lookups by id,
+customer, provider or status stay cheap as collections grow. Unique
+indexes raise DuplicateKeyError like the server. Documents are copied in
+and out, so callers cannot mutate stored state.
+
+Not supported: transactions, TTL expiry, text search, and aggregation
+stages other than $match/$group/$sort/$skip/$limit.
+"""
+import io
+import re
+import threading
+from datetime import datetime
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from pymongo.operations import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult, BulkWriteResult
+
+MISSING = object()
+
+TYPE_NAMES = {
+    'string': str,
+    'objectId': ObjectId,
+    'date': datetime,
+    'bool': bool,
+    'int': int,
+    'double': float,
+    'object': dict,
+    'array': list
+}
+
+
+def copy(value):
+    """Copy nested dicts and lists; leaves are immutable (or treated as such)"""
+    if isinstance(value, dict):
+        return {k: copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy(v) for v in value]
+    return value
+
+
+def get_path(doc, path):
+    """Values at a dotted path, descending into arrays; [] when missing"""
+    values = [doc]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    found.extend(v[part] for v in value if isinstance(v, dict) and part in v)
+        values = found
+    return values
+
+
+def type_rank(value):
+    """Cross-type ordering used by the server for sorts"""
+    if value is None or value is MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 6
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 5
+    if isinstance(value, datetime):
+        return 7
+    return 8
+
+
+def compare(op, actual, expected):
+    """Range comparison; values of different types never match"""
+    if type_rank(actual) != type_rank(expected) or actual is None or expected is None:
+        return op in ('$gte', '$lte') and actual is None and expected is None
+    try:
+        if op == '$gt':
+            return actual > expected
+        if op == '$gte':
+            return actual >= expected
+        if op == '$lt':
+            return actual < expected
+        return actual <= expected
+    except TypeError:
+        return False
+
+
+def equals(values, expected):
+    """Equality against the values at a path (None also matches a missing field)"""
+    if not values:
+        return expected is None
+    for value in values:
+        if value == expected and type_rank(value) == type_rank(expected):
+            return True
+        if isinstance(value, list) and any(v == expected for v in value):
+            return True
+    return False
+
+
+def flatten(values):
+    for value in values:
+        if isinstance(value, list):
+            yield from value
+        yield value
+
+
+def match_operator(values, op, arg, spec):
+    if op == '$eq':
+        return equals(values, arg)
+    if op == '$ne':
+        return not equals(values, arg)
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        return any(compare(op, v, arg) for v in flatten(values)) or (not values and compare(op, None, arg))
+    if op == '$in':
+        return any(equals(values, a) if not isinstance(a, re.Pattern) else match_regex(values, a) for a in arg)
+    if op == '$nin':
+        return not match_operator(values, '$in', arg, spec)
+    if op == '$exists':
+        return bool(values) == bool(arg)
+    if op == '$regex':
+        flags = re.IGNORECASE if 'i' in spec.get('$options', '') else 0
+        return match_regex(values, re.compile(arg, flags) if isinstance(arg, str) else arg)
+    if op == '$options':
+        return True
+    if op == '$type':
+        types = arg if isinstance(arg, list) else [arg]
+        if 'null' in types and any(v is None for v in values):
+            return True
+        kinds = tuple(TYPE_NAMES[t] for t in types if t in TYPE_NAMES)
+        return any(isinstance(v, kinds) and not (isinstance(v, bool) and bool not in kinds) for v in values)
+    if op == '$not':
+        return not match_condition(values, arg)
+    raise NotImplementedError(f'Query operator {op} is not supported by the memory backend')
+
+
+def match_regex(values, pattern):
+    return any(isinstance(v, str) and pattern.search(v) for v in flatten(values))
+
+
+def match_condition(values, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        return all(match_operator(values, op, arg, condition) for op, arg in condition.items())
+    if isinstance(condition, re.Pattern):
+        return match_regex(values, condition)
+    return equals(values, condition)
+
+
+def matches(doc, query):
+    """True if doc satisfies a query document"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(doc, q) for q in condition):
+                return False
+        elif not match_condition(get_path(doc, key), condition):
+            return False
+    return True
+
+
+def sort_docs(docs, sort):
+    """Sort by [(field, direction)] with the server's cross-type ordering"""
+    for field, direction in reversed(sort):
+        def key(doc, field=field):
+            values = get_path(doc, field)
+            value = values[0] if values else None
+            return type_rank(value), value if type_rank(value) not in (0, 3, 4) else 0
+        docs.sort(key=key, reverse=direction == -1)
+    return docs
+
+
+def normalize_sort(key, direction=None):
+    if isinstance(key, str):
+        return [(key, direction if direction is not None else 1)]
+    return list(key)
+
+
+def project(doc, projection):
+    """Apply an inclusion or exclusion projection"""
+    if not projection:
+        return copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = dict.fromkeys(projection, 1)
+    include = any(v for k, v in projection.items() if k != '_id') or projection == {'_id': 1}
+    if include:
+        result = {k: copy(doc[k]) for k, v in projection.items() if v and k in doc and k != '_id'}
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    return {k: copy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc, path):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def apply_update(doc, update, inserting=False):
+    """Apply update operators to doc in place"""
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                set_path(doc, path, copy(value))
+            elif op == '$unset':
+                unset_path(doc, path)
+            elif op == '$inc':
+                current = get_path(doc, path)
+                set_path(doc, path, (current[0] if current else 0) + value)
+            elif op in ('$min', '$max'):
+                current = get_path(doc, path)
+                if not current or (value < current[0] if op == '$min' else value > current[0]):
+                    set_path(doc, path, value)
+            elif op == '$push':
+                current = get_path(doc, path)
+                set_path(doc, path, (current[0] if current else []) + [copy(value)])
+            elif op == '$addToSet':
+                current = get_path(doc, path)
+                items = current[0] if current else []
+                set_path(doc, path, items if value in items else items + [copy(value)])
+            elif op != '$setOnInsert':
+                raise NotImplementedError(f'Update operator {op} is not supported by the memory backend')
+
+
+def upsert_seed(query):
+    """Fields an upsert copies from the query's equality conditions"""
+    seed = {}
+    for key, condition in query.items():
+        if key == '$and':
+            for q in condition:
+                seed.update(upsert_seed(q))
+        elif not key.startswith('$') and not (isinstance(condition, dict) and any(k.startswith('$') for k in condition)):
+            set_path(seed, key, copy(condition))
+    return seed
+
+
+def index_keys(value):
+    """Hashable index keys for a field value (arrays index each element)"""
+    values = value if isinstance(value, list) else [value]
+    keys = []
+    for v in values:
+        try:
+            hash(v)
+        except TypeError:
+            return None
+        keys.append(v)
+    return keys or [None]
+
+
+class HashIndex:
+    """Field value -> set of _ids; documents with unhashable values are always scanned"""
+
+    def __init__(self, field):
+        self.field = field
+        self.buckets = {}
+        self.loose = set()
+
+    def keys(self, doc):
+        values = get_path(doc, self.field)
+        return index_keys(values[0] if len(values) == 1 else (values or None))
+
+    def add(self, doc):
+        keys = self.keys(doc)
+        if keys is None:
+            self.loose.add(doc['_id'])
+            return
+        for key in keys:
+            self.buckets.setdefault(key, set()).add(doc['_id'])
+
+    def remove(self, doc):
+        keys = self.keys(doc)
+        if keys is None:
+            self.loose.discard(doc['_id'])
+            return
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(doc['_id'])
+                if not bucket:
+                    del self.buckets[key]
+
+    def lookup(self, condition):
+        """Candidate _ids for a condition, or None if it cannot use the index"""
+        if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+            if set(condition) - {'$in', '$eq'}:
+                return None
+            wanted = condition.get('$in', []) + ([condition['$eq']] if '$eq' in condition else [])
+        elif isinstance(condition, (dict, list, re.Pattern)):
+            return None
+        else:
+            wanted = [condition]
+        ids = set(self.loose)
+        for value in wanted:
+            try:
+                ids |= self.buckets.get(value, set())
+            except TypeError:
+                return None
+        return ids
+
+
+class UniqueIndex:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.owners = {}
+
+    def key(self, doc):
+        key = []
+        for field in self.fields:
+            values = get_path(doc, field)
+            value = values[0] if values else None
+            key.append(repr(value) if isinstance(value, (dict, list)) else value)
+        return tuple(key)
+
+    def check(self, doc):
+        owner = self.owners.get(self.key(doc))
+        if owner is not None and owner != doc['_id']:
+            raise DuplicateKeyError(
+                f'E11000 duplicate key error collection index: {self.name} dup key: {self.key(doc)}', 11000
+            )
+
+
+class MemoryCursor:
+    """Lazily evaluated result set supporting sort/skip/limit chaining"""
+
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key, direction=None):
+        self._sort = normalize_sort(key, direction)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        self._results = iter(())
+
+    def __iter__(self):
+        if self._results is None:
+            docs = self.collection._select(self.query, self._sort)
+            docs = docs[self._skip:self._skip + self._limit] if self._limit else docs[self._skip:]
+            self._results = iter([project(d, self.projection) for d in docs])
+        return self._results
+
+    def __next__(self):
+        return next(iter(self))
+
+
+class MemoryCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = {}
+        self.order = {}
+        self.sequence = 0
+        self.indexes = {'_id': HashIndex('_id')}
+        self.unique = []
+        self.lock = threading.RLock()
+
+    # Indexes
+
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        fields = [k for k, _ in normalize_sort(keys)]
+        name = name or '_'.join(f'{k}_{d}' for k, d in normalize_sort(keys))
+        with self.lock:
+            if fields[0] not in self.indexes:
+                index = self.indexes[fields[0]] = HashIndex(fields[0])
+                for doc in self.docs.values():
+                    index.add(doc)
+            if unique and not any(u.name == name for u in self.unique):
+                index = UniqueIndex(name, fields)
+                for doc in self.docs.values():
+                    index.check(doc)
+                    index.owners[index.key(doc)] = doc['_id']
+                self.unique.append(index)
+        return name
+
+    def _index(self, doc):
+        for index in self.indexes.values():
+            index.add(doc)
+        for index in self.unique:
+            index.owners[index.key(doc)] = doc['_id']
+
+    def _unindex(self, doc):
+        for index in self.indexes.values():
+            index.remove(doc)
+        for index in self.unique:
+            index.owners.pop(index.key(doc), None)
+
+    def _candidates(self, query):
+        """Stored documents that may match query, narrowed by the smallest usable index"""
+        best = None
+        for field, condition in query.items():
+            index = self.indexes.get(field)
+            if index is None:
+                continue
+            ids = index.lookup(condition)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        if best is None:
+            return list(self.docs.values())
+        return [self.docs[i] for i in best if i in self.docs]
+
+    def _select(self, query, sort=None):
+        """Stored (uncopied) documents matching query, optionally sorted"""
+        if not isinstance(query, dict):
+            query = {'_id': query}
+        with self.lock:
+            docs = [d for d in self._candidates(query) if matches(d, query)]
+            if sort:
+                sort_docs(docs, sort)
+            elif len(docs) > 1:
+                # Natural order is insertion order, like an unsorted collection scan
+                docs.sort(key=lambda d: self.order[d['_id']])
+            return docs
+
+    def _store(self, doc, previous=None):
+        for index in self.unique:
+            index.check(doc)
+        if previous is not None:
+            self._unindex(previous)
+        else:
+            self.sequence += 1
+            self.order[doc['_id']] = self.sequence
+        self.docs[doc['_id']] = doc
+        self._index(doc)
+
+    # Reads
+
+    def find(self, filter=None, projection=None, **kwargs):
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get('sort'):
+            cursor.sort(kwargs['sort'])
+        if kwargs.get('skip'):
+            cursor.skip(kwargs['skip'])
+        if kwargs.get('limit'):
+            cursor.limit(kwargs['limit'])
+        return cursor
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        docs = self._select(filter or {}, normalize_sort(sort) if sort else None)
+        return project(docs[0], projection) if docs else None
+
+    def count_documents(self, filter, skip=0, limit=0, **kwargs):
+        docs = self._select(filter)[skip:]
+        return min(len(docs), limit) if limit else len(docs)
+
+    def estimated_document_count(self, **kwargs):
+        return len(self.docs)
+
+    def distinct(self, key, filter=None, **kwargs):
+        values = []
+        for doc in self._select(filter or {}):
+            for value in flatten(get_path(doc, key)):
+                if not isinstance(value, list) and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        docs = None
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == '$match':
+                docs = [copy(d) for d in self._select(arg)] if docs is None else [d for d in docs if matches(d, arg)]
+                continue
+            if docs is None:
+                docs = [copy(d) for d in self._select({})]
+            if op == '$group':
+                docs = group(docs, arg)
+            elif op == '$sort':
+                docs = sort_docs(docs, list(arg.items()))
+            elif op == '$skip':
+                docs = docs[arg:]
+            elif op == '$limit':
+                docs = docs[:arg]
+            else:
+                raise NotImplementedError(f'Aggregation stage {op} is not supported by the memory backend')
+        return iter(docs if docs is not None else [copy(d) for d in self._select({})])
+
+    # Writes
+
+    def insert_one(self, document, **kwargs):
+        document.setdefault('_id', ObjectId())
+        with self.lock:
+            if document['_id'] in self.docs:
+                raise DuplicateKeyError(f'E11000 duplicate key error dup key: {document["_id"]}', 11000)
+            self._store(copy(document))
+        return InsertOneResult(document['_id'], True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        inserted, errors = [], []
+        for i, document in enumerate(documents):
+            try:
+                inserted.append(self.insert_one(document).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({'index': i, 'code': 11000, 'errmsg': str(e), 'op': document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': [], 'nInserted': len(inserted),
+                                  'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []})
+        return InsertManyResult(inserted, True)
+
+    def _update(self, filter, update, upsert=False, multi=False, replace=False, sort=None):
+        """Shared update path; returns (matched, modified, upserted_id, before, after) of the last document"""
+        with self.lock:
+            targets = self._select(filter, normalize_sort(sort) if sort else None)
+            if not multi:
+                targets = targets[:1]
+            matched = modified = 0
+            before = after = None
+            for doc in targets:
+                new = {'_id': doc['_id'], **copy(update)} if replace else copy(doc)
+                if not replace:
+                    apply_update(new, update)
+                matched += 1
+                if new != doc:
+                    self._store(new, previous=doc)
+                    modified += 1
+                before, after = doc, new
+            if targets or not upsert:
+                return matched, modified, None, before, after
+            new = upsert_seed(filter)
+            if replace:
+                new.update(copy(update))
+            else:
+                apply_update(new, update, inserting=True)
+            new.setdefault('_id', ObjectId())
+            self._store(new)
+            return 0, 0, new['_id'], None, new
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert)
+        return UpdateResult({'n': matched or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert, multi=True)
+        return UpdateResult({'n': matched or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        matched, modified, upserted, _, _ = self._update(filter, replacement, upsert, replace=True)
+        return UpdateResult({'n': matched or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=False, **kwargs):
+        _, _, _, before, after = self._update(filter, update, upsert, sort=sort)
+        doc = after if return_document else before
+        return project(doc, projection) if doc is not None else None
+
+    def delete_one(self, filter, **kwargs):
+        return self._delete(filter, multi=False)
+
+    def delete_many(self, filter, **kwargs):
+        return self._delete(filter, multi=True)
+
+    def _delete(self, filter, multi):
+        with self.lock:
+            targets = self._select(filter)
+            if not multi:
+                targets = targets[:1]
+            for doc in targets:
+                self._unindex(doc)
+                del self.docs[doc['_id']]
+                del self.order[doc['_id']]
+        return DeleteResult({'n': len(targets)}, True)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        counts = {'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'nUpserted': 0, 'upserted': []}
+        for i, op in enumerate(requests):
+            if isinstance(op, InsertOne):
+                self.insert_one(op._doc)
+                counts['nInserted'] += 1
+            elif isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+                matched, modified, upserted, _, _ = self._update(
+                    op._filter, op._doc, op._upsert,
+                    multi=isinstance(op, UpdateMany), replace=isinstance(op, ReplaceOne)
+                )
+                counts['nMatched'] += matched
+                counts['nModified'] += modified
+                if upserted is not None:
+                    counts['nUpserted'] += 1
+                    counts['upserted'].append({'index': i, '_id': upserted})
+            elif isinstance(op, (DeleteOne, DeleteMany)):
+                counts['nRemoved'] += self._delete(op._filter, multi=isinstance(op, DeleteMany)).deleted_count
+            else:
+                raise NotImplementedError(f'{type(op).__name__} is not supported by the memory backend')
+        return BulkWriteResult(counts, True)
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+
+def evaluate(expression, doc):
+    """Evaluate a $group expression against a document"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        values = get_path(doc, expression[1:])
+        return values[0] if values else None
+    if isinstance(expression, dict):
+        if '$dateToString' in expression:
+            spec = expression['$dateToString']
+            date = evaluate(spec['date'], doc)
+            return date.strftime(spec['format']) if isinstance(date, datetime) else None
+        if any(k.startswith('$') for k in expression):
+            raise NotImplementedError(f'Expression {list(expression)} is not supported by the memory backend')
+        return {k: evaluate(v, doc) for k, v in expression.items()}
+    return expression
+
+
+def group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = evaluate(spec['_id'], doc)
+        hashable = repr(key)
+        if hashable not in groups:
+            groups[hashable] = {'_id': key, 'rows': []}
+        groups[hashable]['rows'].append(doc)
+    results = []
+    for g in groups.values():
+        row = {'_id': g['_id']}
+        for field, accumulator in spec.items():
+            if field == '_id':
+                continue
+            (op, expression), = accumulator.items()
+            values = [evaluate(expression, d) for d in g['rows']]
+            numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+            if op == '$sum':
+                row[field] = sum(numbers)
+            elif op == '$avg':
+                row[field] = sum(numbers) / len(numbers) if numbers else None
+            elif op in ('$min', '$max'):
+                present = [v for v in values if v is not None]
+                row[field] = (min if op == '$min' else max)(present) if present else None
+            elif op == '$first':
+                row[field] = values[0]
+            elif op == '$last':
+                row[field] = values[-1]
+            elif op == '$push':
+                row[field] = values
+            else:
+                raise NotImplementedError(f'Accumulator {op} is not supported by the memory backend')
+        results.append(row)
+    return results
+
+
+class MemoryDatabase:
+    """Dict of MemoryCollections standing in for a pymongo Database"""
+
+    def __init__(self, name):
+        self.name = name
+        self.collections = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(self, name)
+            return self.collections[name]
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+    def drop_collection(self, name):
+        with self.lock:
+            collection = self.collections.get(name)
+            if collection:
+                with collection.lock:
+                    collection.docs.clear()
+                    collection.order.clear()
+                    for index in collection.indexes.values():
+                        index.buckets.clear()
+                        index.loose.clear()
+                    for index in collection.unique:
+                        index.owners.clear()
+
+    def command(self, name, *args, **kwargs):
+        raise NotImplementedError(f'Command {name} is not supported by the memory backend')
+
+
+class MemoryUpload:
+    def __init__(self, bucket, filename, metadata):
+        self._id = ObjectId()
+        self.bucket = bucket
+        self.filename = filename
+        self.metadata = metadata
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        self.buffer.write(data)
+
+    def abort(self):
+        self.buffer = None
+
+    def close(self):
+        if self.buffer is not None:
+            self.bucket.files[self._id] = (self.filename, self.metadata, self.buffer.getvalue())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemoryDownload(io.BytesIO):
+    def __init__(self, data, filename, metadata):
+        super().__init__(data)
+        self.length = len(data)
+        self.filename = filename
+        self.metadata = metadata
+
+
+class MemoryBucket:
+    """Stand-in for GridFSBucket holding whole files in memory"""
+
+    def __init__(self, database, bucket_name='fs'):
+        self.files = {}
+
+    def open_upload_stream(self, filename, metadata=None, **kwargs):
+        return MemoryUpload(self, filename, metadata)
+
+    def open_download_stream(self, file_id, **kwargs):
+        if file_id not in self.files:
+            raise NoFile(f'no file in gridfs with _id {file_id!r}')
+        filename, metadata, data = self.files[file_id]
+        return MemoryDownload(data, filename, metadata)
+
+    def delete(self, file_id, **kwargs):
+        if self.files.pop(file_id, None) is None:
+            raise NoFile(f'no file in gridfs with _id {file_id!r}')
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The models bind their collections at import time, so the backend has to
+# be chosen before anything under backend is imported
+os.environ['STORAGE_BACKEND'] = 'memory'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend import models  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    """Start every test with empty collections (indexes are kept)"""
+    database = models.db.database
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    models.ensure_indexes()
+    yield
+
+
+@pytest.fixture
+def client():
+    """Flask test client for the full app on the in-memory backend"""
+    from backend.app import app
+    return app.test_client()
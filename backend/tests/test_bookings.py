@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+
+from backend.models import InstantBooking, find_tiered
+
+CUSTOMER = '507f1f77bcf86cd799439011'
+PROVIDER = '507f1f77bcf86cd799439012'
+OTHER_PROVIDER = '507f1f77bcf86cd799439013'
+
+
+def new_booking(**fields):
+    data = {'customerId': CUSTOMER, 'customerName': 'Asha', 'serviceType': 'plumbing',
+            'description': 'Leaking tap', 'address': 'Anna Nagar, Chennai', 'phone': '9000000000'}
+    data.update(fields)
+    return InstantBooking.create(data)
+
+
+def backdate(booking, **fields):
+    """Set timestamps directly, bypassing the models' updated_at stamping"""
+    InstantBooking.collection.update_one({'_id': booking['_id']}, {'$set': fields})
+
+
+def test_only_one_provider_can_claim():
+    booking_id = str(new_booking()['_id'])
+    claimed = InstantBooking.claim(booking_id, PROVIDER, 'Ravi', 300)
+    assert claimed['status'] == 'claimed'
+    assert InstantBooking.claim(booking_id, OTHER_PROVIDER, 'Kumar', 300) is None
+    assert InstantBooking.update_if(booking_id, InstantBooking.acceptable_by(OTHER_PROVIDER),
+                                    {'status': 'rejected'}) is None
+    accepted = InstantBooking.update_if(booking_id, InstantBooking.acceptable_by(PROVIDER), {'status': 'accepted'})
+    assert accepted['status'] == 'accepted'
+
+
+def test_expired_claim_is_claimable_and_swept():
+    first, second = new_booking(), new_booking()
+    for booking in (first, second):
+        InstantBooking.claim(str(booking['_id']), PROVIDER, 'Ravi', 300)
+        backdate(booking, claim_expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+    # Claimable before the sweeper gets to it
+    assert InstantBooking.claim(str(first['_id']), OTHER_PROVIDER, 'Kumar', 300)['provider_id'] is not None
+    assert InstantBooking.release_expired_claims() == 1
+    swept = InstantBooking.find_by_id(str(second['_id']))
+    assert (swept['status'], swept['provider_id']) == ('pending', None)
+    assert 'claim_expires_at' not in swept
+
+
+def test_release_only_by_claiming_provider():
+    booking_id = str(new_booking()['_id'])
+    InstantBooking.claim(booking_id, PROVIDER, 'Ravi', 300)
+    assert InstantBooking.release_claim(booking_id, OTHER_PROVIDER) is None
+    assert InstantBooking.release_claim(booking_id, PROVIDER)['status'] == 'pending'
+
+
+def test_changes_since_include_updates_and_tombstones():
+    unchanged, updated, cancelled = new_booking(), new_booking(), new_booking()
+    old = datetime.utcnow() - timedelta(minutes=5)
+    for booking in (unchanged, updated, cancelled):
+        backdate(booking, updated_at=old)
+    since = datetime.utcnow() - timedelta(minutes=1)
+
+    InstantBooking.update(str(updated['_id']), {'description': 'Burst pipe'})
+    InstantBooking.update(str(cancelled['_id']), {'status': 'cancelled'})
+
+    changed, removed = InstantBooking.find_changes_by_customer(CUSTOMER, since)
+    assert {str(b['_id']) for b in changed} == {str(updated['_id']), str(cancelled['_id'])}
+    # A cancelled booking is still returned (with its new status), so it is not also listed as removed
+    assert removed == []
+
+    claimed = new_booking()
+    backdate(claimed, updated_at=old)
+    InstantBooking.claim(str(claimed['_id']), PROVIDER, 'Ravi', 300)
+    pending, removed = InstantBooking.find_pending_changes(since)
+    assert str(claimed['_id']) in removed
+    assert str(claimed['_id']) not in {str(b['_id']) for b in pending}
+    assert str(cancelled['_id']) in removed
+
+
+def test_tiered_paging_reads_archive_only_past_the_hot_window():
+    now = datetime.utcnow()
+    bookings = [new_booking(description=f'job {i}') for i in range(5)]
+    for i, booking in enumerate(bookings):
+        backdate(booking, created_at=now - timedelta(days=i * 100), status='completed')
+    assert InstantBooking.archive_before(now - timedelta(days=150), 100) == 3
+
+    hot_only = InstantBooking.find_by_customer(CUSTOMER)
+    assert [b['description'] for b in hot_only] == ['job 0', 'job 1']
+
+    pages = [InstantBooking.find_by_customer(CUSTOMER, skip, 2) for skip in (0, 2, 4)]
+    assert [[b['description'] for b in page] for page in pages] == [
+        ['job 0', 'job 1'], ['job 2', 'job 3'], ['job 4']
+    ]
+
+
+def test_tiered_paging_only_probes_the_archive_for_full_hot_pages():
+    reads = []
+
+    class Recording:
+        def __init__(self, collection):
+            self.collection = collection
+
+        def find(self, query, projection=None):
+            reads.append(projection)
+            return self.collection.find(query, projection)
+
+    now = datetime.utcnow()
+    for i in range(3):
+        backdate(new_booking(), created_at=now - timedelta(days=i))
+    old = new_booking()
+    backdate(old, created_at=now - timedelta(days=400), status='completed')
+    InstantBooking.archive_before(now - timedelta(days=180), 100)
+
+    archive = Recording(InstantBooking.archive)
+    assert len(find_tiered(InstantBooking.collection, archive, {}, 0, 2)) == 2
+    # Only the newest archived key was read
+    assert reads == [{'created_at': 1}]
+    assert find_tiered(InstantBooking.collection, archive, {}) and len(reads) == 1
+
+
+def test_tiered_paging_merges_tiers_that_overlap_in_time():
+    now = datetime.utcnow()
+    ages = {'new': 1, 'archived recent': 200, 'still accepted': 300, 'archived old': 400}
+    for description, days in ages.items():
+        booking = new_booking(description=description)
+        status = 'accepted' if description == 'still accepted' else 'completed'
+        backdate(booking, created_at=now - timedelta(days=days), status=status)
+    InstantBooking.archive_before(now - timedelta(days=180), 100)
+    assert InstantBooking.archive.count_documents({}) == 2
+
+    pages = [InstantBooking.find_by_customer(CUSTOMER, skip, 2) for skip in (0, 2)]
+    assert [[b['description'] for b in page] for page in pages] == [
+        ['new', 'archived recent'], ['still accepted', 'archived old']
+    ]
+
+
+def test_find_by_ids_falls_back_to_the_archive():
+    hot, cold = new_booking(), new_booking()
+    backdate(cold, created_at=datetime.utcnow() - timedelta(days=400), status='completed')
+    InstantBooking.archive_before(datetime.utcnow() - timedelta(days=180), 100)
+
+    ids = [str(cold['_id']), str(hot['_id'])]
+    assert [str(b['_id']) for b in InstantBooking.find_by_ids(ids)] == ids
+
+
+def test_provider_changes_only_remove_bookings_the_provider_could_see():
+    taken, elsewhere = new_booking(), new_booking()
+    InstantBooking.update(str(elsewhere['_id']), {'status': 'accepted', 'provider_id': OTHER_PROVIDER})
+    old = datetime.utcnow() - timedelta(minutes=5)
+    for booking in (taken, elsewhere):
+        backdate(booking, updated_at=old, unlisted_at=None)
+    since = datetime.utcnow() - timedelta(minutes=1)
+
+    # Leaves the pending pool this provider was shown
+    InstantBooking.claim(str(taken['_id']), OTHER_PROVIDER, 'Kumar', 300)
+    # Another provider's job, never in this provider's view
+    InstantBooking.update(str(elsewhere['_id']), {'status': 'completed'})
+
+    changed, removed = InstantBooking.find_changes_by_provider(PROVIDER, since)
+    assert changed == []
+    assert removed == [str(taken['_id'])]
+    assert InstantBooking.find_pending_changes(since)[1] == [str(taken['_id'])]
+
+
+def test_migration_moves_inline_media_out_of_bookings():
+    import base64
+    from backend.jobs.migrate_refs import migrate_media
+    from backend.models import Media
+
+    photo = new_booking()
+    voice = new_booking()
+    broken = new_booking()
+    png = base64.b64encode(b'\x89PNG fake image bytes').decode()
+    InstantBooking.collection.update_one({'_id': photo['_id']},
+                                         {'$set': {'image': f'data:image/png;base64,{png}', 'voice_note': None}})
+    InstantBooking.collection.update_one({'_id': voice['_id']},
+                                         {'$set': {'voice_note': base64.b64encode(b'webm audio').decode()}})
+    InstantBooking.collection.update_one({'_id': broken['_id']}, {'$set': {'image': 'not base64!'}})
+
+    assert migrate_media(InstantBooking.collection, batch_size=2) == 2
+
+    photo = InstantBooking.collection.find_one({'_id': photo['_id']})
+    assert 'image' not in photo and 'voice_note' not in photo
+    media = Media.find_by_id(photo['image_id'])
+    assert (media['kind'], media['content_type'], media['status']) == ('image', 'image/png', 'uploaded')
+    stream, _ = Media.open(media)
+    assert stream.read() == b'\x89PNG fake image bytes'
+
+    voice = InstantBooking.collection.find_one({'_id': voice['_id']})
+    assert Media.find_by_id(voice['voice_note_id'])['content_type'] == 'audio/webm'
+
+    broken = InstantBooking.collection.find_one({'_id': broken['_id']})
+    assert broken['image'] == 'not base64!' and broken['image_id'] is None
+    assert Media.collection.count_documents({}) == 2
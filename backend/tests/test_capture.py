@@ -0,0 +1,17 @@
+from backend.utils.capture import scrub, REDACTED
+
+
+def test_scrub_redacts_pii_whatever_its_type():
+    body = {'email': 'asha@example.com', 'otp': 482913, 'phone': 9000000000, 'mobile': 9.0e9,
+            'address': {'street': '12 Anna Nagar', 'city': 'Chennai'}, 'name': None,
+            'image': 'aGVsbG8=', 'amount': 500, 'urgent': True, 'plan': 'monthly'}
+    assert scrub(body) == {
+        'email': REDACTED, 'otp': REDACTED, 'phone': REDACTED, 'mobile': REDACTED,
+        'address': REDACTED, 'name': None,
+        'image': {'$bytes': 8}, 'amount': 500, 'urgent': True, 'plan': 'monthly'
+    }
+
+
+def test_scrub_reaches_into_nested_bodies():
+    body = {'payment': {'amount': 99.5}, 'subscription': {'customerName': 'Asha', 'phone': 9000000000}}
+    assert scrub(body) == {'payment': {'amount': 99.5}, 'subscription': {'customerName': REDACTED, 'phone': REDACTED}}
@@ -0,0 +1,69 @@
+import pytest
+
+from backend.models import Checkout, InstantBooking, Payment, Subscription
+
+CUSTOMER = '507f1f77bcf86cd799439011'
+PROVIDER = '507f1f77bcf86cd799439012'
+
+
+def accepted_booking():
+    booking = InstantBooking.create({
+        'customerId': CUSTOMER, 'customerName': 'Asha', 'serviceType': 'plumbing',
+        'description': 'Leaking tap', 'address': 'Chennai', 'phone': '9000000000'
+    })
+    return InstantBooking.update(str(booking['_id']), {'status': 'accepted', 'provider_id': PROVIDER})
+
+
+def payment(**fields):
+    data = {'userId': CUSTOMER, 'customerId': CUSTOMER, 'providerId': PROVIDER,
+            'amount': 500, 'type': 'instant', 'status': 'success'}
+    data.update(fields)
+    return Payment.build(data)
+
+
+def subscription():
+    return Subscription.build({
+        'customerId': CUSTOMER, 'serviceId': '2', 'providerId': PROVIDER, 'plan': 'monthly',
+        'price': 500, 'serviceName': 'Plumbing', 'providerName': 'Ravi'
+    })
+
+
+def test_booking_checkout_completes_and_links_payment():
+    booking = accepted_booking()
+    before, after, _, paid = Checkout.run(str(booking['_id']), None, payment())
+    assert (before['status'], after['status']) == ('accepted', 'completed')
+    stored = Payment.find_by_booking(str(booking['_id']))
+    assert stored['_id'] == paid['_id']
+
+
+def test_booking_cannot_be_paid_twice():
+    booking_id = str(accepted_booking()['_id'])
+    Checkout.run(booking_id, None, payment())
+    with pytest.raises(ValueError):
+        Checkout.run(booking_id, None, payment())
+    assert Payment.collection.count_documents({}) == 1
+
+
+def test_unpayable_booking_is_refused():
+    booking_id = str(accepted_booking()['_id'])
+    InstantBooking.update(booking_id, {'status': 'cancelled'})
+    with pytest.raises(ValueError):
+        Checkout.run(booking_id, None, payment())
+    assert Payment.collection.count_documents({}) == 0
+
+
+def test_failed_payment_write_undoes_booking_and_subscription(monkeypatch):
+    booking = accepted_booking()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('payment write failed')
+    monkeypatch.setattr(Payment.collection, 'insert_one', fail)
+
+    with pytest.raises(RuntimeError):
+        Checkout.run(str(booking['_id']), subscription(), payment(type='subscription'))
+
+    restored = InstantBooking.find_by_id(str(booking['_id']))
+    assert restored['status'] == 'accepted'
+    assert restored.get('payment_id') is None
+    assert Subscription.collection.count_documents({}) == 0
+    assert Payment.collection.count_documents({}) == 0
@@ -0,0 +1,43 @@
+import io
+
+from werkzeug.formparser import FormDataParser
+
+from backend.models import Media
+from backend.routes import media as media_routes
+
+
+def upload(client, data, filename='leak.png', content_type='image/png'):
+    return client.post('/api/media', data={'file': (io.BytesIO(data), filename, content_type)},
+                       content_type='multipart/form-data')
+
+
+def test_upload_is_stored_and_referenced_by_bookings(client):
+    response = upload(client, b'\x89PNG image bytes')
+    assert response.status_code == 201
+    media = response.get_json()['media']
+    assert (media['kind'], media['size'], media['status']) == ('image', 16, 'uploaded')
+
+    response = client.post('/api/instant-booking', json={
+        'customerId': '507f1f77bcf86cd799439011', 'customerName': 'Asha', 'serviceType': 'plumbing',
+        'description': 'Leaking tap', 'address': 'Anna Nagar', 'phone': '9000000000', 'imageId': media['id']})
+    assert response.status_code == 201
+    assert response.get_json()['booking']['image_id'] == media['id']
+
+
+def test_oversized_upload_is_refused_before_the_form_is_parsed(client, monkeypatch):
+    monkeypatch.setattr(media_routes, 'MEDIA_MAX_BYTES', {'image': 10, 'audio': 10})
+    monkeypatch.setattr(media_routes, 'MEDIA_CHUNK_BYTES', 16)
+
+    def parse(*args, **kwargs):
+        raise AssertionError('form parsed')
+
+    monkeypatch.setattr(FormDataParser, 'parse', parse)
+    assert upload(client, b'x' * 100).status_code == 413
+    assert Media.collection.count_documents({}) == 0
+
+
+def test_request_bodies_past_the_app_limit_are_refused(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'MAX_CONTENT_LENGTH', 100)
+    response = client.post('/api/instant-booking', json={'description': 'x' * 200})
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
@@ -0,0 +1,127 @@
+"""Parity checks for the in-memory storage backend.
+
+Each test runs against the memory backend and, when a server answers at
+MONGO_TEST_URI (default mongodb://localhost:27017/), against MongoDB too,
+so both backends are held to the same expected results.
+"""
+import os
+
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from backend.storage.memory import MemoryDatabase
+
+MONGO_TEST_URI = os.getenv('MONGO_TEST_URI', 'mongodb://localhost:27017/')
+
+
+def mongo_collection():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=300)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f'no MongoDB server at {MONGO_TEST_URI}')
+    collection = client['local_service_platform_test']['parity']
+    collection.drop()
+    return collection
+
+
+@pytest.fixture(params=['memory', 'mongo'])
+def collection(request):
+    if request.param == 'memory':
+        yield MemoryDatabase('test')['parity']
+    else:
+        collection = mongo_collection()
+        yield collection
+        collection.drop()
+
+
+def names(docs):
+    return [d['name'] for d in docs]
+
+
+def test_in_with_mixed_objectid_and_string_references(collection):
+    ref = ObjectId()
+    collection.insert_many([
+        {'name': 'compact', 'provider_id': ref},
+        {'name': 'legacy', 'provider_id': str(ref)},
+        {'name': 'other', 'provider_id': ObjectId()},
+        {'name': 'unassigned', 'provider_id': None}
+    ])
+    assert names(collection.find({'provider_id': {'$in': [ref, str(ref)]}})) == ['compact', 'legacy']
+    assert names(collection.find({'provider_id': ref})) == ['compact']
+    assert names(collection.find({'provider_id': str(ref)})) == ['legacy']
+
+
+def test_or_and_nor(collection):
+    ref = ObjectId()
+    collection.insert_many([
+        {'name': 'mine', 'provider_id': ref, 'status': 'accepted'},
+        {'name': 'pending', 'provider_id': None, 'status': 'pending'},
+        {'name': 'theirs', 'provider_id': ObjectId(), 'status': 'accepted'}
+    ])
+    either = {'$or': [{'provider_id': {'$in': [ref, str(ref)]}}, {'status': 'pending'}]}
+    assert names(collection.find(either)) == ['mine', 'pending']
+    assert names(collection.find({'$nor': [either]})) == ['theirs']
+    assert names(collection.find({'$and': [either, {'status': {'$nin': ['pending']}}]})) == ['mine']
+
+
+def test_none_matches_missing_fields(collection):
+    collection.insert_many([{'name': 'missing'}, {'name': 'null', 'payment_id': None},
+                            {'name': 'set', 'payment_id': ObjectId()}])
+    assert names(collection.find({'payment_id': None})) == ['missing', 'null']
+    assert names(collection.find({'payment_id': {'$exists': False}})) == ['missing']
+
+
+def test_find_one_and_update_return_document(collection):
+    collection.insert_one({'name': 'a', 'status': 'pending', 'attempts': 0})
+    before = collection.find_one_and_update({'name': 'a', 'status': 'pending'},
+                                            {'$set': {'status': 'claimed'}, '$inc': {'attempts': 1}})
+    assert (before['status'], before['attempts']) == ('pending', 0)
+    after = collection.find_one_and_update({'name': 'a'}, {'$inc': {'attempts': 1}},
+                                           return_document=ReturnDocument.AFTER)
+    assert (after['status'], after['attempts']) == ('claimed', 2)
+    assert collection.find_one_and_update({'name': 'a', 'status': 'pending'}, {'$set': {'status': 'x'}}) is None
+
+
+def test_update_many_set_inc_unset(collection):
+    collection.insert_many([
+        {'name': 'a', 'status': 'claimed', 'claim_expires_at': 1, 'attempts': 0},
+        {'name': 'b', 'status': 'claimed', 'claim_expires_at': 5, 'attempts': 0},
+        {'name': 'c', 'status': 'pending', 'attempts': 0}
+    ])
+    result = collection.update_many({'status': 'claimed', 'claim_expires_at': {'$lte': 3}},
+                                    {'$set': {'status': 'pending'}, '$unset': {'claim_expires_at': 1},
+                                     '$inc': {'attempts': 1}})
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    a = collection.find_one({'name': 'a'}, {'_id': 0})
+    assert a == {'name': 'a', 'status': 'pending', 'attempts': 1}
+    assert collection.count_documents({'status': 'pending'}) == 2
+
+
+def test_unique_index_raises_duplicate_key(collection):
+    collection.create_index('key', unique=True)
+    collection.insert_one({'name': 'first', 'key': 'k1'})
+    with pytest.raises(DuplicateKeyError):
+        collection.insert_one({'name': 'second', 'key': 'k1'})
+    with pytest.raises(BulkWriteError) as raised:
+        collection.insert_many([{'key': 'k1'}, {'key': 'k2'}, {'key': 'k3'}], ordered=False)
+    assert raised.value.details['nInserted'] == 2
+    assert [e['code'] for e in raised.value.details['writeErrors']] == [11000]
+    with pytest.raises(DuplicateKeyError):
+        collection.update_one({'key': 'k2'}, {'$set': {'key': 'k1'}})
+    assert collection.count_documents({}) == 3
+
+
+def test_sort_skip_limit(collection):
+    collection.insert_many([{'name': n, 'group': g, 'rank': r}
+                            for n, g, r in [('a', 2, 1), ('b', 1, 3), ('c', 2, 2), ('d', 1, 1), ('e', 3, 5)]])
+    assert names(collection.find().sort('rank', -1).limit(2)) == ['e', 'b']
+    assert names(collection.find().sort([('group', 1), ('rank', -1)])) == ['b', 'd', 'c', 'a', 'e']
+    assert names(collection.find().sort([('group', 1), ('rank', -1)]).skip(1).limit(3)) == ['d', 'c', 'a']
+    assert names(collection.find({'group': {'$gte': 2}}).sort('rank', 1).skip(2)) == ['e']
+    # limit(0) means no limit
+    assert len(list(collection.find().limit(0))) == 5
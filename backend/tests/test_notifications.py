@@ -0,0 +1,22 @@
+from bson import ObjectId
+
+from backend.models import User, Notification
+from backend.utils.notifications import notify_new_subscription, render_item
+
+PROVIDER = '507f1f77bcf86cd799439012'
+
+
+def subscription_for(customer_id):
+    return {'_id': ObjectId(), 'plan': 'monthly', 'service_name': 'Deep cleaning',
+            'customer_id': customer_id, 'provider_id': ObjectId(PROVIDER)}
+
+
+def test_subscription_digest_names_the_customer():
+    customer = User.create({'name': 'Asha', 'email': 'asha@example.com', 'password': 'x', 'role': 'customer'})
+    assert notify_new_subscription(subscription_for(customer['_id'])) == 1
+    assert 'from Asha</li>' in render_item(Notification.collection.find_one())
+
+
+def test_subscription_digest_falls_back_without_a_known_customer():
+    assert notify_new_subscription(subscription_for('mock-customer')) == 1
+    assert 'from a customer</li>' in render_item(Notification.collection.find_one())
@@ -0,0 +1,41 @@
+from backend.jobs.provider_scores import rebuild
+from backend.models import InstantBooking, ProviderScore
+
+PROVIDER = '507f1f77bcf86cd799439012'
+
+
+def change(booking, updates):
+    after = InstantBooking.update(str(booking['_id']), updates)
+    ProviderScore.record_booking_change(booking, after)
+    return after
+
+
+def new_booking():
+    return InstantBooking.create({
+        'customerId': '507f1f77bcf86cd799439011', 'customerName': 'Asha', 'serviceType': 'plumbing',
+        'description': 'Leaking tap', 'address': 'Chennai', 'phone': '9000000000'
+    })
+
+
+def scores():
+    doc = ProviderScore.find_by_provider(PROVIDER)
+    return {k: doc.get(k, 0) for k in ('accepted', 'completed', 'open_load', 'thumbs_up', 'thumbs_down',
+                                       'completion_rate', 'score')}
+
+
+def test_incremental_scores_match_rebuild():
+    # Accepted then completed, with feedback
+    first = change(new_booking(), {'status': 'accepted', 'provider_id': PROVIDER})
+    first = change(first, {'status': 'completed'})
+    change(first, {'feedback': 'thumbs_up'})
+    # Claimed, then completed without passing through accepted
+    claimed = InstantBooking.claim(str(new_booking()['_id']), PROVIDER, 'Ravi', 300)
+    change(claimed, {'status': 'completed'})
+    # Still open
+    change(new_booking(), {'status': 'accepted', 'provider_id': PROVIDER})
+
+    incremental = scores()
+    assert (incremental['accepted'], incremental['completed'], incremental['open_load']) == (3, 2, 1)
+
+    rebuild()
+    assert scores() == incremental
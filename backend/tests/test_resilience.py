@@ -0,0 +1,57 @@
+from pymongo.errors import NetworkTimeout
+
+from backend.models import InstantBooking, User
+from backend.utils.resilience import mark_failure
+
+BOOKING = {'customerId': '507f1f77bcf86cd799439011', 'customerName': 'Asha', 'serviceType': 'plumbing',
+           'description': 'Leaking tap', 'address': 'Anna Nagar', 'phone': '9000000000'}
+
+
+def failing(*args, **kwargs):
+    """What the guarded database does when a call times out"""
+    mark_failure('mongo')
+    raise NetworkTimeout('timed out')
+
+
+def test_committed_write_survives_a_failed_side_effect(client, monkeypatch):
+    monkeypatch.setattr(User, 'find_providers_for', failing)
+    response = client.post('/api/instant-booking', json=BOOKING)
+    assert response.status_code == 201
+    assert response.get_json()['booking']['id']
+    assert InstantBooking.collection.count_documents({}) == 1
+
+
+def test_swallowed_database_error_is_served_as_degraded(client, monkeypatch):
+    booking = InstantBooking.create(BOOKING)
+    monkeypatch.setattr(InstantBooking, 'find_by_id', failing)
+    response = client.get(f"/api/instant-booking/{booking['_id']}")
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+
+def test_keyed_retry_replays_a_write_whose_side_effect_failed(client, monkeypatch):
+    monkeypatch.setattr(User, 'find_providers_for', failing)
+    headers = {'Idempotency-Key': 'booking-1'}
+    first = client.post('/api/instant-booking', json=BOOKING, headers=headers)
+    assert first.status_code == 201
+
+    monkeypatch.undo()
+    retry = client.post('/api/instant-booking', json=BOOKING, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert InstantBooking.collection.count_documents({}) == 1
+
+
+def test_swallowed_database_error_releases_the_key(client, monkeypatch):
+    booking = InstantBooking.create(BOOKING)
+    monkeypatch.setattr(InstantBooking, 'claim', failing)
+    headers = {'Idempotency-Key': 'claim-1'}
+    path = f"/api/instant-booking/{booking['_id']}/claim"
+    claim = {'providerId': '507f1f77bcf86cd799439012', 'providerName': 'Ravi'}
+    assert client.post(path, json=claim, headers=headers).status_code == 503
+
+    monkeypatch.undo()
+    retry = client.post(path, json=claim, headers=headers)
+    assert retry.status_code == 200
+    assert 'Idempotent-Replayed' not in retry.headers
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import InstantBooking, Subscription
+from backend.routes import bookings as booking_routes
+from backend.routes import subscriptions as subscription_routes
+from backend.utils import schedule as schedule_module
+from backend.utils.schedule import VisitSchedule, visits, VISIT_LENGTH
+
+CUSTOMER = '507f1f77bcf86cd799439011'
+PROVIDER = '507f1f77bcf86cd799439012'
+
+
+def subscription_data(plan='weekly', **fields):
+    data = {'customerId': CUSTOMER, 'serviceId': '507f1f77bcf86cd799439031', 'providerId': PROVIDER,
+            'plan': plan, 'price': 500, 'serviceName': 'Deep cleaning', 'providerName': 'Ravi'}
+    data.update(fields)
+    return data
+
+
+@pytest.fixture
+def schedule(monkeypatch):
+    """A fresh visit index for the routes, loaded from this test's database on first use"""
+    fresh = VisitSchedule()
+    monkeypatch.setattr(schedule_module, 'schedule', fresh)
+    monkeypatch.setattr(subscription_routes, 'schedule', fresh)
+    monkeypatch.setattr(booking_routes, 'schedule', fresh)
+    return fresh
+
+
+@pytest.mark.parametrize('plan, count, gap', [
+    ('daily', 1, None), ('weekly', 7, 1), ('monthly', 5, 7), ('annual', 13, 30)
+])
+def test_subscription_visits_follow_the_plan_cadence(plan, count, gap):
+    subscription = Subscription.build(subscription_data(plan))
+    start, end = subscription['start_date'], subscription['end_date']
+    assert end - start == timedelta(days=Subscription.PLAN_DAYS[plan])
+
+    starts = [at for at, _ in visits(subscription, start, end)]
+    assert len(starts) == count and starts[0] == start
+    assert all(b - a == timedelta(days=gap) for a, b in zip(starts, starts[1:]))
+
+    # A window in the middle of the series is generated on its own
+    assert [at for at, _ in visits(subscription, starts[-1], end)] == starts[-1:]
+
+
+def test_overlapping_subscription_is_refused(client, schedule):
+    start = (datetime.utcnow() + timedelta(days=1)).replace(microsecond=0)
+    Subscription.create(subscription_data(startDate=start))
+
+    overlap = start + timedelta(minutes=30)
+    clash = client.post('/api/subscription', json=subscription_data(startDate=overlap.isoformat()))
+    assert clash.status_code == 409
+    assert overlap.isoformat() in clash.get_json()['message']
+
+    moved = client.post('/api/subscription', json=subscription_data(startDate=(start + timedelta(hours=2)).isoformat()))
+    assert moved.status_code == 201
+
+    past = client.post('/api/subscription', json=subscription_data(startDate='2020-01-01T10:00:00'))
+    assert past.status_code == 400
+
+
+def test_accepting_bookings_respects_the_providers_visits(client, schedule):
+    def accept(booking, **fields):
+        return client.put(f"/api/instant-booking/{booking['_id']}",
+                          json=dict(status='accepted', providerId=PROVIDER, **fields))
+
+    data = {'customerId': CUSTOMER, 'customerName': 'Asha', 'serviceType': 'plumbing',
+            'description': 'Leaking tap', 'address': 'Anna Nagar', 'phone': '9000000000'}
+    first, second, third = (InstantBooking.create(data) for _ in range(3))
+
+    visit_at = datetime.utcnow() + timedelta(hours=3)
+    assert accept(first, visitAt=visit_at.isoformat()).status_code == 200
+    assert accept(second, visitAt=(visit_at + timedelta(minutes=15)).isoformat()).status_code == 409
+
+    # Without visitAt the visit goes in the next free slot
+    response = accept(second)
+    assert response.status_code == 200
+    scheduled = datetime.fromisoformat(response.get_json()['booking']['visit_at'])
+    assert scheduled < visit_at
+    response = accept(third, visitAt=(scheduled + VISIT_LENGTH / 2).isoformat())
+    assert response.status_code == 409
@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import g, request
+from backend.config import (TRAFFIC_SAMPLE_RATE, TRAFFIC_CAPTURE_PATH, TRAFFIC_CAPTURE_MAX_BYTES,
+                            TRAFFIC_CAPTURE_BACKUPS)
+
+# Request fields holding personal data; values are replaced, keys kept
+PII_FIELDS = {
+    'password', 'otp', 'email', 'name', 'mobile', 'phone', 'address', 'location', 'description',
+    'customerName', 'customer_name', 'providerName', 'provider_name', 'feedbackMessage',
+    'feedback_message', 'q'
+}
+
+# Inline media; replaced by their size so replays send payloads of the same shape
+MEDIA_FIELDS = {'image', 'voiceNote', 'voice_note'}
+
+REDACTED = '[redacted]'
+
+
+def scrub(value, key=None):
+    """Copy of a request body or query with PII redacted and media reduced to its size"""
+    # The key decides first: a phone or OTP sent as a number is still PII
+    if value is not None and key in MEDIA_FIELDS:
+        return {'$bytes': len(str(value))}
+    if value is not None and key in PII_FIELDS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: scrub(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [scrub(v, key) for v in value]
+    return value
+
+
+def captured_body():
+    if request.mimetype.startswith('multipart/'):
+        # Uploads are streamed to storage and never buffered here
+        return {'$multipart': request.content_length}
+    if not request.content_length:
+        return None
+    return scrub(request.get_json(silent=True))
+
+
+def open_log(path=TRAFFIC_CAPTURE_PATH):
+    """Logger writing to this process's capture file.
+
+    Workers rotate their own file (requests-<pid>.jsonl), since rotation is
+    not safe across processes; replay merges the files by timestamp.
+    """
+    logger = logging.getLogger('traffic')
+    if not logger.handlers:
+        root, ext = os.path.splitext(path)
+        path = f'{root}-{os.getpid()}{ext or ".jsonl"}'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=TRAFFIC_CAPTURE_MAX_BYTES,
+                                      backupCount=TRAFFIC_CAPTURE_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def enable_capture(app, sample_rate=TRAFFIC_SAMPLE_RATE):
+    """Write a sample of API requests to a rotating JSONL log for replay.
+
+    Each line holds the request (method, path, matched route, query and
+    JSON body, scrubbed by scrub()), the response status and the time the
+    app took to answer. Register before other middleware so the timing
+    covers it.
+    """
+    log = open_log()
+
+    @app.before_request
+    def start_capture():
+        if request.path.startswith('/api/') and random.random() < sample_rate:
+            g.capture_started = time.perf_counter()
+
+    @app.after_request
+    def write_capture(response):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return response
+        try:
+            log.info(json.dumps({
+                'ts': datetime.utcnow().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'route': request.url_rule.rule if request.url_rule else None,
+                'query': scrub(request.args.to_dict()),
+                'body': captured_body(),
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+            }, default=str))
+        except Exception as e:
+            print(f"Traffic capture error: {type(e).__name__}: {str(e)}")
+        return response
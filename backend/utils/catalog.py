@@ -0,0 +1,124 @@
+import math
+from backend.models import Service, on_write
+from backend.utils.sync import PolledIndex, make_sync_token
+from backend.config import CATALOG_REFRESH_SECONDS, PRICE_BANDS
+
+
+def valid_price(price):
+    """True for a finite, non-negative number (booleans are not prices)"""
+    return (isinstance(price, (int, float)) and not isinstance(price, bool)
+            and math.isfinite(price) and price >= 0)
+
+
+def price_band(prices):
+    """Band a service by its monthly price (or its cheapest plan without one)"""
+    price = prices.get('monthly') or min(prices.values(), default=None)
+    if price is None:
+        return None
+    for band, upper in PRICE_BANDS:
+        if upper is None or price < upper:
+            return band
+    return None
+
+
+def areas(location):
+    """Lowercased areas of a comma-separated location"""
+    return {a.strip().lower() for a in (location or '').split(',') if a.strip()}
+
+
+class ServiceCatalog(PolledIndex):
+    """Per-worker in-memory index of active catalog services.
+
+    Services are kept pre-serialized and bucketed by service type, area and
+    price band, so browse requests are set intersections over memory. The
+    version stamp is the newest updated_at seen, which is the same in every
+    worker once they have caught up, so it doubles as an ETag.
+    """
+
+    refresh_seconds = CATALOG_REFRESH_SECONDS
+    
+    def __init__(self):
+        super().__init__()
+        self.services = {}
+        self.by_type = {}
+        self.by_area = {}
+        self.by_band = {}
+        self.latest = None
+
+    @property
+    def version(self):
+        return make_sync_token(self.latest) if self.latest else '0'
+
+    def add(self, service):
+        """Index service, replacing any previous version; inactive services are dropped"""
+        service_id = str(service['_id'])
+        with self.lock:
+            self.remove(service_id)
+            updated = service.get('updated_at') or service.get('created_at')
+            if updated and (self.latest is None or updated > self.latest):
+                self.latest = updated
+            if service.get('status') != 'active':
+                return
+            prices = service.get('prices') or {}
+            if not isinstance(prices, dict) or not all(valid_price(p) for p in prices.values()):
+                # One malformed document must not break loading the rest
+                print(f"Catalog skipped service {service_id}: invalid prices {prices!r}")
+                return
+            entry = Service.to_dict(service)
+            entry['band'] = price_band(entry['prices'])
+            self.services[service_id] = entry
+            for bucket, key in self.keys(entry):
+                bucket.setdefault(key, set()).add(service_id)
+
+    def remove(self, service_id):
+        """Drop service_id from the index"""
+        with self.lock:
+            entry = self.services.pop(service_id, None)
+            if entry:
+                for bucket, key in self.keys(entry):
+                    bucket[key].discard(service_id)
+
+    def keys(self, entry):
+        yield self.by_type, (entry['service_type'] or '').lower()
+        for area in areas(entry['location']):
+            yield self.by_area, area
+        yield self.by_band, entry['band']
+
+    def find(self, service_type=None, area=None, band=None, max_price=None, plan='monthly'):
+        """Services matching the filters, cheapest for plan first"""
+        self.ensure_fresh()
+        with self.lock:
+            ids = None
+            for bucket, key in ((self.by_type, service_type), (self.by_area, area), (self.by_band, band)):
+                if key:
+                    matched = bucket.get(key.lower(), set())
+                    ids = matched if ids is None else ids & matched
+            entries = [self.services[i] for i in ids] if ids is not None else list(self.services.values())
+        if max_price is not None:
+            entries = [e for e in entries if e['prices'].get(plan) is not None and e['prices'][plan] <= max_price]
+        return sorted(entries, key=lambda e: (e['prices'].get(plan) is None, e['prices'].get(plan) or 0, e['id']))
+
+    def get(self, service_id):
+        """Indexed service by id, or None"""
+        self.ensure_fresh()
+        return self.services.get(service_id)
+
+    def price_for(self, service_id, plan):
+        """Catalog price of a service's plan, or None if unknown"""
+        service = self.get(service_id)
+        return service['prices'].get(plan) if service else None
+
+    def pull(self, since):
+        for service in Service.find_all(since):
+            self.add(service)
+
+
+catalog = ServiceCatalog()
+
+
+def index_service(service):
+    if catalog.synced_at:
+        catalog.add(service)
+
+
+on_write('service', index_service)
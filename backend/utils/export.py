@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+# Rows are buffered and flushed in chunks so each yield is a reasonably
+# sized write instead of one tiny write per row
+CHUNK_ROWS = 500
+
+
+def export_row(doc, fields):
+    """Flatten a document into an export row with JSON-safe values"""
+    row = {'id': str(doc['_id'])}
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        row[field] = value
+    return row
+
+
+def stream_csv(docs, fields):
+    """Yield CSV text for docs in chunks, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id'] + fields)
+    count = 0
+    for doc in docs:
+        row = export_row(doc, fields)
+        writer.writerow([row['id']] + ['' if row[f] is None else row[f] for f in fields])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_ndjson(docs, fields):
+    """Yield newline-delimited JSON for docs in chunks"""
+    lines = []
+    for doc in docs:
+        lines.append(json.dumps(export_row(doc, fields), default=str))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
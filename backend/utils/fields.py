@@ -0,0 +1,25 @@
+from flask import request
+
+
+def sparse_fields(model):
+    """Read ?fields=a,b into (projection, to_dict) for model.
+
+    Names are checked against model.FIELDS. The projection makes Mongo read
+    and send only the stored fields behind them, and to_dict serializes
+    just those keys. Without the parameter returns
+    (None, model.to_dict), the full shape. Raises ValueError on unknown names.
+    """
+    names = list(dict.fromkeys(f.strip() for f in request.args.get('fields', '').split(',') if f.strip()))
+    if not names:
+        return None, model.to_dict
+    unknown = [f for f in names if f not in model.FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(model.FIELDS)}")
+    projection = {'_id': 1}
+    projection.update((model.FIELDS[f], 1) for f in names)
+
+    def to_dict(doc):
+        full = model.to_dict(doc)
+        return {f: full[f] for f in names} if full else None
+
+    return projection, to_dict
@@ -0,0 +1,92 @@
+import threading
+import time
+from flask import g
+from backend.models import on_write
+from backend.utils.metrics import metrics
+from backend.config import HOT_READ_TTL_SECONDS
+
+
+class Flight:
+    """One in-progress read that other identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+        self.error = None
+        self.failure = None
+
+
+class HotRead:
+    """Single-flight plus a short-lived cache for a read every caller shares.
+
+    Requests are keyed by path and query string. The first request for a
+    key runs the read; identical requests arriving meanwhile wait for its
+    result instead of querying again. The serialized body is then reused
+    for ttl seconds. invalidate() drops cached bodies and detaches reads in
+    flight, so nothing read before a write is served after it.
+    """
+
+    def __init__(self, name, ttl=HOT_READ_TTL_SECONDS):
+        self.name = name
+        self.ttl = ttl
+        self.entries = {}
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, read):
+        """Response body for key, from cache, a read in flight, or read()"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                metrics.incr(f'hot_reads.{self.name}.cache_hits')
+                return entry[0]
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+
+        if not leader:
+            metrics.incr(f'hot_reads.{self.name}.coalesced')
+            flight.done.wait()
+            if flight.error is not None:
+                if flight.failure:
+                    # Let degraded-mode handling see the leader's dependency failure
+                    g.dependency_failure = flight.failure
+                raise flight.error
+            return flight.body
+
+        metrics.incr(f'hot_reads.{self.name}.queries')
+        try:
+            flight.body = read()
+        except Exception as e:
+            flight.error = e
+            flight.failure = g.get('dependency_failure')
+            raise
+        finally:
+            with self.lock:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+                    if flight.error is None:
+                        self.store(key, flight.body)
+            flight.done.set()
+        return flight.body
+
+    def store(self, key, body):
+        now = time.monotonic()
+        for stale in [k for k, (_, expires) in self.entries.items() if expires <= now]:
+            del self.entries[stale]
+        self.entries[key] = (body, now + self.ttl)
+
+    def invalidate(self, doc=None):
+        """Forget cached bodies and reads in flight (write hook)"""
+        with self.lock:
+            self.entries.clear()
+            self.flights.clear()
+        metrics.incr(f'hot_reads.{self.name}.invalidations')
+
+
+pending_bookings = HotRead('bookings_pending')
+active_subscriptions = HotRead('subscriptions_active')
+
+on_write('booking', pending_bookings.invalidate)
+on_write('subscription', active_subscriptions.invalidate)
@@ -0,0 +1,82 @@
+import hashlib
+from flask import g, request, jsonify, Response
+from backend.models import IdempotencyKey
+from backend.utils.metrics import metrics
+from backend.config import IDEMPOTENCY_LEASE_SECONDS, IDEMPOTENCY_MAX_KEY_LENGTH
+
+HEADER = 'Idempotency-Key'
+
+
+def fingerprint():
+    """Hash identifying the request body a key was first used with"""
+    if request.mimetype.startswith('multipart/'):
+        # Uploads are streamed; hashing them would buffer the whole file
+        return f'{request.mimetype}:{request.content_length}'
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def replay(record):
+    response = Response(record['body'], status=record['status_code'], mimetype=record['mimetype'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def enable_idempotency(app):
+    """Make POST requests carrying an Idempotency-Key header safe to retry.
+    
+    The first request with a key runs normally and its response is stored;
+    repeats get the stored response without running the handler. A repeat
+    that arrives while the first is still running gets 409, and reusing a
+    key with a different body gets 422. Server errors (and errors caused
+    by a failing database) release the key so the request can be retried;
+    anything else, including a success whose side effects failed
+    afterwards, is replayed.
+    """
+
+    @app.before_request
+    def check_idempotency_key():
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or not key:
+            return None
+        if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'message': f'{HEADER} is too long'}), 400
+        
+        scope = f'{request.path}:{key}'
+        digest = fingerprint()
+        existing = IdempotencyKey.begin(scope, digest, IDEMPOTENCY_LEASE_SECONDS)
+        if existing is None:
+            g.idempotency_scope = scope
+            metrics.observe('idempotency.replay_rate', 0)
+            return None
+        if existing['fingerprint'] != digest:
+            metrics.incr('idempotency.mismatched')
+            return jsonify({'success': False, 'message': f'{HEADER} was already used with a different request'}), 422
+        if existing['status'] != 'done':
+            metrics.incr('idempotency.in_flight_conflicts')
+            response = jsonify({'success': False, 'message': 'A request with this key is still in progress'})
+            response.headers['Retry-After'] = '1'
+            return response, 409
+        metrics.incr('idempotency.replayed')
+        metrics.observe('idempotency.replay_rate', 1)
+        return replay(existing)
+
+    @app.after_request
+    def store_idempotent_response(response):
+        scope = g.pop('idempotency_scope', None)
+        if scope is None:
+            return response
+        # A database error the handler swallowed into a 4xx is sent as a
+        # degraded 503 (see resilience.settle), so it is released like one;
+        # a success is stored even if a best-effort step failed after it
+        failed = response.status_code >= 500 or (g.get('dependency_failure') and response.status_code >= 400)
+        if failed or response.is_streamed:
+            IdempotencyKey.release(scope)
+        else:
+            IdempotencyKey.complete(scope, response.status_code, response.get_data(), response.mimetype)
+        return response
+
+    @app.teardown_request
+    def release_idempotency_key(exc):
+        scope = g.pop('idempotency_scope', None)
+        if scope is not None:
+            IdempotencyKey.release(scope)
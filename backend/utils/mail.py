@@ -1,7 +1,17 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from backend.config import EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD
+from backend.config import (EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD,
+                            SMTP_TIMEOUT_SECONDS)
+from backend.utils.resilience import smtp_breaker
+
+
+def is_failure(exc):
+    """Errors that mean the SMTP server is unreachable or stalled (not a rejected message)"""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
 
 def send_otp_email(to_email, otp):
     """Send OTP email to user"""
@@ -29,16 +39,17 @@ def send_otp_email(to_email, otp):
         
         msg.attach(MIMEText(body, 'html'))
         
-        # Connect to SMTP server
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        
-        # Login
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        
-        # Send email
-        server.send_message(msg)
-        server.quit()
+        with smtp_breaker.guard(is_failure):
+            # Connect to SMTP server
+            server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+            server.starttls()
+            
+            # Login
+            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
+            
+            # Send email
+            server.send_message(msg)
+            server.quit()
         
         return True, "OTP sent successfully"
     except Exception as e:
@@ -67,12 +78,54 @@ def send_welcome_email(to_email, name):
         
         msg.attach(MIMEText(body, 'html'))
         
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        with smtp_breaker.guard(is_failure):
+            server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+            server.starttls()
+            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
+            server.send_message(msg)
+            server.quit()
         
         return True, "Welcome email sent"
     except Exception as e:
         return False, f"Failed to send email: {str(e)}"
+
+def send_batch(messages):
+    """Send (to_email, subject, html) messages over a single SMTP session.
+    
+    Returns one boolean per message; if the session cannot be opened every
+    message is reported as failed.
+    """
+    results = [False] * len(messages)
+    if not messages:
+        return results
+    try:
+        with smtp_breaker.guard(is_failure):
+            server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+            server.starttls()
+            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
+    except Exception as e:
+        print(f"Email sending error: {type(e).__name__}: {str(e)}")
+        return results
+    
+    try:
+        for i, (to_email, subject, body) in enumerate(messages):
+            msg = MIMEMultipart()
+            msg['From'] = EMAIL_HOST_USER
+            msg['To'] = to_email
+            msg['Subject'] = subject
+            msg.attach(MIMEText(body, 'html'))
+            try:
+                server.send_message(msg)
+                results[i] = True
+            except smtplib.SMTPServerDisconnected as e:
+                print(f"Email sending error: {type(e).__name__}: {str(e)}")
+                smtp_breaker.record(False)
+                break
+            except Exception as e:
+                print(f"Email sending error to {to_email}: {type(e).__name__}: {str(e)}")
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    return results
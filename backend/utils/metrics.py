@@ -0,0 +1,47 @@
+import threading
+from collections import deque
+
+# Percentiles are computed over the most recent samples of each series
+SAMPLE_SIZE = 1000
+
+
+class Metrics:
+    """Per-worker counters and sample series, reported by GET /api/admin/metrics"""
+
+    def __init__(self):
+        self.counters = {}
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = {'count': 0, 'sum': 0.0, 'max': None,
+                                              'samples': deque(maxlen=SAMPLE_SIZE)}
+            series['count'] += 1
+            series['sum'] += value
+            series['max'] = value if series['max'] is None else max(series['max'], value)
+            series['samples'].append(value)
+
+    def snapshot(self):
+        """Counters plus count/mean/p50/p95/max of each series"""
+        with self.lock:
+            series = {}
+            for name, s in self.series.items():
+                samples = sorted(s['samples'])
+                series[name] = {
+                    'count': s['count'],
+                    'mean': round(s['sum'] / s['count'], 4),
+                    'p50': round(samples[len(samples) // 2], 4),
+                    'p95': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+                    'max': round(s['max'], 4)
+                }
+            return {'counters': dict(self.counters), 'series': series}
+
+
+metrics = Metrics()
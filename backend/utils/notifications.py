@@ -0,0 +1,91 @@
+from html import escape
+from string import Template
+from backend.models import User, Notification, is_ref
+from backend.utils.metrics import metrics
+
+# Compiled once at import; rendering a digest is only substitutions
+DIGEST_TEMPLATE = Template("""
+        <html>
+        <body>
+            <h2>Hello, $name!</h2>
+            <p>$intro</p>
+            <ul>$items</ul>
+            $more
+            <p>Log in to review and respond.</p>
+            <br>
+            <p>Regards,<br>Local Service Platform Team</p>
+        </body>
+        </html>
+        """)
+
+ITEM_TEMPLATES = {
+    'booking': Template('<li>$urgent<strong>$service_type</strong> at $address: $description</li>'),
+    'subscription': Template('<li>New <strong>$plan</strong> subscription to $service_name from $customer_name</li>')
+}
+
+URGENT_MARK = '<strong style="color: #dc2626;">URGENT</strong> '
+
+
+def notify_new_booking(booking, wake=None):
+    """Queue a new booking for every provider offering its service type"""
+    providers = User.find_providers_for(booking.get('service_type'))
+    summary = {
+        'service_type': booking.get('service_type'),
+        'address': booking.get('address'),
+        'description': (booking.get('description') or '')[:200]
+    }
+    urgent = bool(booking.get('urgent'))
+    queued = Notification.enqueue([p['_id'] for p in providers], 'booking', booking['_id'], summary, urgent)
+    record_enqueued(len(providers), queued)
+    if urgent and queued and wake:
+        wake.set()
+    return queued
+
+
+def notify_new_subscription(subscription):
+    """Queue a new subscription for its provider (placeholder provider ids have nobody to notify)"""
+    if not is_ref(subscription.get('provider_id')):
+        return 0
+    summary = {
+        'plan': subscription.get('plan'),
+        'service_name': subscription.get('service_name') or subscription.get('service_type'),
+        'customer_name': customer_name(subscription.get('customer_id'))
+    }
+    queued = Notification.enqueue([subscription['provider_id']], 'subscription', subscription['_id'], summary)
+    record_enqueued(1, queued)
+    return queued
+
+
+def customer_name(customer_id):
+    """Name for a subscription's digest line; subscriptions do not store it"""
+    customer = User.find_by_id(customer_id) if is_ref(customer_id) else None
+    return (customer or {}).get('name') or 'a customer'
+
+
+def record_enqueued(attempted, queued):
+    metrics.incr('notifications.queued', queued)
+    if attempted > queued:
+        metrics.incr('notifications.deduplicated', attempted - queued)
+
+
+def render_item(notification):
+    values = {k: escape(str(v or '')) for k, v in notification['summary'].items()}
+    values['urgent'] = URGENT_MARK if notification.get('urgent') else ''
+    return ITEM_TEMPLATES[notification['kind']].safe_substitute(values)
+
+
+def render_digest(provider, notifications, max_items):
+    """(subject, html) of one provider's digest, urgent items first"""
+    ordered = sorted(notifications, key=lambda n: not n.get('urgent'))
+    shown = ordered[:max_items]
+    count = len(notifications)
+    subject = f"{count} new request{'s' if count != 1 else ''} on Local Service Platform"
+    if any(n.get('urgent') for n in notifications):
+        subject = 'Urgent: ' + subject
+    body = DIGEST_TEMPLATE.substitute(
+        name=escape(provider.get('name') or 'there'),
+        intro=f"You have {count} new request{'s' if count != 1 else ''} since your last update:",
+        items=''.join(render_item(n) for n in shown),
+        more=f'<p>...and {count - len(shown)} more.</p>' if count > len(shown) else ''
+    )
+    return subject, body
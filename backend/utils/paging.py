@@ -0,0 +1,16 @@
+from flask import request
+
+MAX_PAGE_SIZE = 100
+
+
+def page_args(default_limit=20):
+    """Read ?page= (1-based) and ?limit= into (skip, limit).
+
+    With default_limit=None and neither parameter sent, returns (0, None)
+    so the caller serves the whole (hot) list.
+    """
+    if default_limit is None and 'page' not in request.args and 'limit' not in request.args:
+        return 0, None
+    page = max(int(request.args.get('page', 1)), 1)
+    limit = min(max(int(request.args.get('limit', default_limit or 20)), 1), MAX_PAGE_SIZE)
+    return (page - 1) * limit, limit
@@ -0,0 +1,71 @@
+from bisect import bisect_left, insort
+from backend.models import ProviderScore, on_write
+from backend.utils.catalog import areas
+from backend.utils.sync import PolledIndex
+from backend.config import RANKING_REFRESH_SECONDS
+
+
+class ProviderRanking(PolledIndex):
+    """Per-worker top-k index over provider scores.
+
+    Each (service type, area) bucket - plus type-only, area-only and global
+    buckets - holds a list of (-score, provider_id) kept sorted on every
+    score change, so a top-k query is a slice rather than an aggregation.
+    """
+
+    refresh_seconds = RANKING_REFRESH_SECONDS
+    
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+        self.buckets = {}
+
+    def keys(self, doc):
+        service_type = (doc.get('service_type') or '').lower() or None
+        keys = {(None, None), (service_type, None)}
+        for area in areas(doc.get('service_area')):
+            keys.add((service_type, area))
+            keys.add((None, area))
+        return keys
+
+    def add(self, doc):
+        """Insert or move a provider to its new score position"""
+        provider_id = doc['provider_id']
+        with self.lock:
+            self.remove(provider_id)
+            key = (-(doc.get('score') or 0), provider_id)
+            bucket_keys = self.keys(doc)
+            for bucket_key in bucket_keys:
+                insort(self.buckets.setdefault(bucket_key, []), key)
+            self.entries[provider_id] = (key, bucket_keys, ProviderScore.to_dict(doc))
+
+    def remove(self, provider_id):
+        with self.lock:
+            entry = self.entries.pop(provider_id, None)
+            if entry:
+                key, bucket_keys, _ = entry
+                for bucket_key in bucket_keys:
+                    bucket = self.buckets[bucket_key]
+                    del bucket[bisect_left(bucket, key)]
+
+    def top(self, service_type=None, area=None, k=10):
+        """The k best-scored providers for a service type and/or area"""
+        self.ensure_fresh()
+        bucket_key = ((service_type or '').lower() or None, (area or '').lower() or None)
+        with self.lock:
+            return [self.entries[provider_id][2] for _, provider_id in self.buckets.get(bucket_key, [])[:k]]
+
+    def pull(self, since):
+        for doc in ProviderScore.find_all(since):
+            self.add(doc)
+
+
+ranking = ProviderRanking()
+
+
+def rank_provider(doc):
+    if ranking.synced_at:
+        ranking.add(doc)
+
+
+on_write('provider_score', rank_provider)
@@ -0,0 +1,289 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from flask import g, has_request_context, request, jsonify, Response
+from backend.utils.metrics import metrics
+from backend.config import (BREAKER_WINDOW_SECONDS, BREAKER_MIN_CALLS, BREAKER_FAILURE_RATIO,
+                            BREAKER_COOLDOWN_SECONDS, MAX_IN_FLIGHT, DEGRADED_CACHE_ENTRIES,
+                            DEGRADED_CACHE_MAX_BYTES, DEGRADED_CACHE_MAX_ENTRY_BYTES)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable, retry in {retry_after}s')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails fast once a dependency's recent error rate spikes.
+
+    Outcomes are counted in one-second buckets over the last window. When
+    at least min_calls were made and failure_ratio of them failed, the
+    breaker opens and calls raise CircuitOpenError for cooldown seconds.
+    After that a single probe call is let through (half-open): success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW_SECONDS, min_calls=BREAKER_MIN_CALLS,
+                 failure_ratio=BREAKER_FAILURE_RATIO, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self.buckets = deque()
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead now"""
+        if self.state == 'closed':
+            return True
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.probe_at = 0.0
+            if self.state == 'half_open' and now - self.probe_at >= self.cooldown:
+                # One probe at a time; a probe that never reports back is replaced
+                self.probe_at = now
+                return True
+            return self.state == 'closed'
+
+    def cooling_down(self):
+        """True while open and not yet due for a probe (does not consume the probe)"""
+        return self.state == 'open' and time.monotonic() - self.opened_at < self.cooldown
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        if not self.allow():
+            mark_failure(self.name)
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self):
+        """Whole seconds until the breaker will next let a call through"""
+        if self.state == 'closed':
+            return 0
+        return max(1, int(self.cooldown - (time.monotonic() - self.opened_at) + 0.999))
+
+    def record(self, ok):
+        """Count the outcome of a call"""
+        now = time.monotonic()
+        second = int(now)
+        with self.lock:
+            if self.state == 'half_open':
+                if ok:
+                    self.state = 'closed'
+                    self.buckets.clear()
+                else:
+                    self.trip(now)
+                return
+            if self.buckets and self.buckets[-1][0] == second:
+                bucket = self.buckets[-1]
+            else:
+                bucket = [second, 0, 0]
+                self.buckets.append(bucket)
+            bucket[1 if ok else 2] += 1
+            while self.buckets[0][0] <= second - self.window:
+                self.buckets.popleft()
+            if not ok and self.state == 'closed':
+                calls = sum(b[1] + b[2] for b in self.buckets)
+                failures = sum(b[2] for b in self.buckets)
+                if calls >= self.min_calls and failures / calls >= self.failure_ratio:
+                    self.trip(now)
+
+    def trip(self, now):
+        self.state = 'open'
+        self.opened_at = now
+        self.buckets.clear()
+        metrics.incr(f'breaker.{self.name}.opened')
+        print(f"Circuit breaker for {self.name} opened")
+
+    def call(self, is_failure, fn, *args, **kwargs):
+        """Run fn under the breaker; is_failure(exc) decides which errors count against it"""
+        self.check()
+        try:
+            inject(self.name)
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            failed = is_failure(e)
+            self.record(not failed)
+            if failed:
+                mark_failure(self.name)
+            raise
+        self.record(True)
+        return result
+
+    @contextmanager
+    def guard(self, is_failure):
+        """Context manager form of call() for multi-step exchanges such as an SMTP session"""
+        self.check()
+        try:
+            inject(self.name)
+            yield
+        except Exception as e:
+            failed = is_failure(e)
+            self.record(not failed)
+            if failed:
+                mark_failure(self.name)
+            raise
+        self.record(True)
+
+    def status(self):
+        return {'state': self.state, 'retry_after': self.retry_after()}
+
+
+mongo_breaker = CircuitBreaker('mongo')
+smtp_breaker = CircuitBreaker('smtp')
+BREAKERS = (mongo_breaker, smtp_breaker)
+
+
+class Fault:
+    """An injected fault: delay every call, then fail a share of them"""
+
+    def __init__(self, error=None, delay=0.0, rate=1.0):
+        self.error = error
+        self.delay = delay
+        self.rate = rate
+
+
+# Dependency name -> Fault; only the fault-injection drill sets these
+faults = {}
+
+
+def inject(name):
+    fault = faults.get(name)
+    if fault is None:
+        return
+    if fault.delay:
+        time.sleep(fault.delay)
+    if fault.error and random.random() < fault.rate:
+        raise fault.error(f'Injected {name} fault')
+
+
+def mark_failure(name):
+    """Flag the current request as having hit a failing dependency"""
+    if has_request_context():
+        g.dependency_failure = name
+
+
+class ResponseCache:
+    """LRU of recent successful JSON GET responses, served while degraded.
+
+    Bounded by entry count and total body bytes; bodies larger than
+    max_entry_bytes (e.g. lists carrying inline media) are not kept.
+    """
+
+    def __init__(self, size=DEGRADED_CACHE_ENTRIES, max_bytes=DEGRADED_CACHE_MAX_BYTES,
+                 max_entry_bytes=DEGRADED_CACHE_MAX_ENTRY_BYTES):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.bytes -= len(old[0])
+            if len(body) > self.max_entry_bytes:
+                return
+            self.entries[key] = (body, time.time())
+            self.bytes += len(body)
+            while len(self.entries) > self.size or self.bytes > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+cache = ResponseCache()
+admission = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+# Paths that never go through admission control or degraded handling
+EXEMPT_PATHS = ('/health', '/')
+
+
+def unavailable(message, retry_after):
+    response = jsonify({'success': False, 'message': message, 'degraded': True})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def from_cache():
+    """Cached copy of the current GET request's response, or None"""
+    if request.method != 'GET':
+        return None
+    entry = cache.get(request.full_path)
+    if not entry:
+        return None
+    body, stored_at = entry
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Degraded'] = '1'
+    response.headers['Age'] = str(int(time.time() - stored_at))
+    metrics.incr('requests.served_from_cache')
+    return response
+
+
+def degraded_response():
+    """Cached read, or a clean 503 for writes and uncached reads"""
+    cached = from_cache()
+    if cached is not None:
+        return cached
+    retry_after = mongo_breaker.retry_after() or 1
+    if request.method == 'GET':
+        return unavailable('Service temporarily unavailable', retry_after)
+    metrics.incr('requests.rejected_writes')
+    return unavailable('Service is in read-only mode; please retry shortly', retry_after)
+
+
+def protect(app):
+    """Install admission control, dependency failure handling and degraded reads on app"""
+
+    @app.before_request
+    def admit():
+        if request.path in EXEMPT_PATHS:
+            return None
+        if not admission.acquire(blocking=False):
+            metrics.incr('requests.shed')
+            return unavailable('Server busy; please retry shortly', 1)
+        g.admitted = True
+        if mongo_breaker.state != 'closed' and request.method != 'GET':
+            # Reads probe the database before writes are accepted again
+            return degraded_response()
+        if mongo_breaker.cooling_down():
+            return degraded_response()
+        return None
+
+    @app.after_request
+    def settle(response):
+        if g.get('dependency_failure') == 'mongo':
+            if response.status_code >= 400:
+                # The handler swallowed a database error (usually as a 400)
+                return degraded_response()
+            # Committed before a best-effort step failed: keep it, don't cache it
+            return response
+        if (request.method == 'GET' and response.status_code == 200 and not response.is_streamed
+                and response.mimetype == 'application/json' and request.path.startswith('/api/')):
+            cache.put(request.full_path, response.get_data())
+        return response
+
+    @app.teardown_request
+    def release(exc):
+        if g.pop('admitted', False):
+            admission.release()
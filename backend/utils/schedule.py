@@ -0,0 +1,234 @@
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from backend.models import Subscription, InstantBooking, on_write, ref_str
+from backend.utils.sync import PolledIndex
+from backend.config import VISIT_DURATION_MINUTES, VISIT_CAPACITY, SCHEDULE_HORIZON_DAYS, SCHEDULE_REFRESH_SECONDS
+
+VISIT_LENGTH = timedelta(minutes=VISIT_DURATION_MINUTES)
+HORIZON = timedelta(days=SCHEDULE_HORIZON_DAYS)
+
+
+def parse_time(value):
+    """Parse an ISO 8601 timestamp into naive UTC, or None if value is empty"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def visits(subscription, start, end):
+    """Yield (visit_start, visit_end) of a subscription's visits overlapping [start, end).
+
+    Visits recur every VISIT_DAYS of the plan from start_date until
+    end_date. Only the requested window is generated: the first visit in it
+    is computed directly rather than stepping through the series.
+    """
+    at = subscription.get('start_date')
+    if not at:
+        return
+    last = subscription.get('end_date')
+    step = timedelta(days=Subscription.VISIT_DAYS.get(subscription.get('plan'), 1))
+    if start - VISIT_LENGTH > at:
+        at += step * ((start - VISIT_LENGTH - at) // step)
+    while at < end and (last is None or at < last):
+        if at + VISIT_LENGTH > start:
+            yield at, at + VISIT_LENGTH
+        at += step
+
+
+def starting(subscription, start, end):
+    """Visits of a subscription starting in [start, end)"""
+    return ((a, b) for a, b in visits(subscription, start, end) if a >= start)
+
+
+def tagged(subscription_id, subscription, start, end):
+    for a, b in visits(subscription, start, end):
+        yield a, b, 'subscription', subscription_id
+
+
+class VisitSchedule(PolledIndex):
+    """Per-worker index of provider visits for schedules and conflict checks.
+
+    Active subscriptions are kept per provider as series and expanded on
+    demand. Their visits up to the horizon, plus accepted bookings, also sit
+    in a per-provider timeline of (start, end, kind, id) sorted by start.
+    Every visit lasts VISIT_LENGTH, so the visits overlapping an interval
+    are one bisected slice of the timeline.
+    """
+
+    refresh_seconds = SCHEDULE_REFRESH_SECONDS
+    
+    def __init__(self):
+        super().__init__()
+        self.series = {}
+        self.timeline = {}
+        self.entries = {}
+        self.details = {}
+        self.horizon = None
+
+    def place(self, kind, doc_id, provider_id, intervals):
+        timeline = self.timeline.setdefault(provider_id, [])
+        entries = self.entries.setdefault((kind, doc_id), (provider_id, []))[1]
+        for start, end in intervals:
+            entry = (start, end, kind, doc_id)
+            insort(timeline, entry)
+            entries.append(entry)
+
+    def remove(self, kind, doc_id):
+        """Drop a subscription's or booking's visits from the index"""
+        with self.lock:
+            self.details.pop((kind, doc_id), None)
+            found = self.entries.pop((kind, doc_id), None)
+            if not found:
+                return
+            provider_id, entries = found
+            timeline = self.timeline[provider_id]
+            for entry in entries:
+                del timeline[bisect_left(timeline, entry)]
+            self.series.get(provider_id, {}).pop(doc_id, None)
+
+    def add_subscription(self, subscription):
+        """Index an active subscription's visits, replacing any previous version"""
+        subscription_id = str(subscription['_id'])
+        provider_id = ref_str(subscription.get('provider_id'))
+        with self.lock:
+            self.remove('subscription', subscription_id)
+            if subscription.get('status') != 'active' or not provider_id:
+                return
+            series = {f: subscription.get(f) for f in Subscription.SCHEDULE_FIELDS}
+            self.series.setdefault(provider_id, {})[subscription_id] = series
+            self.details[('subscription', subscription_id)] = series
+            self.entries[('subscription', subscription_id)] = (provider_id, [])
+            self.place('subscription', subscription_id, provider_id,
+                       starting(series, datetime.utcnow() - VISIT_LENGTH, self.horizon))
+
+    def add_booking(self, booking):
+        """Index an accepted booking's visit, replacing any previous version"""
+        booking_id = str(booking['_id'])
+        provider_id = ref_str(booking.get('provider_id'))
+        at = booking.get('visit_at')
+        with self.lock:
+            self.remove('booking', booking_id)
+            if booking.get('status') != 'accepted' or not provider_id or not at:
+                return
+            self.details[('booking', booking_id)] = {f: booking.get(f) for f in InstantBooking.SCHEDULE_FIELDS}
+            self.place('booking', booking_id, provider_id, [(at, at + VISIT_LENGTH)])
+
+    def extend(self, horizon):
+        """Index subscription visits up to a later horizon and drop past ones"""
+        if self.horizon is None:
+            self.horizon = horizon
+            return
+        if horizon - self.horizon < timedelta(days=1):
+            return
+        for provider_id, series in self.series.items():
+            for subscription_id, subscription in series.items():
+                self.place('subscription', subscription_id, provider_id,
+                           starting(subscription, self.horizon, horizon))
+        self.horizon = horizon
+        cutoff = datetime.utcnow() - VISIT_LENGTH
+        for provider_id, timeline in self.timeline.items():
+            past = [e for e in timeline[:bisect_left(timeline, (cutoff,))] if e[2] == 'subscription']
+            for entry in past:
+                del timeline[bisect_left(timeline, entry)]
+                self.entries[('subscription', entry[3])][1].remove(entry)
+
+    def overlapping(self, provider_id, start, end, ignore=None):
+        """Visits of provider_id overlapping [start, end), except those of the (kind, id) ignore"""
+        self.ensure_fresh()
+        with self.lock:
+            timeline = self.timeline.get(provider_id, [])
+            window = timeline[bisect_left(timeline, (start - VISIT_LENGTH,)):bisect_left(timeline, (end,))]
+            found = {e for e in window if e[1] > start and (e[2], e[3]) != ignore}
+            if end > self.horizon:
+                # Past the indexed horizon, expand the provider's series directly
+                for subscription_id, subscription in self.series.get(provider_id, {}).items():
+                    if ('subscription', subscription_id) != ignore:
+                        found.update(tagged(subscription_id, subscription, max(start, self.horizon), end))
+            return sorted(found)
+
+    def is_free(self, provider_id, start, ignore=None):
+        """True if provider_id can take another visit starting at start (always, with capacity 0)"""
+        if not VISIT_CAPACITY:
+            return True
+        return len(self.overlapping(provider_id, start, start + VISIT_LENGTH, ignore)) < VISIT_CAPACITY
+
+    def next_free(self, provider_id, after, ignore=None):
+        """Earliest start at or after after at which provider_id can take another visit"""
+        at = after
+        while VISIT_CAPACITY:
+            busy = self.overlapping(provider_id, at, at + VISIT_LENGTH, ignore)
+            if len(busy) < VISIT_CAPACITY:
+                break
+            # Try again when the first of the overlapping visits ends
+            at = min(end for _, end, _, _ in busy)
+        return at
+
+    def subscription_conflict(self, subscription):
+        """Start of the first visit of a new subscription its provider has no room for, or None"""
+        if not VISIT_CAPACITY:
+            return None
+        provider_id = ref_str(subscription.get('provider_id'))
+        start = subscription.get('start_date') or datetime.utcnow()
+        end = subscription.get('end_date') or start + HORIZON
+        for at, _ in visits(subscription, start, end):
+            if not self.is_free(provider_id, at):
+                return at
+        return None
+
+    def window(self, provider_id, start, end):
+        """Visits of provider_id overlapping [start, end), earliest first"""
+        self.ensure_fresh()
+        with self.lock:
+            series = list(self.series.get(provider_id, {}).items())
+            timeline = self.timeline.get(provider_id, [])
+            window = timeline[bisect_left(timeline, (start - VISIT_LENGTH,)):bisect_left(timeline, (end,))]
+            bookings = [e for e in window if e[2] == 'booking' and e[1] > start]
+            details = {(e[2], e[3]): self.details.get((e[2], e[3])) for e in bookings}
+            details.update((('subscription', i), s) for i, s in series)
+        streams = [tagged(subscription_id, subscription, start, end) for subscription_id, subscription in series]
+        return [visit_dict(entry, details[(entry[2], entry[3])]) for entry in heapq.merge(bookings, *streams)]
+
+    def pull(self, since):
+        self.extend(datetime.utcnow() + HORIZON)
+        for subscription in Subscription.find_for_schedule(since):
+            self.add_subscription(subscription)
+        for booking in InstantBooking.find_for_schedule(since):
+            self.add_booking(booking)
+
+
+def visit_dict(entry, detail):
+    start, end, kind, doc_id = entry
+    detail = detail or {}
+    visit = {
+        'kind': kind,
+        'id': doc_id,
+        'start': start.isoformat(),
+        'end': end.isoformat()
+    }
+    if kind == 'subscription':
+        visit.update(service=detail.get('service_name'), plan=detail.get('plan'),
+                     customer_id=ref_str(detail.get('customer_id')))
+    else:
+        visit.update(service=detail.get('service_type'), customer_name=detail.get('customer_name'))
+    return visit
+
+
+schedule = VisitSchedule()
+
+
+def index_subscription(subscription):
+    if schedule.synced_at:
+        schedule.add_subscription(subscription)
+
+
+def index_booking(booking):
+    if schedule.synced_at:
+        schedule.add_booking(booking)
+
+
+on_write('subscription', index_subscription)
+on_write('booking', index_booking)
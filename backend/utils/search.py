@@ -0,0 +1,164 @@
+import heapq
+import re
+from bisect import bisect_left
+from datetime import datetime
+from backend.models import InstantBooking, User, on_write
+from backend.utils.sync import PolledIndex
+from backend.config import SEARCH_REFRESH_SECONDS
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# A query token that only prefixes an indexed term scores less than an
+# exact match, so "plumb" ranks "plumb" above "plumbing"
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of text"""
+    return TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+class SearchIndex(PolledIndex):
+    """In-memory inverted index over selected document fields.
+
+    Postings map term -> {doc_id: weight}, where weight sums the weights of
+    the fields the term appears in. Queries AND their tokens together, the
+    last token matching as a prefix. The index is loaded on first use,
+    updated in place by write hooks, and periodically pulls documents
+    changed by other workers.
+    """
+
+    refresh_seconds = SEARCH_REFRESH_SECONDS
+    
+    def __init__(self, fields, filters, load):
+        super().__init__()
+        self.fields = fields
+        self.filters = filters
+        self.load = load
+        self.postings = {}
+        self.terms = []
+        self.doc_terms = {}
+        self.attrs = {}
+
+    def add(self, doc):
+        """Index doc, replacing any previous version of it"""
+        doc_id = str(doc['_id'])
+        weights = {}
+        for field, weight in self.fields.items():
+            for term in tokenize(doc.get(field)):
+                weights[term] = weights.get(term, 0) + weight
+        created = doc.get('created_at')
+        attrs = {f: (doc.get(f) or '').lower() if isinstance(doc.get(f), str) else doc.get(f)
+                 for f in self.filters}
+        attrs['_created'] = created.timestamp() if isinstance(created, datetime) else 0
+
+        with self.lock:
+            self.remove(doc_id)
+            for term, weight in weights.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = {}
+                    self.terms.insert(bisect_left(self.terms, term), term)
+                postings[doc_id] = weight
+            self.doc_terms[doc_id] = list(weights)
+            self.attrs[doc_id] = attrs
+
+    def remove(self, doc_id):
+        """Drop doc_id from the index"""
+        with self.lock:
+            for term in self.doc_terms.pop(doc_id, []):
+                self.postings[term].pop(doc_id, None)
+            self.attrs.pop(doc_id, None)
+
+    def expand(self, token, prefix):
+        """Indexed terms matching token (and, if prefix, terms starting with it)"""
+        if not prefix:
+            return [token] if self.postings.get(token) else []
+        matched = []
+        for i in range(bisect_left(self.terms, token), len(self.terms)):
+            term = self.terms[i]
+            if not term.startswith(token):
+                break
+            if self.postings[term]:
+                matched.append(term)
+        return matched
+
+    def matches(self, doc_id, filters):
+        """Check a document's filter attributes ('contains' fields match substrings)"""
+        attrs = self.attrs[doc_id]
+        for field, value in filters.items():
+            actual = attrs.get(field)
+            if actual is None:
+                return False
+            if self.filters[field] == 'contains':
+                if value.lower() not in str(actual):
+                    return False
+            elif value.lower() != str(actual):
+                return False
+        return True
+
+    def search(self, query, filters=None, offset=0, limit=20):
+        """Return (total, [(doc_id, score)]) for a page of ranked results"""
+        self.ensure_fresh()
+        tokens = tokenize(query)
+        filters = {f: v for f, v in (filters or {}).items() if v and f in self.filters}
+
+        with self.lock:
+            scores = None
+            for i, token in enumerate(tokens):
+                matched = {}
+                for term in self.expand(token, prefix=i == len(tokens) - 1):
+                    factor = 1.0 if term == token else PREFIX_WEIGHT
+                    for doc_id, weight in self.postings[term].items():
+                        score = weight * factor
+                        if score > matched.get(doc_id, 0):
+                            matched[doc_id] = score
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {d: s + matched[d] for d, s in scores.items() if d in matched}
+                if not scores:
+                    return 0, []
+            if scores is None:
+                # No query text: browse everything that passes the filters
+                scores = dict.fromkeys(self.attrs, 0.0)
+
+            if filters:
+                scores = {d: s for d, s in scores.items() if self.matches(d, filters)}
+            # Best score first, newest first among equal scores
+            attrs = self.attrs
+            top = heapq.nsmallest(offset + limit, scores.items(),
+                                  key=lambda h: (-h[1], -attrs[h[0]]['_created']))
+
+        return len(scores), top[offset:]
+
+    def pull(self, since):
+        for doc in self.load(since):
+            self.add(doc)
+
+
+booking_index = SearchIndex(
+    fields={'service_type': 3, 'description': 1, 'address': 1},
+    filters={'status': 'exact', 'service_type': 'exact', 'provider_id': 'exact', 'customer_id': 'exact'},
+    load=lambda since: InstantBooking.find_for_search(since)
+)
+
+provider_index = SearchIndex(
+    fields={'service_type': 3, 'service_area': 2, 'name': 1},
+    filters={'service_type': 'exact', 'service_area': 'contains', 'status': 'exact'},
+    load=lambda since: User.find_providers(since)
+)
+
+
+def index_booking(booking):
+    if booking_index.synced_at:
+        booking_index.add(booking)
+
+
+def index_user(user):
+    if provider_index.synced_at and user.get('role') == 'provider':
+        provider_index.add(user)
+
+
+on_write('booking', index_booking)
+on_write('user', index_user)
@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Writes stamp updated_at in Python before they reach Mongo, so a write can
+# land with a timestamp slightly older than the sync point it races with.
+# Every delta query re-reads this much history; clients upsert by id.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Tombstones older than this are expired by a TTL index; older tokens fall
+# back to a full list.
+SYNC_RETENTION = timedelta(days=7)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def make_sync_token(sync_point):
+    """Encode a UTC sync point as an opaque token"""
+    return str(int((sync_point - EPOCH).total_seconds() * 1000))
+
+
+def parse_sync_token(token):
+    """Decode a sync token, raising ValueError if it is malformed"""
+    if not token or not token.isdigit():
+        raise ValueError('Invalid sync token')
+    return EPOCH + timedelta(milliseconds=int(token))
+
+
+def sync_window(since):
+    """Lower bound for updated_at when reading changes after since"""
+    return since - SYNC_OVERLAP
+
+
+def parse_since(token):
+    """Parse a ?since= token into a sync point.
+
+    Returns None when no token was sent or it predates the tombstone
+    retention window, in which case the caller serves a full list.
+    """
+    if not token:
+        return None
+    since = parse_sync_token(token)
+    if since < datetime.utcnow() - SYNC_RETENTION:
+        return None
+    return since
+
+
+def sync_response(key, docs, to_dict, sync_point, removed=None):
+    """Build a list response carrying the token for the next poll"""
+    body = {
+        'success': True,
+        key: [to_dict(d) for d in docs],
+        'sync_token': make_sync_token(sync_point)
+    }
+    if removed is not None:
+        body['removed'] = removed
+    return body
+
+
+class PolledIndex:
+    """Base for per-worker in-memory indexes over a collection.
+
+    The index is loaded on first use; after that, at most once every
+    refresh_seconds, documents changed since the last sync point are pulled
+    so writes made by other workers show up. This worker's own writes reach
+    the index immediately through write hooks. Subclasses implement
+    pull(since), indexing every document when since is None.
+    """
+
+    refresh_seconds = 5
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.synced_at = None
+        self.refreshed = 0.0
+
+    def stale(self):
+        return not self.synced_at or time.monotonic() - self.refreshed >= self.refresh_seconds
+
+    def ensure_fresh(self):
+        """Load the index on first use, then pull other workers' writes periodically"""
+        if not self.stale():
+            return
+        with self.lock:
+            if not self.stale():
+                return
+            sync_point = datetime.utcnow()
+            self.pull(self.synced_at)
+            self.synced_at = sync_point
+            self.refreshed = time.monotonic()
+
+    def pull(self, since):
+        raise NotImplementedError
@@ -101,6 +101,20 @@ export default function InstantBooking() {
     });
   };
 
+  // Upload a photo or voice note; returns its media id, or '' if the upload failed
+  const uploadMedia = async (file: Blob, filename: string): Promise<string> => {
+    const body = new FormData();
+    body.append('file', file, filename);
+    try {
+      const response = await fetch(`${API_BASE_URL}/media`, { method: 'POST', body });
+      const result = await response.json();
+      return result.success ? result.media.id : '';
+    } catch (error) {
+      console.error('Error uploading media:', error);
+      return '';
+    }
+  };
+
   // Filter nearby providers after submission
   useEffect(() => {
     if (submitted && formData.serviceType && formData.address) {
@@ -145,7 +159,11 @@ export default function InstantBooking() {
     // Create instant booking ID
     const newBookingId = Date.now().toString();
     
-    // Convert voice note to base64 if exists
+    // Upload media first so the booking request only carries their ids
+    const imageId = image ? await uploadMedia(image, image.name) : '';
+    const voiceNoteId = audioBlob ? await uploadMedia(audioBlob, 'voice-note.webm') : '';
+
+    // The localStorage copy below still keeps the voice note inline
     let voiceNoteBase64 = '';
     if (audioBlob) {
       try {
@@ -162,8 +180,8 @@ export default function InstantBooking() {
         customerName: user!.name,
         serviceType: formData.serviceType,
         description: formData.description,
-        image: imagePreview || undefined,
-        voiceNote: voiceNoteBase64 || undefined,
+        imageId: imageId || undefined,
+        voiceNoteId: voiceNoteId || undefined,
         address: formData.address,
         phone: formData.phone
       };
@@ -15,6 +15,8 @@ export default function Payment() {
 
   const [paymentMethod, setPaymentMethod] = useState<'upi' | 'card' | 'netbanking'>('card');
   const [processing, setProcessing] = useState(false);
+  // One key per checkout so a retried submit replays instead of charging twice
+  const [checkoutKey] = useState(() => crypto.randomUUID());
   const [success, setSuccess] = useState(false);
 
   const [cardDetails, setCardDetails] = useState({
@@ -40,21 +42,7 @@ export default function Payment() {
     await new Promise(resolve => setTimeout(resolve, 2000));
 
     if (isInstantBooking && bookingId) {
-      // Handle instant booking payment - update in MongoDB via API
-      try {
-        await fetch(`${API_BASE_URL}/instant-booking/${bookingId}`, {
-          method: 'PUT',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ status: 'completed' })
-        });
-      } catch (error) {
-        console.error('Error updating booking in MongoDB:', error);
-      }
-
-      // Also update localStorage for backwards compatibility
-      updateBooking(bookingId, { status: 'completed' });
-
-      // Record payment to MongoDB
+      // Complete the booking and record its payment in MongoDB in one request
       try {
         const paymentData = {
           userId: user!.id,
@@ -62,19 +50,21 @@ export default function Payment() {
           providerId: service.providerId,
           amount: price,
           type: 'instant',
-          status: 'success',
-          bookingId: bookingId
+          status: 'success'
         };
-        
-        await fetch(`${API_BASE_URL}/payment`, {
+
+        await fetch(`${API_BASE_URL}/checkout`, {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(paymentData)
+          headers: { 'Content-Type': 'application/json', 'Idempotency-Key': checkoutKey },
+          body: JSON.stringify({ bookingId, payment: paymentData })
         });
       } catch (error) {
-        console.error('Error saving payment to MongoDB:', error);
+        console.error('Error completing checkout in MongoDB:', error);
       }
 
+      // Also update localStorage for backwards compatibility
+      updateBooking(bookingId, { status: 'completed' });
+
       // Record payment in localStorage for backwards compatibility
       const payment = {
         id: Date.now().toString(),
@@ -89,8 +79,7 @@ export default function Payment() {
 
       addPayment(payment);
     } else {
-      // Handle subscription payment - save to MongoDB via API
-      let subscriptionMongoId = '';
+      // Create the subscription and its payment in MongoDB in one request
       try {
         const subscriptionData = {
           customerId: user!.id,
@@ -104,19 +93,28 @@ export default function Payment() {
           location: service.location
         };
 
-        const response = await fetch(`${API_BASE_URL}/subscription`, {
+        const paymentData = {
+          userId: user!.id,
+          customerId: user!.id,
+          providerId: service.providerId,
+          amount: price,
+          type: 'subscription',
+          status: 'success',
+          plan: plan
+        };
+
+        const response = await fetch(`${API_BASE_URL}/checkout`, {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(subscriptionData)
+          headers: { 'Content-Type': 'application/json', 'Idempotency-Key': checkoutKey },
+          body: JSON.stringify({ subscription: subscriptionData, payment: paymentData })
         });
 
         const result = await response.json();
         if (result.success) {
           console.log('Subscription saved to MongoDB:', result.subscription);
-          subscriptionMongoId = result.subscription.id;
         }
       } catch (error) {
-        console.error('Error saving subscription to MongoDB:', error);
+        console.error('Error completing checkout in MongoDB:', error);
       }
 
       // Calculate dates for localStorage (backwards compatibility)
@@ -143,28 +141,6 @@ export default function Payment() {
 
       addSubscription(newSubscription);
 
-      // Record payment to MongoDB for subscription
-      try {
-        const paymentData = {
-          userId: user!.id,
-          customerId: user!.id,
-          providerId: service.providerId,
-          amount: price,
-          type: 'subscription',
-          status: 'success',
-          subscriptionId: subscriptionMongoId || newSubscription.id,
-          plan: plan
-        };
-        
-        await fetch(`${API_BASE_URL}/payment`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(paymentData)
-        });
-      } catch (error) {
-        console.error('Error saving payment to MongoDB:', error);
-      }
-
       // Record payment in localStorage for backwards compatibility
       const payment = {
         id: Date.now().toString(),
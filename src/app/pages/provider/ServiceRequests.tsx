@@ -87,7 +87,7 @@ export default function ServiceRequests() {
       await fetch(`${API_BASE_URL}/instant-booking/${bookingId}`, {
         method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ status: 'rejected' })
+        body: JSON.stringify({ status: 'rejected', providerId: user!.id })
       });
     } catch (error) {
       console.error('Error updating booking in MongoDB:', error);
@@ -148,7 +148,7 @@ export default function ServiceRequests() {
       await fetch(`${API_BASE_URL}/instant-booking/${bookingId}`, {
         method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ status: 'completed' })
+        body: JSON.stringify({ status: 'completed', providerId: user!.id })
       });
     } catch (error) {
       console.error('Error updating booking in MongoDB:', error);
@@ -165,6 +165,17 @@ export default function ServiceRequests() {
     return `data:audio/webm;base64,${voiceNote}`;
   };
 
+  // Uploaded media is served by id; older bookings still carry it inline
+  const getImageSrc = (booking: any): string => {
+    if (booking.image_id) return `${API_BASE_URL}/media/${booking.image_id}?rendition=thumbnail`;
+    return booking.image || '';
+  };
+
+  const getVoiceNoteSrc = (booking: any): string => {
+    if (booking.voice_note_id) return `${API_BASE_URL}/media/${booking.voice_note_id}?rendition=compressed`;
+    return getAudioUrl(booking.voiceNote || booking.voice_note);
+  };
+
   // Get bookings with customer feedback (thumbs down)
   const bookingsWithFeedback = bookings.filter(b => b.status === 'accepted' && b.feedback === 'thumbs_down');
   
@@ -229,9 +240,9 @@ export default function ServiceRequests() {
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
             {filteredBookings.map(booking => (
               <div key={booking.id} className="bg-white rounded-xl shadow-sm overflow-hidden">
-                {booking.image && (
+                {getImageSrc(booking) && (
                   <img
-                    src={booking.image}
+                    src={getImageSrc(booking)}
                     alt="Problem"
                     className="w-full h-48 object-cover"
                   />
@@ -256,7 +267,7 @@ export default function ServiceRequests() {
                   <p className="text-gray-600 text-sm mb-4">{booking.description}</p>
 
                   {/* Voice Note Section */}
-                  {(booking as any).voiceNote && (
+                  {getVoiceNoteSrc(booking) && (
                     <div className="mb-4 p-3 bg-purple-50 rounded-lg">
                       <div className="flex items-center gap-2 text-purple-700 mb-2">
                         <Mic className="w-4 h-4" />
@@ -264,7 +275,7 @@ export default function ServiceRequests() {
                       </div>
                       <audio 
                         controls 
-                        src={getAudioUrl((booking as any).voiceNote)} 
+                        src={getVoiceNoteSrc(booking)} 
                         className="w-full h-10"
                       />
                     </div>
@@ -389,7 +400,7 @@ export default function ServiceRequests() {
               )}
               
               {/* Voice Note in Modal */}
-              {(selectedBooking as any).voiceNote && (
+              {getVoiceNoteSrc(selectedBooking) && (
                 <div className="mb-4 p-3 bg-purple-50 rounded-lg">
                   <div className="flex items-center gap-2 text-purple-700 mb-2">
                     <Mic className="w-4 h-4" />
@@ -397,15 +408,15 @@ export default function ServiceRequests() {
                   </div>
                   <audio 
                     controls 
-                    src={getAudioUrl((selectedBooking as any).voiceNote)} 
+                    src={getVoiceNoteSrc(selectedBooking)} 
                     className="w-full h-10"
                   />
                 </div>
               )}
               
-              {selectedBooking.image && (
+              {getImageSrc(selectedBooking) && (
                 <img
-                  src={selectedBooking.image}
+                  src={getImageSrc(selectedBooking)}
                   alt="Problem"
                   className="w-full h-48 object-cover rounded-lg mb-4"
                 />